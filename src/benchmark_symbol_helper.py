@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+''' TIMES THE SymbolHelper QUERIES THE TREE WALKER MAKES FOR EVERY VARIABLE TOKEN, WITHOUT AND
+    WITH THE PER-VARIABLE AND PER-TYPE-STRING CACHES.  UNCACHED, EVERY TOKEN'S QUERIES START
+    COLD, AS THEY DID BEFORE THE CACHES; CACHED, EACH FILE STARTS COLD, AS A FRESH
+    prob_phys_units RUN WOULD.  PARSING THE DUMP FILE IS NOT TIMED.  EACH ROUND REPEATS THE
+    QUERIES THE WAY THE COLLECTION ROUNDS DO, SO THE CACHES SHOW UP AFTER THE FIRST ROUND.
+
+    usage:  python benchmark_symbol_helper.py --rounds 4 a.cpp.dump b.cpp.dump ...
+'''
+from __future__ import print_function
+from symbol_helper import SymbolHelper
+import symbol_helper
+import cppcheckdata
+import click
+import time
+
+
+# WHAT find_variable_type, find_sanitized_variable_type AND find_unit_eligibility KEEP ON A VARIABLE
+VARIABLE_CACHES = ['canonical_type', 'sanitized_class_name', 'unit_eligibility']
+
+
+def clear_caches(variables):
+    symbol_helper.sanitized_class_name_cache.clear()
+    symbol_helper.unit_eligibility_cache.clear()
+    for variable in variables:
+        for attribute in VARIABLE_CACHES:
+            if hasattr(variable, attribute):
+                delattr(variable, attribute)
+
+
+def run_rounds(my_symbol_helper, configuration, rounds, uncached):
+    for i in range(rounds):
+        for token in configuration.tokenlist:
+            # ONLY AST LEAVES REACH find_units_for_variable
+            if not (token.variable and token.astParent):
+                continue
+            if uncached:
+                clear_caches([token.variable])
+            (compound_token, name) = my_symbol_helper.find_compound_variable_and_name_for_variable_token(token)
+            my_symbol_helper.should_have_unit(token, name)
+            my_symbol_helper.find_units_for_variable(token)
+
+
+@click.command()
+@click.argument('dump_files', nargs=-1)
+@click.option('--rounds', default=4, help='passes over the tokens of each dump file')
+def main(dump_files, rounds):
+    my_symbol_helper = SymbolHelper()
+    total = {True: 0.0, False: 0.0}
+    for dump_file in dump_files:
+        data = cppcheckdata.parsedump(dump_file)
+        for configuration in data.configurations[:1]:
+            for uncached in (True, False):
+                clear_caches(configuration.variables)
+                start = time.time()
+                run_rounds(my_symbol_helper, configuration, rounds, uncached)
+                total[uncached] += time.time() - start
+    print('%d files, %d rounds: %.3fs in SymbolHelper uncached, %.3fs cached'
+          % (len(dump_files), rounds, total[True], total[False]))
+
+
+if __name__ == '__main__':
+    main()
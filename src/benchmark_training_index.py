@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+''' TIMES LOADING THE datamining TRAINING DATA FROM ITS PKL FILES AGAINST MAPPING ITS
+    TrainingIndex AND DECODING IT WITH to_dict AS datamining.TypeMiner DOES, THEN LOOKING UP THE
+    UNIT COUNTS OF EVERY TERM OF THE TRAINING CORPUS (datamining_self_vars.pkl, REPEATS
+    INCLUDED) IN THE PKL DICT, THE INDEX AND THE DECODED DICT.  WITH --workers, THAT MANY
+    PROCESSES EACH MAP THE INDEX AND LOOK UP AN EQUAL SHARE OF THE CORPUS.
+    THE INDEX IS BUILT FROM THE PKL FILES FIRST IF index_file DOES NOT EXIST.
+
+    usage:  python benchmark_training_index.py --rounds 3 --workers 4 DATA/training_index.bin
+'''
+from __future__ import print_function
+from training_index import TrainingIndex, write_training_index
+import multiprocessing
+import pickle
+import click
+import time
+import os
+
+
+def look_up(term2unit_counts, terms, rounds):
+    for i in range(rounds):
+        for term in terms:
+            term2unit_counts[term]
+
+
+def look_up_in_index(arguments):
+    (index_file, terms, rounds) = arguments
+    start = time.time()
+    index = TrainingIndex(index_file)
+    look_up(index, terms, rounds)
+    index.close()
+    return time.time() - start
+
+
+@click.command()
+@click.argument('index_file')
+@click.option('--vars_pkl', default='./datamining_self_vars.pkl', help='training corpus terms')
+@click.option('--var2type_pkl', default='./datamining_self_var2type.pkl', help='training corpus unit counts')
+@click.option('--rounds', default=3, help='passes over the corpus terms')
+@click.option('--workers', default=0, help='processes sharing the mapped index, 0 for none')
+def main(index_file, vars_pkl, var2type_pkl, rounds, workers):
+    start = time.time()
+    terms = pickle.load(open(vars_pkl, 'rb'))
+    var2type = pickle.load(open(var2type_pkl, 'rb'))
+    print('pkl files: %.3fs to load %d terms, %d distinct' % (time.time() - start, len(terms), len(var2type)))
+    if not os.path.exists(index_file):
+        write_training_index(index_file, var2type)
+
+    start = time.time()
+    index = TrainingIndex(index_file)
+    print('index %s: %.4fs to map, %d bytes' % (index_file, time.time() - start, os.path.getsize(index_file)))
+    mismatches = sum(1 for term in var2type if index.get(term) != var2type[term])
+    if mismatches or len(index) != len(var2type):
+        print('index %s: %d terms differ from %s' % (index_file, mismatches, var2type_pkl))
+
+    start = time.time()
+    look_up(var2type, terms, rounds)
+    print('%d lookups: %.3fs in the pkl dict' % (len(terms) * rounds, time.time() - start))
+    start = time.time()
+    look_up(index, terms, rounds)
+    print('%d lookups: %.3fs in the index' % (len(terms) * rounds, time.time() - start))
+    start = time.time()
+    term2unit_counts = index.to_dict()
+    print('index %s: %.4fs to decode' % (index_file, time.time() - start))
+    start = time.time()
+    look_up(term2unit_counts, terms, rounds)
+    print('%d lookups: %.3fs in the decoded dict' % (len(terms) * rounds, time.time() - start))
+
+    if workers:
+        shares = [(index_file, terms[i::workers], rounds) for i in range(workers)]
+        start = time.time()
+        pool = multiprocessing.Pool(workers)
+        worker_times = pool.map(look_up_in_index, shares)
+        pool.close()
+        pool.join()
+        print('%d workers: %.3fs, %.3fs in the slowest' % (workers, time.time() - start, max(worker_times)))
+
+
+if __name__ == '__main__':
+    main()
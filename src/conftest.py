@@ -0,0 +1,5 @@
+import os
+import sys
+
+# THE MODULES IMPORT EACH OTHER BY THEIR NAMES IN src, AS WHEN prob_phys_units RUNS THERE
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -127,6 +127,12 @@ class ConstraintCollector:
         tw.source_file_lines = self.source_file_lines
         tw.source_file = self.source_file
 
+        # CACHE COMPOUND VARIABLE NAMES ONCE - REUSED BY ALL LATER ROUNDS
+        tw.my_symbol_helper.cache_compound_variable_names(function_dict['root_tokens'])
+        # ONE BATCH OF NAMES FOR THE NAME-TO-UNIT MODEL, IF ANY
+        if self.vnh:
+            tw.prepare_deep_network_names(function_dict['root_tokens'])
+
         # ASSUME THE TOKENS COME BACK AS A SORTED LIST
         break_point = 1000
         i=0
@@ -221,6 +227,9 @@ class ConstraintCollector:
             tw.generic_recurse_and_apply_function(root_token, tw.collect_known_symbol_constraints)
             #NAMING CONSTRAINTS
             tw.generic_recurse_and_apply_function(root_token, tw.collect_naming_constraints)
+            # NAMES THE TYPE MINER LEFT WITHOUT A NAMING CONSTRAINT GO TO THE NAME-TO-UNIT MODEL
+            if self.vnh:
+                tw.generic_recurse_and_apply_function(root_token, tw.collect_deep_network_naming_constraints)
         # END -- FOR LOOP 
 
         if (not found_units) and function_dict['scopeObject'].function \
@@ -385,6 +394,10 @@ class ConstraintCollector:
                 sorted_analysis_unit_dict = self.make_sorted_analysis_unit_dict_from_function_graph(analysis_unit_dict) # RETURNS ORDERED DICT
                 self.all_sorted_analysis_unit_dicts.append(sorted_analysis_unit_dict)
 
+            # TAG THE TERMS OF EVERY VARIABLE NAME IN THE FILE IN ONE PASS, BEFORE THE NAMING
+            # CONSTRAINTS ASK FOR THEM ONE NAME AT A TIME
+            self.type_miner.prepare_names(set(t.str for t in c.tokenlist if t.variable))
+
             # COLLECT ALL TOKEN PARSE TREES FOR EACH FUNCTION
             for function_dict in sorted_analysis_unit_dict.values():
                 self.collect_constraints(function_dict)
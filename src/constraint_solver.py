@@ -1,8 +1,18 @@
-from pgm.pgmplayer import PGMPlayer
+from pgm.pgmplayer import PGMBatchPlayer
+from pgm.components import ComponentCache
 import cps_constraints as con
 from operator import itemgetter
+import numpy as np
+import perf_stats
+import sys
+import time
 import uuid
-import os
+
+
+# MARGINALS OF SPLIT LOOPY COMPONENTS BY STRUCTURE, SHARED BY ALL SOLVERS: THE SAME
+# CONSTRAINT TOPOLOGY WITH THE SAME PRIORS RECURS ACROSS UNITS, ROUNDS AND FILES
+COMPONENT_CACHE_SIZE = 4096
+component_cache = ComponentCache(COMPONENT_CACHE_SIZE)
 
 class ConstraintSolver:
 
@@ -12,6 +22,43 @@ class ConstraintSolver:
         self.SHOULD_PRINT_VARIABLE_TYPES = False
         self.SHOULD_USE_CONSTRAINT_SCOPING = SHOULD_USE_CONSTRAINT_SCOPING
         self.ENABLE_SCOPER = False
+        # WRITE EACH UNIT'S FACTOR GRAPH TO pgm/predict_<unit><uuid>.fg FOR DEBUGGING
+        self.SHOULD_DUMP_FACTOR_GRAPHS = False
+        # ALIAS FROM pgm/aliases.conf.  NUMPY_BP RUNS WITHOUT THE libDAI BINDINGS
+        self.INFERENCE_METHOD = 'BP'
+        # SOLVE CONNECTED COMPONENTS APART: CLOSED FORM FOR ZERO PRIORS, EXACT FOR TREES,
+        # INFERENCE_METHOD FOR THE LOOPY REST, ON INFERENCE_WORKERS PROCESSES.  OFF BY DEFAULT:
+        # A LOOPY BP RUN PER COMPONENT STOPS ELSEWHERE THAN ONE OVER THE WHOLE UNIT, SO SOME
+        # MARGINALS DIFFER FROM THE UNSPLIT BP ONES
+        self.SHOULD_SPLIT_COMPONENTS = False
+        # UNSPLIT, THE INFERENCE_WORKERS PROCESSES EACH SOLVE A SHARE OF THE UNITS INSTEAD
+        self.INFERENCE_WORKERS = 1
+        # LOOPY COMPONENTS UP TO THIS TREEWIDTH GET EXACT MARGINALS BY JUNCTION TREE INSTEAD,
+        # 0 KEEPS INFERENCE_METHOD.  EXACT DIFFERS FROM BP ON LOOPS, E.G. MUTUAL IMPLICATIONS
+        self.EXACT_TREEWIDTH = 0
+        # KEEP EACH UNIT'S STATE FROM ONE solve() TO THE NEXT: SPLIT COMPONENTS THE ROUND LEFT
+        # UNCHANGED REUSE THEIR MARGINALS, BIT FOR BIT THE SAME AS SOLVING THEM AGAIN
+        self.SHOULD_REUSE_PREVIOUS_ROUND = True
+        # ALSO START NUMPY_BP FROM THE MESSAGES THE LAST ROUND ENDED WITH.  CONVERGES IN FEWER
+        # ITERATIONS BUT ONLY TO WITHIN tol: AN EXACT 0.5 MAY COME BACK AS 0.5 +- 1e-15, WHICH
+        # THE p > unit_prob_threshold TESTS DOWNSTREAM TELL APART
+        self.SHOULD_WARM_START = False
+        # ONE FACTOR PER PAIR OF VARIABLES, E.G. pv1 -> pv2 AND pv2 -> pv1 AS ONE TABLE.  BP THEN
+        # SEES ONE EDGE WHERE IT SAW A LOOP, SO THE MARGINALS CHANGE
+        self.SHOULD_MERGE_DUPLICATE_FACTORS = False
+        # UNITS NO CONSTRAINT GIVES A NONZERO PRIOR ALL GET THE SAME GRAPH, SOLVE IT ONCE FOR ALL
+        self.SHOULD_COLLAPSE_EVIDENCE_FREE_UNITS = True
+        # variable2unitproba KEEPS THE UNITS WITH THIS MANY HIGHEST DISTINCT PROBABILITIES PER
+        # VARIABLE, TIES INCLUDED.  THE TOP-3 TESTS DOWNSTREAM SEE THE SAME UNITS
+        self.TOP_K_UNITS = 3
+        # SECONDS EACH solve() GIVES THE NUMPY_MF AND NUMPY_GIBBS RUNS, WHICH THEN RETURN THE
+        # MARGINALS THEY HAVE SO FAR.  0 FOR NO LIMIT; NUMPY_BP AND libDAI IGNORE IT
+        self.INFERENCE_BUDGET = 0
+        # LOOK SPLIT LOOPY COMPONENTS UP IN component_cache BEFORE RUNNING INFERENCE_METHOD.
+        # KEYS ARE THE EXACT FACTOR TABLES, SO A HIT IS BIT FOR BIT WHAT THE RUN WOULD GIVE
+        self.SHOULD_CACHE_COMPONENTS = True
+        self.unit2memory = {}
+        self.unconverged_units = []
         self.pred2pgmvar = {}
         self.pgmvar2pred = {}
         self.uuid = str(uuid.uuid4())
@@ -25,156 +72,338 @@ class ConstraintSolver:
         
         self.pred2pgmvar = {}
         self.pgmvar2pred = {}
-        var2unitproba = {}
 
-        for unit in con.units:
-            fg_filename = "pgm/predict_" + str(unit).replace(" ", "") + self.uuid + ".fg"
-            player = self.prepare(fg_filename, unit)
-            pgmvar2proba = player.compute_marginals()
-            #print {v.name: '%.4f' % (1.0 - p) for v, p in pgmvar2proba.iteritems()}
-            os.remove(fg_filename)
+        # ONE PASS OVER THE CONSTRAINTS BUILDS EVERY UNIT'S GRAPH, ONLY THE PRIORS DIFFER
+        units = list(con.units)
+        # THE FIRST EVIDENCE-FREE UNIT STANDS IN FOR THE OTHERS: ALL PRIORS 0 AND THE SAME
+        # FACTORS LEFT OUT MAKE THE SAME GRAPH, SO THE SAME MARGINALS BIT FOR BIT
+        solved_units = units
+        column = range(len(units))
+        if self.SHOULD_COLLAPSE_EVIDENCE_FREE_UNITS:
+            evidence = self.unit_evidence(units)
+            solved_units = []
+            column = []
+            free_column = None
+            for unit, mass in zip(units, evidence):
+                if mass == 0.0 and free_column is not None:
+                    column.append(free_column)
+                    continue
+                if mass == 0.0:
+                    free_column = len(solved_units)
+                column.append(len(solved_units))
+                solved_units.append(unit)
+            perf_stats.count('solver.evidence_free_units', int((evidence == 0.0).sum()))
+        player = self.prepare_batch(solved_units)
+        fg_filenames = None
+        if self.SHOULD_DUMP_FACTOR_GRAPHS:
+            fg_filenames = ["pgm/predict_" + str(unit).replace(" ", "") + self.uuid + ".fg" for unit in solved_units]
+        unit_memory = None
+        if self.SHOULD_REUSE_PREVIOUS_ROUND or self.SHOULD_WARM_START:
+            self.unit2memory = {str(unit): self.unit2memory.get(str(unit), {}) for unit in solved_units}
+            unit_memory = [self.unit2memory[str(unit)] for unit in solved_units]
+        deadline = time.time() + self.INFERENCE_BUDGET if self.INFERENCE_BUDGET > 0 else None
+        hits, misses = component_cache.hits, component_cache.misses
+        p0, present, convergence = player.compute_marginals(alg=self.INFERENCE_METHOD, fg_filenames=fg_filenames,
+                                                            split_components=self.SHOULD_SPLIT_COMPONENTS,
+                                                            workers=self.INFERENCE_WORKERS,
+                                                            exact_treewidth=self.EXACT_TREEWIDTH,
+                                                            unit_memory=unit_memory,
+                                                            reuse_results=self.SHOULD_REUSE_PREVIOUS_ROUND,
+                                                            warm_start=self.SHOULD_WARM_START,
+                                                            merge_duplicates=self.SHOULD_MERGE_DUPLICATE_FACTORS,
+                                                            queried=set(self.pred2pgmvar.itervalues()),
+                                                            deadline=deadline,
+                                                            component_cache=component_cache if self.SHOULD_CACHE_COMPONENTS else None)
+        perf_stats.count('component_cache.hit', component_cache.hits - hits)
+        perf_stats.count('component_cache.miss', component_cache.misses - misses)
+        self.report_convergence(solved_units, convergence)
+        p0 = p0[column]
+        present = present[column]
+
+        for pred, pgmvar in self.pred2pgmvar.iteritems():
+            self.pgmvar2pred[pgmvar] = pred
+
+        var2unitproba = self.top_unit_probas(units, player, p0, present)
+
+        if self.SHOULD_PRINT_VARIABLE_TYPES:
+            # EVERY UNIT OF EVERY VARIABLE, NOT ONLY THE TOP_K_UNITS variable2unitproba KEEPS
+            var2allunitproba = self.all_unit_probas(units, player, p0, present)
+            for v in var2allunitproba:
+                if (var2allunitproba[v][0][1] == 0.5):
+                    continue
+                print '%s:\n%s\n' % (v[1], var2allunitproba[v])
 
-            for pred, pgmvar in self.pred2pgmvar.iteritems():
-                self.pgmvar2pred[pgmvar] = pred
+        con.variable2unitproba = var2unitproba
+        #con.reset_constraints()        
 
-            #print '---------------------'
-            #print 'Probabilistic Units:'
-            #print '---------------------'
+        return var2unitproba
+              
    
-            for v, p in pgmvar2proba.iteritems():
-                if v.name in self.pgmvar2pred:
-                    (token, name, u) = self.pgmvar2pred[v.name]
-                    #print '%s: %s = %s = %.4f' % (v.name, name, unit, 1.0-p)
+    def top_unit_probas(self, units, player, p0, present):
+        # p0 AND present ARE [unit, pgm variable id], THE UNITS IN ORDER.  EACH p VARIABLE'S
+        # COLUMN IS SORTED BY 1 - p0 ONCE, HIGHEST FIRST AND TIES IN UNIT ORDER, THEN CUT AFTER
+        # THE TOP_K_UNITS-TH DISTINCT VALUE.  A p VARIABLE OF NO CONSTRAINT VARIABLE, ('p', None)
+        # FROM A df CONSTRAINT ON AN EXPRESSION TOKEN, IS LEFT OUT
+        pgmvars = sorted((pgmvar for pgmvar in self.pgmvar2pred if pgmvar[1] is not None), key=itemgetter(1))
+        var_ids = np.array([pgmvar[1] for pgmvar in pgmvars], dtype=int)
+        columns = np.array([player.variables.key2var[pgmvar].id for pgmvar in pgmvars], dtype=int)
+        proba = 1.0 - p0[:, columns]
+        mask = present[:, columns]
+        order = np.argsort(np.where(mask, -proba, np.inf), axis=0, kind='mergesort')
+        proba = np.take_along_axis(proba, order, axis=0)
+        mask = np.take_along_axis(mask, order, axis=0)
+        distinct = np.ones(proba.shape, dtype=bool)
+        distinct[1:] = proba[1:] != proba[:-1]
+        keep = (mask & (np.cumsum(distinct, axis=0) <= self.TOP_K_UNITS)).T
+
+        counts = np.zeros(con.var_count + 2, dtype=int)
+        counts[var_ids + 1] = keep.sum(axis=1)
+        key2var = {}
+        for pgmvar, count in zip(pgmvars, counts[var_ids + 1]):
+            if count:
+                (token, name, u) = self.pgmvar2pred[pgmvar]
+                key2var[(token, name)] = pgmvar[1]
+        return con.TopUnitProbas(units, key2var, np.cumsum(counts), order.T[keep], proba.T[keep])
+
+
+    def all_unit_probas(self, units, player, p0, present):
+        # (token.variable, name) -> [(unit, proba), ...] OF EVERY UNIT, HIGHEST FIRST
+        var2allunitproba = {}
+        for pgmvar, (token, name, u) in self.pgmvar2pred.iteritems():
+            v = player.variables.key2var[pgmvar].id
+            unitproba = [(units[k], 1.0 - float(p0[k, v])) for k in np.flatnonzero(present[:, v])]
+            if unitproba:
+                var2allunitproba.setdefault((token, name), []).extend(unitproba)
+        for v in var2allunitproba:
+            var2allunitproba[v].sort(key=itemgetter(1), reverse=True)
+        return var2allunitproba
+
+
+    def report_convergence(self, units, convergence):
+        # COUNT THE INFERENCE WORK, AND NAME THE UNITS WHOSE RUNS HIT maxiter BEFORE tol:
+        # THEIR MARGINALS ARE WHEREVER THE LAST SWEEP LEFT THEM
+        (iterations, max_diff, converged, saved) = convergence
+        self.unconverged_units = [units[k] for k in np.flatnonzero(~converged)]
+        perf_stats.count('inference.iterations', int(iterations.sum()))
+        perf_stats.count('inference.iterations_saved', int(saved.sum()))
+        perf_stats.count('inference.decided_units', int((saved > 0).sum()))
+        perf_stats.count('inference.units', len(units))
+        perf_stats.count('inference.unconverged_units', len(self.unconverged_units))
+        for k in np.flatnonzero(~converged):
+            sys.stderr.write('%s did not converge for unit %s: belief change %.3g after %d iterations\n'
+                             % (self.INFERENCE_METHOD, units[k], max_diff[k], iterations[k]))
+
+
+    def unit_evidence(self, units):
+        # PER UNIT, THE PRIOR PROBABILITY THE CONSTRAINTS PUT ON IT, SUMMED OVER THE n, c, d, f AND
+        # k VARIABLES THE process_*_constraints WOULD GIVE IT.  0.0 MEANS EVERY PRIOR IS 0
+        self.update_scoper()
+        evidence = np.zeros(len(units))
+
+        for var, nm_con in con.naming_constraints.items():
+            (lt, lname, unitprobalist) = nm_con
+            if con.variables.get((lt.variable, lname)):
+                for k, unit in enumerate(units):
+                    for (un, pr) in unitprobalist:
+                        if (un == unit):
+                            evidence[k] += pr
+                            break
 
-                    if (token, name) in var2unitproba:
-                        var2unitproba[(token, name)].append((unit, 1.0-p))
-                    else:
-                        var2unitproba[(token, name)] = [(unit, 1.0-p)]
+        for var, cu_con in con.computed_unit_constraints.items():
+            (lt, lname, units_, isKnown) = cu_con[0]
+            if con.variables.get((lt.variable, lname)):
+                for k, unit in enumerate(units):
+                    unit_p = 0.0
+                    for (t, n, un, isKnown) in cu_con:
+                        if self.ENABLE_SCOPER and self.con_scoper.should_exclude_constraint([t]):
+                            continue
+                        if con.should_exclude_constraint((t, n, un, isKnown)):
+                            continue
+                        if (unit in un):
+                            unit_p = 1.0 if isKnown else 0.8
+                            if isKnown:
+                                break
+                    evidence[k] += unit_p
 
-            #print '---------------------' + '\n'
+        for (lt, lname, un, isKnown) in con.derived_cu_constraints:
+            if con.variables.get((lt.variable, lname)):
+                for k, unit in enumerate(units):
+                    if (unit == un):
+                        evidence[k] += 1.0 if isKnown else 0.8
 
-        for v in var2unitproba:
-            var2unitproba[v].sort(key=itemgetter(1), reverse=True)
-            if (var2unitproba[v][0][1] == 0.5):
+        for (lt, lname, rt, rname, df_type) in con.df_constraints:
+            if self.ENABLE_SCOPER and self.con_scoper.should_exclude_constraint([lt, rt]):
                 continue
-            if self.SHOULD_PRINT_VARIABLE_TYPES:
-                print '%s:\n%s\n' % (v[1], var2unitproba[v])
+            var1 = con.variables.get((lt.variable, lname))
+            var2 = con.variables.get((rt.variable, rname))
+            if var1 and var2 and (var1 != var2):
+                continue
+            # ONE KNOWN SIDE PUTS A PRIOR ON THE OTHER'S d VARIABLE
+            known_units = None
+            if lt.isKnown and (not rt.isKnown):
+                known_units = lt.units
+            elif rt.isKnown and (not lt.isKnown):
+                known_units = rt.units
+            if known_units is not None:
+                for k, unit in enumerate(units):
+                    if (known_units[0] == unit):
+                        evidence[k] += 0.95
+
+        for (t, name, units_, cf_type) in con.conversion_factor_constraints:
+            if con.variables.get((t.variable, name)):
+                for k, unit in enumerate(units):
+                    if (units_[0] == unit):
+                        evidence[k] += 0.95 if (cf_type == con.CF_3) else 0.9
 
-        con.variable2unitproba = var2unitproba
-        #con.reset_constraints()        
+        for var, ks_con in con.known_symbol_constraints.items():
+            (token, name, units_) = ks_con[0]
+            if con.variables.get((token.variable, name)):
+                for (t, n, un) in ks_con:
+                    for k, unit in enumerate(units):
+                        if (un[0] == unit):
+                            evidence[k] += 0.95
 
-        return var2unitproba
-              
-   
-    def prepare(self, fg_filename, unit):
+        return evidence
+
+
+    def update_scoper(self):
         if self.SHOULD_USE_CONSTRAINT_SCOPING and self.con_scoper.constraint_scope_list:
             self.ENABLE_SCOPER = True
 
-        player = PGMPlayer(fg_filename)
 
-        self.process_nm_constraints(player, unit)
-        self.process_cu_constraints(player, unit)
-        self.process_df_constraints(player, unit)
-        self.process_cf_constraints(player, unit)
-        self.process_ks_constraints(player, unit)
+    def prepare(self, fg_filename, unit):
+        return self.prepare_batch([unit]).unit_player(0, fg_filename)
+
+
+    def prepare_batch(self, units):
+        self.update_scoper()
+
+        player = PGMBatchPlayer(len(units))
+
+        self.process_nm_constraints(player, units)
+        self.process_cu_constraints(player, units)
+        self.process_df_constraints(player, units)
+        self.process_cf_constraints(player, units)
+        self.process_ks_constraints(player, units)
 
         return player
+
+
+    def register_pgmvar(self, variable, name, units, pgmvar, active=None):
+        # THE FIRST FACTOR ON A VARIABLE IN A UNIT'S GRAPH NAMES ITS PGM VARIABLE
+        for k, unit in enumerate(units):
+            if active is not None and not active[k]:
+                continue
+            if (variable, name, str(unit)) not in self.pred2pgmvar:
+                self.pred2pgmvar[(variable, name, str(unit))] = pgmvar
         
 
-    def process_nm_constraints(self, pgm_player, unit):
+    def process_nm_constraints(self, pgm_player, units):
         for var, nm_con in con.naming_constraints.items():
             (lt, lname, unitprobalist) = nm_con
             var = con.variables.get((lt.variable, lname))
             if var:
-                nv = 'n'+ str(var)
-                pv = 'p'+ str(var)
-                p = 0.0
-                for (un, pr) in unitprobalist:
-                    if (un == unit):
-                        p = pr
-                        break
+                nv = ('n', var)
+                pv = ('p', var)
+                p = []
+                for unit in units:
+                    unit_p = 0.0
+                    for (un, pr) in unitprobalist:
+                        if (un == unit):
+                            unit_p = pr
+                            break
+                    p.append(unit_p)
                     
                 pgm_player.add_factor(left=[], right=[nv],
                                       states=[0, 1],
                                       proba=p,
-                                      comment=nv + ' = 1')
+                                      comment='%s%s = 1' % nv)
                 pgm_player.add_factor(left=[nv], right=[pv],
                                       states=[1, 0, 1, 1],
                                       proba=0.7,
-                                      comment=nv + ' -> ' + pv)
-                #print nv + ': (' + lname + ', ' + str(unit) + ', ' + str(p) + ')'
+                                      comment='%s%s -> %s%s' % (nv + pv))
+                #print nv + ': (' + lname + ', ' + str(p) + ')'
                 #print nv + ' -> ' + pv
 
-                if (lt.variable, lname, str(unit)) not in self.pred2pgmvar:
-                    self.pred2pgmvar[(lt.variable, lname, str(unit))] = pv
+                self.register_pgmvar(lt.variable, lname, units, pv)
                     
 
-    def process_cu_constraints(self, pgm_player, unit):
+    def process_cu_constraints(self, pgm_player, units):
         for var, cu_con in con.computed_unit_constraints.items():
-            (lt, lname, units, isKnown) = cu_con[0]
+            (lt, lname, units_, isKnown) = cu_con[0]
             var = con.variables.get((lt.variable, lname))
             if var:
-                cv = 'c'+ str(var)
-                pv = 'p'+ str(var)
-                p = 0.0
+                cv = ('c', var)
+                pv = ('p', var)
+                p = []
+                active = []
                 p_fwd = 0.95 if con.found_ros_units else 0.7
-                no_factor = False
-                for (t, n, un, isKnown) in cu_con:
-                    if self.ENABLE_SCOPER and self.con_scoper.should_exclude_constraint([t]):
-                        continue
-                    if con.should_exclude_constraint((t, n, un, isKnown)):
-                        no_factor = True
-                        continue
-
-                    if (unit in un):
-                        p = 1.0 if isKnown else 0.8
-                        if isKnown:
-                            break
-
-                if no_factor and p == 0.0:
+                for unit in units:
+                    unit_p = 0.0
+                    no_factor = False
+                    for (t, n, un, isKnown) in cu_con:
+                        if self.ENABLE_SCOPER and self.con_scoper.should_exclude_constraint([t]):
+                            continue
+                        if con.should_exclude_constraint((t, n, un, isKnown)):
+                            no_factor = True
+                            continue
+
+                        if (unit in un):
+                            unit_p = 1.0 if isKnown else 0.8
+                            if isKnown:
+                                break
+
+                    # LEAVE THE FACTORS OUT OF THIS UNIT'S GRAPH
+                    p.append(unit_p)
+                    active.append(not (no_factor and unit_p == 0.0))
+
+                if not any(active):
                     continue
 
                 pgm_player.add_factor(left=[], right=[cv],
                                       states=[0, 1],
                                       proba=p,
-                                      comment=cv + ' = 1')
+                                      comment='%s%s = 1' % cv,
+                                      active=None if all(active) else active)
                 pgm_player.add_factor(left=[cv], right=[pv],
                                       states=[1, 0, 1, 1],
                                       proba=p_fwd,
-                                      comment=cv + ' -> ' + pv)
-                #print cv + ' = 1: (' + lname + ', ' + str(unit) + ', ' + str(p) + ')'
+                                      comment='%s%s -> %s%s' % (cv + pv),
+                                      active=None if all(active) else active)
+                #print cv + ' = 1: (' + lname + ', ' + str(p) + ')'
                 #print cv + ' -> ' + pv
 
-                if (lt.variable, lname, str(unit)) not in self.pred2pgmvar:
-                    self.pred2pgmvar[(lt.variable, lname, str(unit))] = pv
+                self.register_pgmvar(lt.variable, lname, units, pv, active)
 
         for (lt, lname, un, isKnown) in con.derived_cu_constraints:
             var = con.variables.get((lt.variable, lname))
             if var:
-                cv = 'c'+ str(var)
-                pv = 'p'+ str(var)
-                p = 0.0
+                cv = ('c', var)
+                pv = ('p', var)
+                p = []
                 p_fwd = 0.95 if con.found_ros_units else 0.7
                 
-                if (unit == un):
-                    p = 1.0 if isKnown else 0.8
+                for unit in units:
+                    unit_p = 0.0
+                    if (unit == un):
+                        unit_p = 1.0 if isKnown else 0.8
+                    p.append(unit_p)
 
                 pgm_player.add_factor(left=[], right=[cv],
                                       states=[0, 1],
                                       proba=p,
-                                      comment=cv + ' = 1')
+                                      comment='%s%s = 1' % cv)
                 pgm_player.add_factor(left=[cv], right=[pv],
                                       states=[1, 0, 1, 1],
                                       proba=p_fwd,
-                                      comment=cv + ' -> ' + pv)
-                #print cv + ' = 1: (' + lname + ', ' + str(unit) + ', ' + str(p) + ')'
+                                      comment='%s%s -> %s%s' % (cv + pv))
+                #print cv + ' = 1: (' + lname + ', ' + str(p) + ')'
                 #print cv + ' -> ' + pv
 
-                if (lt.variable, lname, str(unit)) not in self.pred2pgmvar:
-                    self.pred2pgmvar[(lt.variable, lname, str(unit))] = pv
+                self.register_pgmvar(lt.variable, lname, units, pv)
 
 
-    def process_df_constraints(self, pgm_player, unit):
+    def process_df_constraints(self, pgm_player, units):
         for (lt, lname, rt, rname, df_type) in con.df_constraints:
             if self.ENABLE_SCOPER and self.con_scoper.should_exclude_constraint([lt, rt]):
                 continue
@@ -182,111 +411,103 @@ class ConstraintSolver:
             var1 = con.variables.get((lt.variable, lname))
             var2 = con.variables.get((rt.variable, rname))
             if var1 and var2 and (var1 != var2):
-                pv1 = 'p'+ str(var1)
-                pv2 = 'p'+ str(var2)
+                pv1 = ('p', var1)
+                pv2 = ('p', var2)
                 pgm_player.add_factor(left=[pv1], right=[pv2],
                                       states=[1, 0, 1, 1],
                                       proba=0.95,
-                                      comment=pv1 + ' -> ' + pv2)
+                                      comment='%s%s -> %s%s' % (pv1 + pv2))
                 pgm_player.add_factor(left=[pv2], right=[pv1],
                                       states=[1, 0, 1, 1], 
                                       proba=0.95,
-                                      comment=pv2 + ' -> ' + pv1)
+                                      comment='%s%s -> %s%s' % (pv2 + pv1))
                 #print pv1 + ' -> ' + pv2
                 #print pv2 + ' -> ' + pv1
 
-                if (lt.variable, lname, str(unit)) not in self.pred2pgmvar:
-                    self.pred2pgmvar[(lt.variable, lname, str(unit))] = pv1
-                if (rt.variable, rname, str(unit)) not in self.pred2pgmvar:
-                    self.pred2pgmvar[(rt.variable, rname, str(unit))] = pv2               
+                self.register_pgmvar(lt.variable, lname, units, pv1)
+                self.register_pgmvar(rt.variable, rname, units, pv2)
 
             else:
                 if lt.isKnown and (not rt.isKnown):
-                    dv2 = 'd'+ str(var2)
-                    pv2 = 'p'+ str(var2)
-                    p = 0.95 if (lt.units[0] == unit) else 0.0
+                    dv2 = ('d', var2)
+                    pv2 = ('p', var2)
+                    p = [0.95 if (lt.units[0] == unit) else 0.0 for unit in units]
                     pgm_player.add_factor(left=[], right=[dv2],
                                           states=[0, 1],
                                           proba=p,
-                                          comment=dv2 + ' = 1')
+                                          comment='%s%s = 1' % dv2)
                     pgm_player.add_factor(left=[dv2], right=[pv2],
                                           states=[1, 0, 1, 1], 
                                           proba=0.95,
-                                          comment=dv2 + ' -> ' + pv2)
-                    #print dv2 + ' = 1: (' + rname + ', ' + str(unit) + ', ' + str(p) + ')'
+                                          comment='%s%s -> %s%s' % (dv2 + pv2))
+                    #print dv2 + ' = 1: (' + rname + ', ' + str(p) + ')'
                     #print dv2 + ' -> ' + pv2
                     
-                    if (rt.variable, rname, str(unit)) not in self.pred2pgmvar:
-                        self.pred2pgmvar[(rt.variable, rname, str(unit))] = pv2
+                    self.register_pgmvar(rt.variable, rname, units, pv2)
                 elif rt.isKnown and (not lt.isKnown):
-                    dv1 = 'd'+ str(var1)
-                    pv1 = 'p'+ str(var1)
-                    p = 0.95 if (rt.units[0] == unit) else 0.0
+                    dv1 = ('d', var1)
+                    pv1 = ('p', var1)
+                    p = [0.95 if (rt.units[0] == unit) else 0.0 for unit in units]
                     pgm_player.add_factor(left=[], right=[dv1],
                                           states=[0, 1],
                                           proba=p,
-                                          comment=dv1 + ' = 1')
+                                          comment='%s%s = 1' % dv1)
                     pgm_player.add_factor(left=[dv1], right=[pv1],
                                           states=[1, 0, 1, 1], 
                                           proba=0.95,
-                                          comment=dv1 + ' -> ' + pv1)
-                    #print dv1 + ' = 1: (' + lname + ', ' + str(unit) + ', ' + str(p) + ')'
+                                          comment='%s%s -> %s%s' % (dv1 + pv1))
+                    #print dv1 + ' = 1: (' + lname + ', ' + str(p) + ')'
                     #print dv1 + ' -> ' + pv1
                     
-                    if (lt.variable, lname, str(unit)) not in self.pred2pgmvar:
-                        self.pred2pgmvar[(lt.variable, lname, str(unit))] = pv1
+                    self.register_pgmvar(lt.variable, lname, units, pv1)
 
          
-    def process_cf_constraints(self, pgm_player, unit):
-        for (t, name, units, cf_type) in con.conversion_factor_constraints:
+    def process_cf_constraints(self, pgm_player, units):
+        for (t, name, units_, cf_type) in con.conversion_factor_constraints:
             var = con.variables.get((t.variable, name))
             if var:
-                fv = 'f'+ str(var)
-                pv = 'p'+ str(var)
-                p = 0.0
-                if (units[0] == unit):
-                    p = 0.95 if (cf_type == con.CF_3) else 0.9 
+                fv = ('f', var)
+                pv = ('p', var)
+                p = []
+                for unit in units:
+                    unit_p = 0.0
+                    if (units_[0] == unit):
+                        unit_p = 0.95 if (cf_type == con.CF_3) else 0.9 
+                    p.append(unit_p)
 
                 pgm_player.add_factor(left=[], right=[fv],
                                       states=[0, 1],
                                       proba=p,
-                                      comment=fv + ' = 1')
+                                      comment='%s%s = 1' % fv)
                 pgm_player.add_factor(left=[fv], right=[pv],
                                       states=[1, 0, 1, 1],
                                       proba=0.95,
-                                      comment=fv + ' -> ' + pv)
-                #print fv + ' = 1: (' + name + ', ' + str(unit) + ', ' + str(p) + ')'
+                                      comment='%s%s -> %s%s' % (fv + pv))
+                #print fv + ' = 1: (' + name + ', ' + str(p) + ')'
                 #print fv + ' -> ' + pv
 
-                if (t.variable, name, str(unit)) not in self.pred2pgmvar:
-                    self.pred2pgmvar[(t.variable, name, str(unit))] = pv
+                self.register_pgmvar(t.variable, name, units, pv)
 
 
-    def process_ks_constraints(self, pgm_player, unit):
+    def process_ks_constraints(self, pgm_player, units):
         for var, ks_con in con.known_symbol_constraints.items():
-            (token, name, units) = ks_con[0]
+            (token, name, units_) = ks_con[0]
             var = con.variables.get((token.variable, name))
             if var:
-                kv = 'k'+ str(var)
-                pv = 'p'+ str(var)
-                p = 0.0
+                kv = ('k', var)
+                pv = ('p', var)
                 for (t, n, un) in ks_con:
-                    p = 0.0
-                    if (un[0] == unit):
-                        p = 0.95
+                    p = [0.95 if (un[0] == unit) else 0.0 for unit in units]
 
                     pgm_player.add_factor(left=[], right=[kv],
                                           states=[0, 1],
                                           proba=p,
-                                          comment=kv + ' = 1')
+                                          comment='%s%s = 1' % kv)
                     pgm_player.add_factor(left=[kv], right=[pv],
                                           states=[1, 0, 1, 1],
                                           proba=0.95,
-                                          comment=kv + ' -> ' + pv)
-                    #print kv + ' = 1: (' + name + ', ' + str(unit) + ', ' + str(p) + ')'
+                                          comment='%s%s -> %s%s' % (kv + pv))
+                    #print kv + ' = 1: (' + name + ', ' + str(p) + ')'
                     #print kv + ' -> ' + pv
 
-                    if (token.variable, name, str(unit)) not in self.pred2pgmvar:
-                        self.pred2pgmvar[(token.variable, name, str(unit))] = pv
-
-
+                    self.register_pgmvar(token.variable, name, units, pv)
@@ -2,26 +2,141 @@ import sys
 
 this = sys.modules[__name__]
 
-this.var_count = 0
-this.variables = {}
-this.non_unit_variables = []
-this.int_unit_variables = []
-this.multi_unit_variables = []
-this.dimensionless_variables = []
-this.known_unit_variables = {}
-
-this.naming_constraints = {}
-this.df_constraints = []
-this.unique_df_constraints = []
-this.computed_unit_constraints = {}
-this.conversion_factor_constraints = []
-this.unique_cf_constraints = []
-this.known_symbol_constraints = {}
-
-this.excluded_cu_constraints = []
-this.derived_cu_constraints = []
-
-this.units = []
+
+def freeze(value):
+    ''' HASHABLE STAND-IN FOR value THAT IS EQUAL EXACTLY WHEN THE ORIGINALS COMPARE EQUAL WITH ==
+        (dicts AND lists OF UNITS SHOW UP INSIDE MANY CONSTRAINT TUPLES)
+        '''
+    if isinstance(value, dict):
+        return (dict, frozenset((k, freeze(v)) for k, v in value.items()))
+    if isinstance(value, list):
+        return (list, tuple(freeze(v) for v in value))
+    if isinstance(value, tuple):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(value)
+    return value
+
+
+def index_key(value):
+    # MOST ENTRIES ARE ALREADY HASHABLE (variable, name) TUPLES;  freeze(value) == value FOR THOSE
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return freeze(value)
+
+
+class UniqueList(list):
+    ''' APPEND-ONLY list WITH A HASH INDEX, SO 'in' IS O(1) AND ITERATION STAYS IN INSERTION ORDER.
+        HOT PATHS WITH PLAIN HASHABLE KEYS TEST 'key in unique_list.index' DIRECTLY
+        '''
+    def __init__(self, values=()):
+        list.__init__(self)
+        self.index = set()
+        self.has_unhashable = False
+        self.extend(values)
+
+    def __contains__(self, value):
+        try:
+            if index_key(value) in self.index:
+                return True
+        except TypeError:
+            return list.__contains__(self, value)
+        # ANYTHING WE COULD NOT HASH CAN ONLY BE FOUND BY SCANNING
+        return self.has_unhashable and list.__contains__(self, value)
+
+    def append(self, value):
+        try:
+            self.index.add(index_key(value))
+        except TypeError:
+            self.has_unhashable = True
+        list.append(self, value)
+
+    def extend(self, values):
+        for value in values:
+            self.append(value)
+
+    def __iadd__(self, values):
+        self.extend(values)
+        return self
+
+    def _append_only(self, *args, **kwargs):
+        raise TypeError('UniqueList is append-only')
+
+    __setitem__ = __delitem__ = __setslice__ = __delslice__ = insert = remove = pop = _append_only
+    sort = reverse = _append_only
+
+
+class TopUnitProbas(object):
+    ''' variable2unitproba KEPT AS ARRAYS INDEXED BY CONSTRAINT VARIABLE ID: EACH VARIABLE'S
+        (unit, proba) PAIRS WITH ONE OF ITS k HIGHEST DISTINCT PROBABILITIES, TIES INCLUDED,
+        HIGHEST FIRST AND TIES IN UNIT ORDER.  READS LIKE THE dict OF SORTED LISTS IT STANDS
+        FOR, (token.variable, name) -> [(unit, proba), ...], CUT TO WHAT THE TOP-k TESTS SEE
+        '''
+    def __init__(self, units, key2var, start, unit_index, proba):
+        self.units = units
+        # (token.variable, name) -> CONSTRAINT VARIABLE ID, FOR THE VARIABLES WITH PAIRS
+        self.key2var = key2var
+        # PAIRS OF VARIABLE var ARE unit_index[start[var]:start[var + 1]], proba[...] LIKEWISE
+        self.start = start
+        self.unit_index = unit_index
+        self.proba = proba
+
+    def __contains__(self, key):
+        return key in self.key2var
+
+    def __getitem__(self, key):
+        var = self.key2var[key]
+        begin, end = self.start[var], self.start[var + 1]
+        return [(self.units[k], float(p)) for k, p in zip(self.unit_index[begin:end], self.proba[begin:end])]
+
+    def get(self, key, default=None):
+        return self[key] if key in self.key2var else default
+
+    def __iter__(self):
+        return iter(self.key2var)
+
+    def __len__(self):
+        return len(self.key2var)
+
+    def keys(self):
+        return self.key2var.keys()
+
+    def iteritems(self):
+        for key in self.key2var:
+            yield key, self[key]
+
+    def items(self):
+        return list(self.iteritems())
+
+
+def reset_constraint_store():
+    this.var_count = 0
+    this.variables = {}
+    this.non_unit_variables = UniqueList()
+    this.int_unit_variables = UniqueList()
+    this.multi_unit_variables = UniqueList()
+    this.dimensionless_variables = UniqueList()
+    this.known_unit_variables = {}
+
+    this.naming_constraints = {}
+    this.df_constraints = []
+    # (token.Id, name) -> [(rtoken, rname), ...]  FOR is_df_constraint_present
+    this.df_constraints_by_token = {}
+    this.unique_df_constraints = UniqueList()
+    this.computed_unit_constraints = {}
+    this.conversion_factor_constraints = []
+    this.unique_cf_constraints = UniqueList()
+    this.known_symbol_constraints = {}
+
+    this.excluded_cu_constraints = UniqueList()
+    this.derived_cu_constraints = UniqueList()
+
+    this.units = UniqueList()
+
+
+reset_constraint_store()
 
 this.variable2unitproba = {}
 this.phys_corrections = {}
@@ -43,7 +158,7 @@ def reset_constraints():
     #this.naming_constraints = {}
     #this.df_constraints = []
     this.computed_unit_constraints = {}
-    this.multi_unit_variables = []
+    this.multi_unit_variables = UniqueList()
     this.known_unit_variables = {}
     #this.conversion_factor_constraints = []
     #this.known_symbol_constraints = {}
@@ -51,21 +166,21 @@ def reset_constraints():
 
 
 def add_non_unit_variable(token, name):
-    if (token.variable, name) not in this.non_unit_variables:
+    if (token.variable, name) not in this.non_unit_variables.index:
         this.non_unit_variables.append((token.variable, name))
 
 
 def is_non_unit_variable(token, name):
-    return ((token.variable, name) in this.non_unit_variables)
+    return ((token.variable, name) in this.non_unit_variables.index)
 
 
 def add_int_unit_variable(token, name):
-    if (token.variable, name) not in this.int_unit_variables:
+    if (token.variable, name) not in this.int_unit_variables.index:
         this.int_unit_variables.append((token.variable, name))
 
 
 def is_int_unit_variable(token, name):
-    return ((token.variable, name) in this.int_unit_variables)
+    return ((token.variable, name) in this.int_unit_variables.index)
 
 
 def add_multi_unit_variable(root_token, token, name, units, isKnownRhs=False):
@@ -74,10 +189,14 @@ def add_multi_unit_variable(root_token, token, name, units, isKnownRhs=False):
 
 
 def add_dimensionless_variable(token, name):
-    if (token.variable, name) not in this.dimensionless_variables:
+    if (token.variable, name) not in this.dimensionless_variables.index:
         this.dimensionless_variables.append((token.variable, name))
 
 
+def is_dimensionless_variable(token, name):
+    return ((token.variable, name) in this.dimensionless_variables.index)
+
+
 def add_known_unit_variable(token, name, isKnown, isUnknown):
     knownStatus = this.known_unit_variables.get((token.variable, name))
     if not knownStatus:
@@ -132,6 +251,11 @@ def add_nm_constraint(token, name, unitprobalist):
 
 def is_nm_constraint_present(var):
     return (var in this.naming_constraints)
+
+
+def is_nm_constraint_empty(var):
+    # THE [({}, 0.0)] NAMING CONSTRAINT OF A NAME THE TYPE MINER COULD NOT PREDICT
+    return this.naming_constraints[var][2] == [({}, 0.0)]
  
 
 def add_cu_constraint(ltoken, lname, units, isKnown):
@@ -195,19 +319,24 @@ def add_df_constraint(ltoken, lname, rtoken, rname, df_type):
         this.track_unit(rtoken.units[0])
 
     if df_type == this.DF_2:
-        if ((ltoken.variable, lname, rtoken.variable, rname, df_type) not in this.unique_df_constraints) and \
-                ((rtoken.variable, rname, ltoken.variable, lname, df_type) not in this.unique_df_constraints):
+        if ((ltoken.variable, lname, rtoken.variable, rname, df_type) not in this.unique_df_constraints.index) and \
+                ((rtoken.variable, rname, ltoken.variable, lname, df_type) not in this.unique_df_constraints.index):
             this.unique_df_constraints.append((ltoken.variable, lname, rtoken.variable, rname, df_type))
-            this.df_constraints.append((ltoken, lname, rtoken, rname, df_type))
+            this.append_df_constraint(ltoken, lname, rtoken, rname, df_type)
     else:
-        this.df_constraints.append((ltoken, lname, rtoken, rname, df_type)) 
+        this.append_df_constraint(ltoken, lname, rtoken, rname, df_type)
+
+
+def append_df_constraint(ltoken, lname, rtoken, rname, df_type):
+    this.df_constraints.append((ltoken, lname, rtoken, rname, df_type))
+    this.df_constraints_by_token.setdefault((ltoken.Id, lname), []).append((rtoken, rname))
 
 
 def is_df_constraint_present(token, name):
-    for (lt, lname, rt, rname, df_type) in this.df_constraints:
-        if (lt.Id == token.Id) and (lname == name):
-            if not (rt.isKnown or this.is_only_known_unit_variable(rt.variable, rname)):
-                return True
+    # isKnown CHANGES BETWEEN CALLS, SO ONLY THE LOOKUP IS INDEXED
+    for (rt, rname) in this.df_constraints_by_token.get((token.Id, name), []):
+        if not (rt.isKnown or this.is_only_known_unit_variable(rt.variable, rname)):
+            return True
     return False
 
 
@@ -7,6 +7,9 @@ from str_utils import *
 from time import gmtime, strftime
 import os
 import pickle
+import hashlib
+import click
+from training_index import TrainingIndex, write_training_index
 
 
 VAR_SIM_FACTOR = 0.0
@@ -27,8 +30,22 @@ class TypeMiner(object):
         self.suffix2type = {}
 
 
-    def train(self, should_reuse_training=False):
+    def train(self, should_reuse_training=False, index_file=None):
         _log("starting init raw data ... %s " % strftime("%Y-%m-%d %H:%M:%S", gmtime()))
+        self.load_training_data(should_reuse_training, index_file)
+        _log("starting init suffix data... %s " % strftime("%Y-%m-%d %H:%M:%S", gmtime()))
+        self._init_suffix_data()
+        _log("ending init raw data ... %s " % strftime("%Y-%m-%d %H:%M:%S", gmtime()))
+
+
+    def load_training_data(self, should_reuse_training=False, index_file=None):
+        ''' FILLS self.vars AND self.var2type FROM, IN ORDER OF PREFERENCE, THE TrainingIndex AT
+            index_file, THE PKL FILES OF AN EARLIER RUN IF should_reuse_training, OR THE TRAINING
+            FILE.  AN index_file THAT IS MISSING, OF ANOTHER VERSION OR BUILT FROM ANOTHER TRAINING
+            FILE IS (RE)BUILT FROM WHAT WAS LOADED INSTEAD
+            '''
+        if index_file and self._load_training_index(index_file):
+            return
         # VARIABLES FOR REUSING 'TRAINING'
         self_vars_pkl_filename = './datamining_self_vars.pkl'
         self_var2type_pkl_filename = './datamining_self_var2type.pkl'
@@ -46,10 +63,41 @@ class TypeMiner(object):
                 # SAVE CURRENT DATA FOR POSSIBLE REUSE
                 pickle.dump(self.vars, open(self_vars_pkl_filename, 'wb'))
                 pickle.dump(self.var2type, open(self_var2type_pkl_filename, 'wb'))
-
-        _log("starting init suffix data... %s " % strftime("%Y-%m-%d %H:%M:%S", gmtime()))
-        self._init_suffix_data()
-        _log("ending init raw data ... %s " % strftime("%Y-%m-%d %H:%M:%S", gmtime()))
+        if index_file:
+            self.build_training_index(index_file)
+
+
+    def build_training_index(self, index_file):
+        # COMPILE THE LOADED var2type FOR LATER RUNS AND WORKERS TO MAP
+        write_training_index(index_file, self.var2type, self.training_digest())
+        _log("wrote training index %s: %d terms" % (index_file, len(self.var2type)))
+
+
+    def _load_training_index(self, index_file):
+        try:
+            index = TrainingIndex(index_file)
+        except (IOError, ValueError) as e:
+            _log("not using training index %s: %s" % (index_file, e))
+            return False
+        digest = self.training_digest()
+        if digest and index.source_digest != digest:
+            _log("not using training index %s: built from another %s" % (index_file, self.training_file))
+            index.close()
+            return False
+        # predict_proba ONLY ASKS self.vars FOR DISTINCT TERMS, THE INDEX KEEPS HOW OFTEN EACH WAS SEEN.
+        # IT READS EVERY TERM'S COUNTS ON EVERY QUERY, SO THEY ARE DECODED INTO A DICT ONCE HERE
+        self.vars = list(index)
+        self.var2type = index.to_dict()
+        index.close()
+        return True
+
+
+    def training_digest(self):
+        # SHA1 OF THE TRAINING FILE, '' WHEN THERE IS NONE TO CHECK AN INDEX AGAINST
+        if not self.training_file or not os.path.exists(self.training_file):
+            return ''
+        with open(self.training_file, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
 
 
     def _init_raw_data(self):
@@ -230,3 +278,21 @@ class TypeMiner(object):
         return 1.0 - get_jarowinkler_dist(name, suffix)
 
 
+@click.command()
+@click.argument('index_file')
+@click.option('--training_file', default='./DATA/2017_06_16_var_names_units_all.txt',
+              help='variable name, unit lines to extract the terms from')
+@click.option('--reuse_training', is_flag=True, help='start from the pkl files of an earlier run if present')
+def main(index_file, training_file, reuse_training):
+    ''' BUILD STEP: COMPILES THE TRAINING DATA INTO THE TrainingIndex FILE index_file,
+        FOR train(index_file=...) TO MAP INSTEAD OF UNPICKLING OR RE-TAGGING IT
+
+        usage:  python datamining.py --reuse_training DATA/training_index.bin
+    '''
+    type_miner = TypeMiner(training_file, None, None)
+    type_miner.load_training_data(reuse_training)
+    type_miner.build_training_index(index_file)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,19 +6,44 @@ import operator
 from str_utils import *
 from time import gmtime, strftime
 import os
+import hashlib
+import pattern
+import perf_stats
 
 
 VAR_SIM_FACTOR = 0.0
 SUFFIX_SIM_FACTOR = 1.0
+# TERMS WHOSE SUFFIX SIMILARITIES EACH TypeMiner KEEPS, CLEARED WHEN FULL
+TERM_CACHE_SIZE = 4096
+# BUMP WHEN predict_proba GIVES DIFFERENT ESTIMATIONS FOR THE SAME SUFFIX DATA, E.G. A NEW
+# EXCLUDED NOUN, SO THE ENTRIES OF THE PERSISTENT NAMING CACHE (SEE naming_cache.py) MISS
+MINER_VERSION = 1
+# PART OF miner_key: ANOTHER pattern.en MAY TAG THE TERMS DIFFERENTLY
+POS_TAGGER_VERSION = getattr(pattern, '__version__', 'unknown')
+# TERMS WHOSE PARTS OF SPEECH EACH TypeMiner KEEPS, CLEARED WHEN FULL; THE LEXICON STAYS
+POS_CACHE_SIZE = 65536
 
 def _log(msg):
     print (msg)
 
 
 class TypeMiner(object):
-    def __init__(self, training_file, types_file, suffix_file):
+    def __init__(self, training_file, types_file, suffix_file, pos_lexicon_file=None):
         self.suffix_file = suffix_file
+        self.pos_lexicon_file = pos_lexicon_file
+        # TERM -> get_pos(TERM) FROM THE LEXICON FILE, LOADED ONLY IF THE TAGGER CANNOT RUN.  SEE tag_terms
+        self.pos_lexicon = {}
+        self.pos_lexicon_hash = None
+        self.pos_tagger_available = True
+        self.term2pos = {}
         self.suffix2type = {}
+        # SEE _index_suffixes AND _get_type_sims
+        self.suffix_order = []
+        self.trigram2suffixes = {}
+        self.term2type_sims = {}
+        # SHA1 OF THE SUFFIX FILE, AND A naming_cache.NamingCache predict_sorted CONSULTS, IF ANY
+        self.suffix_data_hash = None
+        self.naming_cache = None
         self.excluded_nouns = ['factor', 'threshold', 'vector', 'controller', 'range', 'motor', \
                                'granularity', 'trajectory', 'platform', \
                                'offset', 'constant', 'ratio', 'scale', \
@@ -36,16 +61,110 @@ class TypeMiner(object):
     def train(self, should_reuse_training=False):
         _log("starting init suffix data... %s " % strftime("%Y-%m-%d %H:%M:%S", gmtime()))
         self._init_suffix_data()
+        if self.pos_lexicon_file:
+            self._init_pos_lexicon()
         _log("ending init suffix data ... %s " % strftime("%Y-%m-%d %H:%M:%S", gmtime()))
 
 
+    def _init_pos_lexicon(self):
+        # THE TAGGER DECIDES EVERY TERM IT CAN TAG: THE LEXICON, 'term, wordnet pos' LINES, IS ONLY
+        # FOR A pattern.en OR wordnet WITHOUT ITS DATA, SO IT NEVER OVERRIDES A TAG THE TAGGER GIVES
+        try:
+            get_pos('velocity')
+            return
+        except (IOError, LookupError) as e:
+            _log('pos tagger unavailable, tagging with %s: %s' % (self.pos_lexicon_file, e))
+            self.pos_tagger_available = False
+        with open(self.pos_lexicon_file, 'rb') as f:
+            self.pos_lexicon_hash = hashlib.sha1(f.read()).hexdigest()
+        with open(self.pos_lexicon_file) as f:
+            for lexicon_item in (line.rstrip('\n') for line in f):
+                if not lexicon_item.strip() or lexicon_item.startswith('#'):
+                    continue
+                term, pos = lexicon_item.split(',', 1)
+                term, pos = term.strip(), pos.strip()
+                self.pos_lexicon[term] = [(term, pos)]
+
+
     def _init_suffix_data(self):
         # LOAD VARIABLE SUFFIX AND TYPE DATA
+        with open(self.suffix_file, 'rb') as f:
+            self.suffix_data_hash = hashlib.sha1(f.read()).hexdigest()
         with open(self.suffix_file) as f:
             for suffix_item in (line.rstrip('\n') for line in f):
                 suffix, unit_type = suffix_item.split(',', 1)
                 suffix, unit_type = suffix.strip(), unit_type.strip()
                 self.suffix2type[suffix] = unit_type
+        self._index_suffixes()
+
+
+    def _index_suffixes(self):
+        # THE ORDER predict_proba'S suffix2sim DICTS LIST THE SUFFIXES IN, AND THE SUFFIXES BY
+        # THEIR FIRST 3 CHARS: _compute_suffix_start_distance ONLY MATCHES A COMMON STRING OF 3
+        # OR MORE CHARS THAT STARTS LIKE THE SUFFIX, SO ANY OTHER SUFFIX IS AT DISTANCE 1
+        self.suffix_order = list({s: None for s in self.suffix2type})
+        self.trigram2suffixes = {}
+        for suffix in self.suffix_order:
+            if len(suffix) >= 3:
+                self.trigram2suffixes.setdefault(suffix[:3], []).append(suffix)
+        self.term2type_sims = {}
+
+
+    def _get_type_sims(self, term):
+        ''' (UNIT TYPE, SIMILARITY) PAIRS OF term, ONE PER TYPE AT ITS MOST SIMILAR SUFFIX,
+            MOST SIMILAR FIRST AND TIES IN suffix2sim ORDER, AS SORTING THE SIMILARITIES TO
+            EVERY SUFFIX GIVES THEM.  ONLY THE SUFFIXES WHOSE FIRST 3 CHARS OCCUR IN term ARE
+            COMPARED, THE REST ARE 0.0 SIMILAR.  MEMOIZED PER TERM
+        '''
+        type_sims = self.term2type_sims.get(term)
+        if type_sims is not None:
+            perf_stats.count_hit('term_suffix_cache')
+            return type_sims
+        perf_stats.count_miss('term_suffix_cache')
+
+        _extract_suffix_distance = self._extract_suffix_distance
+        suffix2sim = {}
+        for i in range(len(term) - 2):
+            for suffix in self.trigram2suffixes.get(term[i:i + 3], ()):
+                if suffix not in suffix2sim:
+                    suffix2sim[suffix] = 1.0 - _extract_suffix_distance(term, suffix)
+        suffix_sims = sorted(((s, suffix2sim.get(s, 0.0)) for s in self.suffix_order),
+                             key=operator.itemgetter(1), reverse=True)
+        seen = set()
+        type_sims = []
+        for suffix, sim in suffix_sims:
+            t = self.suffix2type[suffix]
+            # LATER SUFFIXES OF A TYPE ARE NO MORE SIMILAR
+            if t not in seen:
+                seen.add(t)
+                type_sims.append((t, sim))
+        type_sims = tuple(type_sims)
+
+        if len(self.term2type_sims) >= TERM_CACHE_SIZE:
+            self.term2type_sims.clear()
+        self.term2type_sims[term] = type_sims
+        return type_sims
+
+
+    def miner_key(self):
+        # WHAT predict_proba DEPENDS ON BESIDES THE NAME, FOR NAMING CACHE KEYS
+        return '%d:%s:%s:%s' % (MINER_VERSION, self.suffix_data_hash, self.pos_lexicon_hash, POS_TAGGER_VERSION)
+
+
+    def predict_sorted(self, vname):
+        ''' predict_proba's (UNIT STRING, PROBABILITY) ITEMS, MOST PROBABLE FIRST AND TIES IN
+            REVERSE DICT ORDER, AS A NEW LIST.  THE LIST IS WHAT self.naming_cache KEEPS, SO A
+            RUN READING IT BACK SORTS THE TIES JUST AS THE RUN THAT COMPUTED IT
+        '''
+        if self.naming_cache is not None:
+            estimations = self.naming_cache.get(vname)
+            if estimations is not None:
+                return estimations
+        estimations = sorted(self.predict_proba(vname).items(), key=operator.itemgetter(1))
+        estimations.reverse()
+        if self.naming_cache is not None:
+            self.naming_cache.put(vname, estimations)
+        return estimations
 
 
     def predict_proba(self, vname):
@@ -62,11 +181,7 @@ class TypeMiner(object):
         while i<=n:
             term = terms[-i]
 
-            _extract_suffix_distance = self._extract_suffix_distance
-            suffix2sim = {s: (1.0 - _extract_suffix_distance(term, s)) for s in self.suffix2type}
-            suffix_sims = sorted(suffix2sim.iteritems(), key=operator.itemgetter(1), reverse=True)
-            for suffix, sim in suffix_sims:
-                t = self.suffix2type[suffix]
+            for t, sim in self._get_type_sims(term):
                 if t not in type2maxsim:
                     type2maxsim[t] = sim
                 elif sim > type2maxsim[t]:
@@ -102,11 +217,7 @@ class TypeMiner(object):
 
         type2maxsim = {}
         
-        _extract_suffix_distance = self._extract_suffix_distance
-        suffix2sim = {s: (1.0 - _extract_suffix_distance(term, s)) for s in self.suffix2type}
-        suffix_sims = sorted(suffix2sim.iteritems(), key=operator.itemgetter(1), reverse=True)
-        for suffix, sim in suffix_sims:
-            t = self.suffix2type[suffix]
+        for t, sim in self._get_type_sims(term):
             if t not in type2maxsim:
                 type2maxsim[t] = sim
             elif sim > type2maxsim[t]:
@@ -178,11 +289,51 @@ class TypeMiner(object):
         return names
 
 
+    def prepare_names(self, names):
+        ''' TAGS THE TERMS OF ALL THE GIVEN VARIABLE NAMES, E.G. EVERY VARIABLE TOKEN OF A FILE,
+            UP FRONT, EACH DISTINCT TERM ONCE, SO THE predict_proba CALLS THAT FOLLOW FIND THEM TAGGED
+        '''
+        terms = set()
+        for name in names:
+            if self.naming_cache is not None and name in self.naming_cache:
+                # predict_sorted WILL NOT ASK
+                continue
+            terms.update(term for term in self._split_var(name)
+                         if len(term) > 1 and term not in self.excluded_nouns)
+        self.tag_terms(terms)
+
+
+    def tag_terms(self, terms):
+        ''' get_pos OF EACH OF terms, BY TERM, FROM THE CACHE OR THE TAGGER.  THE TAGGER SEES ONE
+            TERM AT A TIME AS BEFORE: TAGGING THE TERMS JOINED UP WOULD LET ITS CONTEXT RULES CHANGE
+            A TERM'S TAG BY ITS NEIGHBOURS.  IF train FOUND THE TAGGER UNABLE TO RUN, THE TERMS
+            COME FROM THE LEXICON INSTEAD, AND A TERM IT DOES NOT LIST IS NO NOUN
+        '''
+        term2pos = {}
+        for term in terms:
+            if not self.pos_tagger_available:
+                perf_stats.count('pos_cache.lexicon')
+                term2pos[term] = self.pos_lexicon.get(term, [(term, None)])
+                continue
+            pos = self.term2pos.get(term)
+            if pos is None:
+                perf_stats.count_miss('pos_cache')
+                pos = get_pos(term)
+                if len(self.term2pos) >= POS_CACHE_SIZE:
+                    self.term2pos.clear()
+                self.term2pos[term] = pos
+            else:
+                perf_stats.count_hit('pos_cache')
+            term2pos[term] = pos
+        return term2pos
+
+
     def _get_nouns(self, names):
         #nouns = [str(w) for w, t in get_pos(' '.join(names)) if t==wn.NOUN]
         nouns = []
+        term2pos = self.tag_terms(names)
         for name in names:
-            noun = [str(w) for w, t in get_pos(name) if t==wn.NOUN]
+            noun = [str(w) for w, t in term2pos[name] if t==wn.NOUN]
             if noun:
                 nouns.extend(noun)
             elif name in self.included_nouns:
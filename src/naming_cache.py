@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import atexit
+import json
+import os
+import sqlite3
+import sys
+import perf_stats
+
+
+# NEW ENTRIES ARE WRITTEN IN ONE TRANSACTION PER THIS MANY, AND AT EXIT
+FLUSH_SIZE = 256
+# SECONDS A WRITER WAITS FOR ANOTHER PROCESS'S TRANSACTION BEFORE GIVING UP ON ITS BATCH
+BUSY_TIMEOUT = 30.0
+
+
+class NamingCache(object):
+    ''' VARIABLE NAME -> SORTED ESTIMATION LIST OF A TypeMiner, KEPT IN AN SQLITE FILE SHARED BY
+        EVERY RUN AND WORKER.  ROWS ARE KEYED BY (NAME, MINER KEY): THE MINER KEY NAMES THE
+        MINER VERSION, SUFFIX DATA, POS LEXICON AND TAGGER VERSION THE LIST CAME FROM, SO A
+        CHANGE TO ANY OF THEM MISSES.
+        WAL MODE LETS READERS GO ON WHILE ONE PROCESS WRITES; NEW ROWS ARE BUFFERED AND
+        INSERTED OR IGNORED IN BATCHES, AND TWO WORKERS WRITING THE SAME NAME WRITE THE SAME LIST.
+        A FILE THAT CANNOT BE OPENED LEAVES THE CACHE IN MEMORY ONLY
+    '''
+
+    def __init__(self, path, miner_key):
+        self.path = path
+        self.miner_key = miner_key
+        self.name2estimations = {}
+        self.pending = []
+        self.connection = None
+        try:
+            directory = os.path.dirname(path)
+            if directory and not os.path.isdir(directory):
+                os.makedirs(directory)
+            self.connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('CREATE TABLE IF NOT EXISTS predictions '
+                                    '(name TEXT, miner TEXT, estimations TEXT, PRIMARY KEY (name, miner))')
+            self.connection.commit()
+        except (OSError, sqlite3.Error) as e:
+            sys.stderr.write('naming cache %s not usable, keeping predictions in memory: %s\n' % (path, e))
+            self.connection = None
+        atexit.register(self.close)
+
+    def __contains__(self, name):
+        # WHETHER get(name) WOULD FIND A LIST, NOT COUNTED AS A LOOKUP
+        return self._load(name) is not None
+
+    def get(self, name):
+        ''' THE ESTIMATION LIST STORED FOR name, A NEW LIST OF (UNIT STRING, PROBABILITY), OR None
+        '''
+        estimations = self._load(name)
+        if estimations is None:
+            perf_stats.count_miss('naming_cache')
+            return None
+        perf_stats.count_hit('naming_cache')
+        return list(estimations)
+
+    def _load(self, name):
+        estimations = self.name2estimations.get(name)
+        if estimations is None and self.connection is not None:
+            row = self.connection.execute('SELECT estimations FROM predictions WHERE name = ? AND miner = ?',
+                                          (name, self.miner_key)).fetchone()
+            if row is not None:
+                # JSON KEEPS THE FLOATS' repr, SO THE PROBABILITIES COME BACK BIT FOR BIT
+                estimations = tuple((str(u), p) for u, p in json.loads(row[0]))
+                self.name2estimations[name] = estimations
+        return estimations
+
+    def put(self, name, estimations):
+        self.name2estimations[name] = tuple(estimations)
+        if self.connection is None:
+            return
+        self.pending.append((name, self.miner_key, json.dumps(list(estimations))))
+        if len(self.pending) >= FLUSH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.connection is None or not self.pending:
+            return
+        try:
+            with self.connection:
+                self.connection.executemany('INSERT OR IGNORE INTO predictions VALUES (?, ?, ?)', self.pending)
+        except sqlite3.Error as e:
+            # ANOTHER WRITER HELD THE FILE TOO LONG, THESE ROWS ARE LEFT TO A LATER RUN
+            sys.stderr.write('naming cache %s: %d predictions not written: %s\n' % (self.path, len(self.pending), e))
+        self.pending = []
+
+    def close(self):
+        if self.connection is None:
+            return
+        self.flush()
+        self.connection.close()
+        self.connection = None
@@ -0,0 +1,45 @@
+import sys
+
+this = sys.modules[__name__]
+
+this.counters = {}
+
+
+def reset_stats():
+    this.counters = {}
+
+
+def count(name, n=1):
+    this.counters[name] = this.counters.get(name, 0) + n
+
+
+def count_hit(cache_name):
+    count(cache_name + '.hit')
+
+
+def count_miss(cache_name):
+    count(cache_name + '.miss')
+
+
+def hit_rate(cache_name):
+    hits = this.counters.get(cache_name + '.hit', 0)
+    misses = this.counters.get(cache_name + '.miss', 0)
+    if not (hits + misses):
+        return 0.0
+    return hits * 1.0 / (hits + misses)
+
+
+def print_stats():
+    print "Profiling Stats:"
+    caches = sorted(set(k.rsplit('.', 1)[0] for k in this.counters
+                        if k.endswith('.hit') or k.endswith('.miss')))
+    for cache_name in caches:
+        hits = this.counters.get(cache_name + '.hit', 0)
+        misses = this.counters.get(cache_name + '.miss', 0)
+        print '  %s: %d hits, %d misses, %.1f%% hit rate' % (cache_name, hits, misses,
+                                                              100.0 * hit_rate(cache_name))
+    for name in sorted(this.counters):
+        if name.endswith('.hit') or name.endswith('.miss'):
+            continue
+        print '  %s: %s' % (name, this.counters[name])
+
@@ -0,0 +1,599 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import multiprocessing
+import numpy as np
+from collections import OrderedDict
+from pgm import Variable, Factor, FactorGraph, PGMEngine, is_numpy_algorithm
+from numpy_bp import normalize
+
+
+# a worker serves this many chunks before it is replaced, which keeps its memory bounded
+MAX_TASKS_PER_WORKER = 64
+
+# potential_product names a clique's variables with single einsum letters
+MAX_EXACT_TREEWIDTH = 20
+
+# workers -> multiprocessing.Pool, kept for the life of the process
+worker_pools = {}
+
+
+def get_worker_pool(workers):
+    if workers not in worker_pools:
+        worker_pools[workers] = multiprocessing.Pool(workers, maxtasksperchild=MAX_TASKS_PER_WORKER)
+    return worker_pools[workers]
+
+
+def split_components(factor_graph):
+    ''' the connected components of a FactorGraph or FactorGraphBatch (over the union of
+        its units' graphs), each a list of factor indices, in order of their first factor
+    '''
+    parent = {}
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for factor in factor_graph.factors:
+        ids = [v.id for v in factor.vars]
+        for i in ids:
+            parent.setdefault(i, i)
+        root = find(ids[0])
+        for i in ids[1:]:
+            other = find(i)
+            if other != root:
+                parent[other] = root
+
+    root2component = {}
+    components = []
+    for f, factor in enumerate(factor_graph.factors):
+        root = find(factor.vars[0].id)
+        if root not in root2component:
+            root2component[root] = []
+            components.append(root2component[root])
+        root2component[root].append(f)
+    return components
+
+
+class ComponentCache(object):
+    ''' marginals of loopy component runs by structural_signature, the least recently used
+        dropped beyond size entries; hits and misses count the lookups
+    '''
+
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries[key] = entry
+        return entry
+
+    def put(self, key, entry):
+        self.entries.pop(key, None)
+        self.entries[key] = entry
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+
+def rows_by_component(factor_component, kind_factor, ncomponents):
+    # per component, the rows of one kind of FactorArrays whose factor lies in it, in factor order
+    labels = factor_component[kind_factor]
+    order = np.argsort(labels, kind='mergesort')
+    return np.split(order, np.cumsum(np.bincount(labels, minlength=ncomponents))[:-1])
+
+
+class ComponentArrays(object):
+    ''' the factors of one component as arrays with a leading unit axis, over local
+        variable indices 0..n-1 in order of first appearance; a factor's inactive units see
+        all-ones tables.  unary_rows and pair_rows pick the component's rows of the graph's
+        FactorArrays
+    '''
+
+    def __init__(self, factor_graph, factor_indices, unary_rows, pair_rows):
+        arrays = factor_graph.arrays()
+        self.factor_indices = factor_indices
+        # factors over more than 2 or non-binary variables leave the component to the general algorithm
+        self.is_pairwise = len(unary_rows) + len(pair_rows) == len(factor_indices)
+        if self.is_pairwise:
+            # (factor, position in it, variable) in factor order gives the order of first appearance
+            unary_factor = arrays.unary_factor[unary_rows]
+            pair_factor = arrays.pair_factor[pair_rows]
+            factors = np.concatenate([unary_factor, pair_factor, pair_factor])
+            positions = np.concatenate([np.zeros(len(unary_rows) + len(pair_rows), dtype=int),
+                                        np.ones(len(pair_rows), dtype=int)])
+            ids = np.concatenate([arrays.unary_var[unary_rows], arrays.pair_vars[pair_rows, 0],
+                                  arrays.pair_vars[pair_rows, 1]])
+            ids = ids[np.lexsort((positions, factors))]
+            unique_ids, first = np.unique(ids, return_index=True)
+            self.var_ids = list(unique_ids[np.argsort(first)])
+            # per factor in factor order, 0 for unary and 1 for pairwise: how the two kinds interleave
+            self.factor_kinds = np.zeros(len(factor_indices), dtype=np.int8)
+            self.factor_kinds[np.searchsorted(factor_indices, pair_factor)] = 1
+        else:
+            self.factor_kinds = None
+            self.var_ids = []
+            seen = set()
+            for f in factor_indices:
+                for v in factor_graph.factors[f].vars:
+                    if v.id not in seen:
+                        seen.add(v.id)
+                        self.var_ids.append(v.id)
+        local = np.argsort(self.var_ids)
+        sorted_ids = np.array(self.var_ids, dtype=int)[local]
+
+        def to_local(ids):
+            return local[np.searchsorted(sorted_ids, ids)]
+
+        self.unary_vars = to_local(arrays.unary_var[unary_rows])
+        self.unary_states = arrays.unary_states[unary_rows]
+        self.unary_active = arrays.unary_active[unary_rows]
+        self.pair_vars = to_local(arrays.pair_vars[pair_rows]).reshape(-1, 2)
+        self.pair_tables = arrays.pair_tables[pair_rows]
+        self.pair_active = arrays.pair_active[pair_rows]
+        self.nunits = arrays.nunits
+        self.nvars = len(self.var_ids)
+
+    def is_tree(self):
+        # connected by construction, so n - 1 pairwise factors and no more means no cycle
+        return self.is_pairwise and len(self.pair_vars) == self.nvars - 1
+
+    def unary_products(self):
+        unary = np.ones((self.nunits, self.nvars, 2))
+        for i, states in zip(self.unary_vars, self.unary_states):
+            unary[:, i] *= states
+        return unary
+
+    def zero_prior_units(self):
+        ''' the units in which every prior of the component puts zero mass on state 1 and the
+            rest of the graph is symmetric under flipping every unpinned variable, so the
+            marginals are known without inference: pinned variables 0, all others 0.5
+        '''
+        if not self.is_pairwise:
+            return np.zeros(self.nunits, dtype=bool)
+        ok = np.ones(self.nunits, dtype=bool)
+        pinned = np.zeros((self.nunits, self.nvars), dtype=bool)
+        for i, states, active in zip(self.unary_vars, self.unary_states, self.unary_active):
+            ok &= ~active | ((states[:, 1] == 0.0) & (states[:, 0] > 0.0))
+            pinned[:, i] |= active
+        pair2product = {}
+        for (a, b), table in zip(self.pair_vars, self.pair_tables):
+            pa = pinned[:, a]
+            pb = pinned[:, b]
+            # next to a pinned variable the factor must not care about the other one
+            ok &= ~(pa & ~pb) | (table[:, 0, 0] == table[:, 0, 1])
+            ok &= ~(pb & ~pa) | (table[:, 0, 0] == table[:, 1, 0])
+            if a > b:
+                a, b = b, a
+                table = table.transpose(0, 2, 1)
+            free = (~pa & ~pb)[:, None, None]
+            product = pair2product.get((a, b), 1.0)
+            pair2product[(a, b)] = product * np.where(free, table, 1.0)
+        for product in pair2product.values():
+            ok &= (product[:, 0, 0] == product[:, 1, 1]) & (product[:, 0, 1] == product[:, 1, 0])
+        self.pinned = pinned
+        return ok
+
+    def zero_prior_marginals(self):
+        return np.where(self.pinned, 1.0, 0.5)
+
+
+def solve_tree(unary, pairs):
+    ''' exact marginals (unit, var, state) of a tree by two-pass sum-product.
+        unary (unit, var, state) holds the product of each variable's unary factors and pairs the
+        (a, b, table) of each pairwise factor, table indexed [unit][x_a][x_b]
+    '''
+    nunits, nvars = unary.shape[:2]
+    neighbours = [[] for _ in range(nvars)]
+    for a, b, table in pairs:
+        # stored at each end indexed [unit][x_here][x_there]
+        neighbours[a].append((b, table))
+        neighbours[b].append((a, table.transpose(0, 2, 1)))
+
+    # root at 0, parents before children
+    order = [0]
+    parent_table = {0: None}
+    children = [[] for _ in range(nvars)]
+    for v in order:
+        for u, table in neighbours[v]:
+            if u not in parent_table:
+                parent_table[u] = table.transpose(0, 2, 1)
+                children[v].append(u)
+                order.append(u)
+
+    # upward: h[v] is v's unary times everything its subtree sends it
+    h = unary.copy()
+    up = {}
+    for v in reversed(order[1:]):
+        for c in children[v]:
+            h[:, v] *= up[c]
+        up[v] = normalize(np.einsum('uab,ua->ub', parent_table[v], h[:, v]))
+    for c in children[0]:
+        h[:, 0] *= up[c]
+
+    # downward: what the rest of the tree tells each child through its parent
+    down = {0: np.ones((nunits, 2))}
+    beliefs = np.empty((nunits, nvars, 2))
+    for v in order:
+        beliefs[:, v] = normalize(h[:, v] * down[v])
+        kids = children[v]
+        if not kids:
+            continue
+        # products over the other children without dividing: prefix and suffix products
+        base = unary[:, v] * down[v]
+        prefix = [np.ones((nunits, 2))]
+        for c in kids[:-1]:
+            prefix.append(prefix[-1] * up[c])
+        suffix = np.ones((nunits, 2))
+        for j in reversed(range(len(kids))):
+            c = kids[j]
+            down[c] = normalize(np.einsum('uab,ub->ua', parent_table[c], base * prefix[j] * suffix))
+            suffix = suffix * up[c]
+    return beliefs
+
+
+def elimination_order(nvars, edges, max_width):
+    ''' a min-fill elimination order of the graph over 0..nvars-1 with the given edges, as
+        (variable, its neighbours when eliminated) steps, or None once the width passes max_width
+    '''
+    neighbours = [set() for _ in range(nvars)]
+    for a, b in edges:
+        if a != b:
+            neighbours[a].add(b)
+            neighbours[b].add(a)
+
+    def fill(v):
+        others = list(neighbours[v])
+        return sum(1 for i, x in enumerate(others) for y in others[i + 1:] if y not in neighbours[x])
+
+    max_width = min(max_width, MAX_EXACT_TREEWIDTH)
+    remaining = set(range(nvars))
+    steps = []
+    while remaining:
+        v = min(remaining, key=lambda v: (fill(v), len(neighbours[v]), v))
+        if len(neighbours[v]) > max_width:
+            return None
+        steps.append((v, sorted(neighbours[v])))
+        for x in neighbours[v]:
+            neighbours[x] |= neighbours[v]
+            neighbours[x].discard(x)
+            neighbours[x].discard(v)
+        remaining.discard(v)
+    return steps
+
+
+def potential_product(potentials, out_vars):
+    ''' the product of (vars, array) potentials, arrays indexed [unit][x_var]..., summed down to
+        out_vars and normalized per unit; a unit with no mass left becomes uniform
+    '''
+    letters = {}
+    for v in [v for vars_, _ in potentials for v in vars_] + list(out_vars):
+        letters.setdefault(v, 'abcdefghijklmnopqrstuvwxy'[len(letters)])
+    subscripts = ','.join('z' + ''.join(letters[v] for v in vars_) for vars_, _ in potentials)
+    values = np.einsum(subscripts + '->z' + ''.join(letters[v] for v in out_vars),
+                       *[array for _, array in potentials])
+    total = values.reshape(len(values), -1).sum(axis=1).reshape((-1,) + (1,) * len(out_vars))
+    return np.where(total > 0, values / np.where(total > 0, total, 1.0), 0.5 ** len(out_vars))
+
+
+def solve_junction_tree(unary, pairs, steps):
+    ''' exact marginals (unit, var, state) by sum-product over the clique tree of an elimination
+        order; unary and pairs as for solve_tree, steps from elimination_order
+    '''
+    nunits, nvars = unary.shape[:2]
+    position = {v: i for i, (v, _) in enumerate(steps)}
+    # step i's clique is its variable and its separator; the parent holds the separator's first eliminated
+    cliques = [(v,) + tuple(separator) for v, separator in steps]
+    parent = [min(position[x] for x in separator) if separator else None for v, separator in steps]
+    children = [[] for _ in steps]
+    for i, j in enumerate(parent):
+        if j is not None:
+            children[j].append(i)
+
+    # each factor goes to the clique of its first eliminated variable, which holds all of it
+    assigned = [[(clique, np.ones((nunits,) + (2,) * len(clique)))] for clique in cliques]
+    for v in range(nvars):
+        assigned[position[v]].append(((v,), unary[:, v]))
+    for a, b, table in pairs:
+        assigned[min(position[a], position[b])].append(((a, b), table))
+
+    # steps come leaves first, so children send up before their parent
+    up = [None] * len(steps)
+    for i, (v, separator) in enumerate(steps):
+        if parent[i] is not None:
+            up[i] = (tuple(separator), potential_product(assigned[i] + [up[c] for c in children[i]], separator))
+    down = [None] * len(steps)
+    beliefs = np.empty((nunits, nvars, 2))
+    for i in reversed(range(len(steps))):
+        incoming = assigned[i] + ([down[i]] if down[i] is not None else [])
+        beliefs[:, steps[i][0]] = potential_product(incoming + [up[c] for c in children[i]], (steps[i][0],))
+        for c in children[i]:
+            others = [up[o] for o in children[i] if o != c]
+            separator = up[c][0]
+            down[c] = (separator, potential_product(incoming + others, separator))
+    return beliefs
+
+
+def exact_convergence(nunits):
+    # (iterations, largest last belief change, converged, iterations saved by a decision) per unit
+    # of an answer found without iterating
+    return np.zeros(nunits, dtype=int), np.zeros(nunits), np.ones(nunits, dtype=bool), np.zeros(nunits, dtype=int)
+
+
+def merge_convergence(convergence, units, other):
+    # fold another run's convergence over the given units in: most iterations, largest change,
+    # all converged, most saved
+    iterations, max_diff, converged, saved = convergence
+    iterations[units] = np.maximum(iterations[units], other[0])
+    max_diff[units] = np.maximum(max_diff[units], other[1])
+    converged[units] &= other[2]
+    saved[units] = np.maximum(saved[units], other[3])
+
+
+def solve_chunk(task):
+    ''' (marginals of state 0 (unit, var), per factor messages or None, convergence) of each of a
+        list of FactorGraphBatch whose variables are 0..n-1, with the given algorithm; runs in a
+        pool worker
+    '''
+    factor_graphs, alg = task
+    return [solve_graph(factor_graph, alg) for factor_graph in factor_graphs]
+
+
+def solve_graph(factor_graph, alg):
+    nvars = len(factor_graph.vars)
+    if is_numpy_algorithm(alg):
+        pgmengine = PGMEngine(factor_graph)
+        pgmengine.prepare(None, alg)
+        pgmengine.run()
+        return (pgmengine.query_all_unit_var_marginals(), pgmengine.query_all_factor_messages(),
+                pgmengine.query_all_unit_convergence())
+    # libDAI solves one unit at a time
+    p0 = np.full((factor_graph.nunits, nvars), 0.5)
+    convergence = exact_convergence(factor_graph.nunits)
+    for k in range(factor_graph.nunits):
+        unit_graph, id2var = relabelled_unit_graph(factor_graph, k)
+        if not unit_graph.factors:
+            continue
+        pgmengine = PGMEngine(unit_graph)
+        pgmengine.prepare(None, alg)
+        pgmengine.run()
+        for id_, var in id2var.iteritems():
+            p0[k, id_] = pgmengine.query_var_marginal(var)[0]
+        merge_convergence(convergence, [k], pgmengine.query_all_unit_convergence())
+    return p0, None, convergence
+
+
+def solve_units(factor_graph, alg, workers):
+    ''' solve_graph with the units of a FactorGraphBatch split over workers processes, each
+        worker given the factor arrays of its own units only.  A unit's run never depends on
+        the other units of its batch, so the marginals and messages are the ones one run gives,
+        except that a NUMPY_BP decision only ranks a unit against the units of its own part
+    '''
+    parts = np.array_split(np.arange(factor_graph.nunits), min(workers, factor_graph.nunits))
+    tasks = [([factor_graph.unit_batch(units)], alg) for units in parts]
+    results = get_worker_pool(workers).map(solve_chunk, tasks, chunksize=1)
+
+    p0 = np.empty((factor_graph.nunits, len(factor_graph.vars)))
+    convergence = exact_convergence(factor_graph.nunits)
+    messages = None
+    if all(part_results[0][1] is not None for part_results in results):
+        messages = [None if part_messages is None else np.empty((factor_graph.nunits,) + part_messages.shape[1:])
+                    for part_messages in results[0][0][1]]
+    for units, [(part_p0, part_messages, part_convergence)] in zip(parts, results):
+        p0[units] = part_p0
+        merge_convergence(convergence, units, part_convergence)
+        if messages is not None:
+            for f, factor_messages in enumerate(part_messages):
+                if factor_messages is not None:
+                    messages[f][units] = factor_messages
+    return p0, messages, convergence
+
+
+def relabelled_unit_graph(factor_graph, k):
+    ''' unit k's graph with its own variables numbered 0..n-1 in order of first appearance,
+        as libDAI's beliefV indexing needs
+    '''
+    id2var = {}
+    unit_graph = FactorGraph()
+    for factor, unit_states, active in factor_graph.unit_factors():
+        if active is None or active[k]:
+            factor_vars = []
+            for v in factor.vars:
+                if v.id not in id2var:
+                    id2var[v.id] = Variable(v.name, id_=len(id2var), nstates=v.nstates)
+                factor_vars.append(id2var[v.id])
+            unit_graph.add_factor(Factor(factor_vars, unit_states[k], factor.comment))
+    return unit_graph, id2var
+
+
+def component_graph(factor_graph, arrays, skip, p0):
+    ''' the FactorGraphBatch of one component with its variables renumbered 0..n-1 in the
+        order of arrays.var_ids and the messages and queried flags of the whole graph, if any;
+        its factors are left out of the units solved already, whose marginals p0 has
+    '''
+    component = factor_graph.subgraph(arrays.factor_indices, skip)
+    component.settled = np.where(skip[:, None], 1.0 - p0[:, arrays.var_ids], np.nan)
+    if factor_graph.messages is not None:
+        component.messages = [factor_graph.messages[f] for f in arrays.factor_indices]
+    if factor_graph.queried is not None:
+        component.queried = factor_graph.queried[arrays.var_ids]
+    component.deadline = factor_graph.deadline
+    return component
+
+
+def unit_signature(arrays, id2name, k, alg, queried=None):
+    # everything unit k's run over a component depends on: its variables and its factors there, in order
+    return (tuple(id2name[id_] for id_ in arrays.var_ids),) + structural_signature(arrays, k, alg, queried)
+
+
+def structural_signature(arrays, k, alg, queried=None):
+    # unit_signature without the variable names: the factors over the local variables, numbered
+    # in order of first appearance, with their exact tables and in their order, which sequential
+    # updates follow, so equal signatures run alike.  Only for pairwise components
+    return (alg, None if queried is None else queried[arrays.var_ids].tobytes(), arrays.factor_kinds.tobytes(),
+            arrays.unary_vars.tobytes(), arrays.unary_states[:, k].tobytes(), arrays.unary_active[:, k].tobytes(),
+            arrays.pair_vars.tobytes(), arrays.pair_tables[:, k].tobytes(), arrays.pair_active[:, k].tobytes())
+
+
+def solve_components(factor_graph, alg, workers=1, exact_treewidth=0, unit_results=None, component_cache=None):
+    ''' marginals of state 0 (unit, var) of a FactorGraphBatch whose variables are 0..V-1,
+        and per unit the convergence of its runs (see merge_convergence).
+        Zero-prior components are answered in closed form, singletons and trees exactly by
+        two-pass sum-product, loopy components of treewidth up to exact_treewidth exactly by
+        junction tree, and the rest with alg, one run per component, spread over a process
+        pool when workers > 1.  The BP runs start from factor_graph.messages when it is set and
+        leave their messages there.
+
+        unit_results, one dict per unit, carries the loopy components' marginals from one call
+        to the next: a unit whose component has the same signature as in the last call gets
+        its marginals back without a run, bit for bit the ones a run would give, and whether
+        that run converged; runs factor_graph.deadline cut short are not kept.
+        component_cache, a ComponentCache, does the same for any unit whose component has the
+        structure of one run before, whatever its variables; runs that started from messages
+        or that a NUMPY_BP decision stopped are left out of it.  Neither holds components with
+        factors over more than two variables
+    '''
+    nunits = factor_graph.nunits
+    p0 = np.full((nunits, len(factor_graph.vars)), 0.5)
+    convergence = exact_convergence(nunits)
+    loopy = []
+    signatures = []
+    components = split_components(factor_graph)
+    factor_component = np.empty(len(factor_graph.factors), dtype=int)
+    for c, factor_indices in enumerate(components):
+        factor_component[factor_indices] = c
+    factor_arrays = factor_graph.arrays()
+    unary_rows = rows_by_component(factor_component, factor_arrays.unary_factor, len(components))
+    pair_rows = rows_by_component(factor_component, factor_arrays.pair_factor, len(components))
+    for c, factor_indices in enumerate(components):
+        arrays = ComponentArrays(factor_graph, factor_indices, unary_rows[c], pair_rows[c])
+        skip = arrays.zero_prior_units()
+        if skip.any():
+            p0[np.ix_(skip, arrays.var_ids)] = arrays.zero_prior_marginals()[skip]
+        if skip.all():
+            continue
+        pairs = [(a, b, table) for (a, b), table in zip(arrays.pair_vars, arrays.pair_tables)]
+        if arrays.is_tree():
+            beliefs = solve_tree(arrays.unary_products(), pairs)
+        elif arrays.is_pairwise and exact_treewidth > 0:
+            steps = elimination_order(arrays.nvars, arrays.pair_vars, exact_treewidth)
+            if steps is None:
+                loopy.append((arrays, skip))
+                continue
+            beliefs = solve_junction_tree(arrays.unary_products(), pairs, steps)
+        else:
+            loopy.append((arrays, skip))
+            continue
+        p0[np.ix_(~skip, arrays.var_ids)] = beliefs[~skip][:, :, 0]
+
+    # per loopy component, by id(arrays), the (unit) largest last belief change, convergence
+    # and decision savings of the run or the result that stands in for it
+    outcomes = {id(arrays): (np.zeros(nunits), np.ones(nunits, dtype=bool), np.zeros(nunits, dtype=int))
+                for arrays, skip in loopy}
+
+    if unit_results is not None:
+        # units whose component is unchanged since the last call drop out of its run
+        previous_results = [dict(results) for results in unit_results]
+        for results in unit_results:
+            results.clear()
+        id2name = {v.id: v.name for v in factor_graph.vars}
+        ran = []
+        for arrays, skip in loopy:
+            if not arrays.is_pairwise:
+                # signatures hold unary and pairwise factors only
+                ran.append((arrays, skip))
+                continue
+            unit_signatures = {}
+            for k in np.flatnonzero(~skip):
+                signature = unit_signature(arrays, id2name, k, alg, factor_graph.queried)
+                if signature in previous_results[k]:
+                    name2p0, max_diff, converged = previous_results[k][signature]
+                    p0[k, arrays.var_ids] = [name2p0.get(id2name[id_], 0.5) for id_ in arrays.var_ids]
+                    unit_results[k][signature] = (name2p0, max_diff, converged)
+                    merge_convergence(convergence, [k], ([0], [max_diff], [converged], [0]))
+                    skip[k] = True
+                else:
+                    unit_signatures[k] = signature
+            signatures.append((arrays, unit_signatures))
+            if not skip.all():
+                ran.append((arrays, skip))
+        loopy = ran
+
+    structures = []
+    if component_cache is not None and factor_graph.messages is None:
+        # units whose component has the structure of one run before drop out of its run
+        ran = []
+        for arrays, skip in loopy:
+            if not arrays.is_pairwise:
+                ran.append((arrays, skip))
+                continue
+            max_diff, converged, saved = outcomes[id(arrays)]
+            unit_structures = {}
+            for k in np.flatnonzero(~skip):
+                structure = structural_signature(arrays, k, alg, factor_graph.queried)
+                entry = component_cache.get(structure)
+                if entry is not None:
+                    p0[k, arrays.var_ids], max_diff[k], converged[k] = entry
+                    merge_convergence(convergence, [k], ([0], [max_diff[k]], [converged[k]], [0]))
+                    skip[k] = True
+                else:
+                    unit_structures[k] = structure
+            structures.append((arrays, unit_structures))
+            if not skip.all():
+                ran.append((arrays, skip))
+        loopy = ran
+
+    if loopy:
+        # each component runs on its own: a unit stops iterating once all of its graph has
+        # converged, so sharing a run with other components could change where it stops.
+        # Chunks only group components per worker, greedily balanced by factor count
+        nchunks = min(max(workers, 1), len(loopy))
+        chunks = [[] for _ in range(nchunks)]
+        loads = [0] * nchunks
+        for arrays, skip in sorted(loopy, key=lambda item: -len(item[0].factor_indices)):
+            j = loads.index(min(loads))
+            chunks[j].append((arrays, skip))
+            loads[j] += len(arrays.factor_indices)
+
+        tasks = [([component_graph(factor_graph, arrays, skip, p0) for arrays, skip in chunk], alg)
+                 for chunk in chunks]
+        if len(tasks) > 1:
+            results = get_worker_pool(workers).map(solve_chunk, tasks, chunksize=1)
+        else:
+            results = [solve_chunk(tasks[0])]
+
+        for chunk, chunk_results in zip(chunks, results):
+            for (arrays, skip), (component_p0, messages, run_convergence) in zip(chunk, chunk_results):
+                p0[np.ix_(~skip, arrays.var_ids)] = component_p0[~skip]
+                merge_convergence(convergence, ~skip, [values[~skip] for values in run_convergence])
+                for outcome, values in zip(outcomes[id(arrays)], run_convergence[1:]):
+                    outcome[~skip] = values[~skip]
+                if factor_graph.messages is not None and messages is not None:
+                    for f, factor_messages in zip(arrays.factor_indices, messages):
+                        if factor_graph.messages[f] is not None:
+                            factor_graph.messages[f][~skip] = factor_messages[~skip]
+
+    for arrays, unit_signatures in signatures:
+        max_diff, converged, saved = outcomes[id(arrays)]
+        for k, signature in unit_signatures.iteritems():
+            if factor_graph.deadline is not None and not converged[k]:
+                # cut short by the deadline, where it stopped is no run's to reuse
+                continue
+            unit_results[k][signature] = ({id2name[id_]: p0[k, id_] for id_ in arrays.var_ids},
+                                          max_diff[k], converged[k])
+    for arrays, unit_structures in structures:
+        max_diff, converged, saved = outcomes[id(arrays)]
+        for k, structure in unit_structures.iteritems():
+            if saved[k] or (factor_graph.deadline is not None and not converged[k]):
+                # a decision ranks the unit against the others, a deadline cuts it anywhere
+                continue
+            component_cache.put(structure, (p0[k, arrays.var_ids], max_diff[k], converged[k]))
+    return p0, convergence
@@ -0,0 +1,271 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+import numpy as np
+
+
+# log of a zero table entry: keeps hard constraints nearly hard without -inf * 0 in the fields
+LOG_FLOOR = -700.0
+
+
+class BinaryField(object):
+    ''' the unary and pairwise factors of a FactorGraph or FactorGraphBatch over binary variables
+        as log-odds contributions, shared by the NUMPY_MF and NUMPY_GIBBS engines.  The field of
+        variable i given states (or probabilities of state 1) x of the others is
+            log f_i(1) - log f_i(0) + sum over its pair factors of log T(1, x_j) - log T(0, x_j)
+        Variables are split in color classes no pair factor spans twice, so updating a class
+        at once is a sequential sweep.  Mirrors the parts of the libDAI InfAlg interface
+        PGMEngine uses, like NumpyBP.
+
+        props (strings, as parsed from aliases.conf):
+            budget      wall-clock seconds a run may take, 0 for no limit; the graph's deadline
+                        attribute, a time.time(), if set, bounds it as well
+    '''
+
+    def __init__(self, factor_graph, props):
+        self.props = dict(props)
+        self.budget = float(self.props.get('budget', 0.0))
+        self.deadline = getattr(factor_graph, 'deadline', None)
+
+        arrays = factor_graph.arrays()
+        if arrays.other_factors:
+            factor = factor_graph.factors[min(arrays.other_factors)]
+            raise ValueError('%s only supports unary and pairwise factors over binary variables: %s'
+                             % (type(self).__name__, factor.comment))
+
+        self.var_ids = list(np.unique(np.concatenate([arrays.unary_var, arrays.pair_vars.reshape(-1)])))
+        nunits = factor_graph.nunits
+        nvars = len(self.var_ids)
+        self.nunits = nunits
+        self.nvars = nvars
+        self.nfactors = len(factor_graph.factors)
+
+        # per unit and variable, the unary log-odds
+        unary_log = np.log(np.maximum(arrays.unary_states, np.exp(LOG_FLOOR))).clip(LOG_FLOOR)
+        unary_index = np.searchsorted(self.var_ids, arrays.unary_var)
+        bias = np.zeros((nvars, nunits))
+        np.add.at(bias, unary_index, unary_log[:, :, 1] - unary_log[:, :, 0])
+        self.bias = bias.T.copy()
+
+        # per unit and pair factor, the log-odds the factor adds to its first variable, linear in
+        # the second's state (or probability of state 1): first_base + x_second * first_slope,
+        # and the other way round
+        npairs = len(arrays.pair_factor)
+        pair_log = np.log(np.maximum(arrays.pair_tables, np.exp(LOG_FLOOR))).clip(LOG_FLOOR)
+        pair_log = pair_log.reshape(npairs, nunits, 2, 2).transpose(1, 0, 2, 3)
+        to_first = pair_log[:, :, 1, :] - pair_log[:, :, 0, :]
+        to_second = pair_log[:, :, :, 1] - pair_log[:, :, :, 0]
+        self.first_base = to_first[:, :, 0]
+        self.first_slope = to_first[:, :, 1] - to_first[:, :, 0]
+        self.second_base = to_second[:, :, 0]
+        self.second_slope = to_second[:, :, 1] - to_second[:, :, 0]
+        pair_vars = np.searchsorted(self.var_ids, arrays.pair_vars).reshape(npairs, 2)
+        self.first = pair_vars[:, 0]
+        self.second = pair_vars[:, 1]
+
+        # per color, its variables and the pair factors into them with where they land
+        self.colors = color_classes(nvars, pair_vars)
+        self.color_pairs = []
+        local = np.zeros(nvars, dtype=int)
+        for color in self.colors:
+            local[color] = np.arange(len(color))
+            into_first = np.flatnonzero(np.in1d(self.first, color))
+            into_second = np.flatnonzero(np.in1d(self.second, color))
+            self.color_pairs.append((into_first, local[self.first[into_first]],
+                                     into_second, local[self.second[into_second]]))
+
+        self.beliefs = None
+        self.errors = None
+        self.iterations = np.zeros(nunits, dtype=int)
+        self.max_diff = np.zeros(nunits)
+        self.converged = np.zeros(nunits, dtype=bool)
+        self.saved = np.zeros(nunits, dtype=int)
+
+    def field(self, x, c):
+        ''' log-odds of state 1 of the variables of color c given x, (..., unit, var) with the
+            unit axis second to last, the states or probabilities of state 1 of all variables
+        '''
+        color = self.colors[c]
+        into_first, first_at, into_second, second_at = self.color_pairs[c]
+        field = np.broadcast_to(self.bias[:, color], x.shape[:-1] + (len(color),))
+        rows = int(np.prod(x.shape[:-1]))
+        spread = np.zeros(rows * len(color))
+        if len(into_first):
+            weights = self.first_base[:, into_first] + x[..., self.second[into_first]] * self.first_slope[:, into_first]
+            spread += scatter(weights.reshape(rows, -1), first_at, len(color))
+        if len(into_second):
+            weights = self.second_base[:, into_second] + x[..., self.first[into_second]] * self.second_slope[:, into_second]
+            spread += scatter(weights.reshape(rows, -1), second_at, len(color))
+        return field + spread.reshape(field.shape)
+
+    def time_limit(self):
+        limits = []
+        if self.budget > 0:
+            limits.append(time.time() + self.budget)
+        if self.deadline is not None:
+            limits.append(self.deadline)
+        return min(limits) if limits else None
+
+    def beliefV(self, i):
+        return self.beliefs[0][i]
+
+    def unitBeliefV(self, k, i):
+        return self.beliefs[k][i]
+
+    def Iterations(self):
+        return int(self.iterations.max()) if self.nunits else 0
+
+    def maxDiff(self):
+        return float(self.max_diff.max()) if self.nunits else 0.0
+
+    def factorMessages(self):
+        # no messages to start a later run from
+        return None
+
+
+class NumpyMeanField(BinaryField):
+    ''' naive mean field: every variable's probability of state 1 is the logistic of its field
+        given the others' probabilities, updated a color class at a time from uniform.  A unit
+        stops once no probability moves more than tol in a sweep.
+
+        props, besides BinaryField's:
+            tol         stop when no probability moves more than tol
+            maxiter     upper bound on the number of sweeps
+
+        After run(), errors holds per unit and variable the change of its last sweep, max_diff
+        the largest of them; a run cut short by its budget leaves converged False.
+    '''
+
+    def __init__(self, factor_graph, props):
+        BinaryField.__init__(self, factor_graph, props)
+        self.tol = float(self.props.get('tol', 1e-9))
+        self.maxiter = int(self.props.get('maxiter', 10000))
+
+    def init(self):
+        self.q = np.full((self.nunits, self.nvars), 0.5)
+        self.errors = np.zeros((self.nunits, self.nvars))
+        self.iterations = np.zeros(self.nunits, dtype=int)
+        self.max_diff = np.zeros(self.nunits)
+        self.converged = np.zeros(self.nunits, dtype=bool)
+        self._set_beliefs()
+
+    def run(self):
+        limit = self.time_limit()
+        running = np.ones(self.nunits, dtype=bool)
+        for iteration in range(1, self.maxiter + 1):
+            if not running.any() or (limit is not None and time.time() > limit):
+                break
+            previous = self.q.copy()
+            for c, color in enumerate(self.colors):
+                q = logistic(self.field(self.q, c))
+                self.q[:, color] = np.where(running[:, None], q, self.q[:, color])
+            change = np.abs(self.q - previous)
+            self.errors[running] = change[running]
+            self.max_diff[running] = change[running].max(axis=1) if self.nvars else 0.0
+            self.iterations[running] = iteration
+            self.converged |= running & (self.max_diff <= self.tol)
+            running &= ~self.converged
+        self._set_beliefs()
+        return self.maxDiff()
+
+    def _set_beliefs(self):
+        self.beliefs = np.stack([1.0 - self.q, self.q], axis=-1)
+
+
+class NumpyGibbs(BinaryField):
+    ''' Gibbs sampling: chains independent Markov chains per unit resample a color class at a
+        time from the logistic of its field, and the marginals are the frequencies of state 1
+        after burnin sweeps.  A unit stops after samples sweeps, or once it has counted
+        min_samples and every marginal's standard error over the chains is within tol.
+
+        props, besides BinaryField's:
+            samples     upper bound on the number of sweeps counted
+            burnin      sweeps left out of the counts first
+            chains      chains per unit, their spread is the error estimate
+            seed        of the random numbers, the same seed gives the same marginals
+            tol         stop when every marginal's standard error is within tol
+            min_samples sweeps counted before tol can stop a unit: chains that all stayed in
+                        one state over a few sweeps show no spread, whatever the marginal
+
+        After run(), errors holds per unit and variable the standard error of its marginal,
+        max_diff the largest of them; iterations counts the sweeps, burnin included.
+    '''
+
+    def __init__(self, factor_graph, props):
+        BinaryField.__init__(self, factor_graph, props)
+        self.samples = int(self.props.get('samples', 1000))
+        self.burnin = int(self.props.get('burnin', 100))
+        self.chains = int(self.props.get('chains', 8))
+        self.seed = int(self.props.get('seed', 0))
+        self.tol = float(self.props.get('tol', 0.01))
+        self.min_samples = max(int(self.props.get('min_samples', 100)), 2)
+
+    def init(self):
+        self.random = np.random.RandomState(self.seed)
+        # (chain, unit, var) states, and per chain the number of sweeps each was in state 1
+        self.x = (self.random.random_sample((self.chains, self.nunits, self.nvars)) < 0.5).astype(float)
+        self.counts = np.zeros((self.chains, self.nunits, self.nvars))
+        self.counted = np.zeros(self.nunits, dtype=int)
+        self.errors = np.full((self.nunits, self.nvars), 0.5)
+        self.iterations = np.zeros(self.nunits, dtype=int)
+        self.max_diff = np.full(self.nunits, 0.5)
+        self.converged = np.zeros(self.nunits, dtype=bool)
+        self.beliefs = np.full((self.nunits, self.nvars, 2), 0.5)
+
+    def run(self):
+        limit = self.time_limit()
+        running = np.ones(self.nunits, dtype=bool)
+        for iteration in range(1, self.burnin + self.samples + 1):
+            if not running.any() or (limit is not None and time.time() > limit):
+                break
+            for c, color in enumerate(self.colors):
+                p1 = logistic(self.field(self.x, c))
+                draw = (self.random.random_sample(p1.shape) < p1).astype(float)
+                self.x[:, :, color] = np.where(running[None, :, None], draw, self.x[:, :, color])
+            self.iterations[running] = iteration
+            if iteration > self.burnin:
+                self.counts[:, running] += self.x[:, running]
+                self.counted[running] += 1
+                self._estimate(running)
+                self.converged |= running & (self.counted >= self.min_samples) & (self.max_diff <= self.tol)
+                running &= ~self.converged
+        return self.maxDiff()
+
+    def _estimate(self, units):
+        chain_means = self.counts[:, units] / self.counted[units][None, :, None]
+        self.beliefs[units, :, 1] = chain_means.mean(axis=0)
+        self.beliefs[units, :, 0] = 1.0 - self.beliefs[units, :, 1]
+        if self.chains > 1:
+            self.errors[units] = chain_means.std(axis=0, ddof=1) / np.sqrt(self.chains)
+        self.max_diff[units] = self.errors[units].max(axis=1) if self.nvars else 0.0
+
+
+def logistic(field):
+    return 0.5 * (1.0 + np.tanh(0.5 * field))
+
+
+def scatter(weights, at, size):
+    # per row of weights (row, column), the sums of its columns by at, flattened (row * size)
+    rows = weights.shape[0]
+    bins = (np.arange(rows)[:, None] * size + at[None, :]).reshape(-1)
+    return np.bincount(bins, weights=weights.reshape(-1), minlength=rows * size)
+
+
+def color_classes(nvars, pair_vars):
+    ''' greedy coloring of the variables, no two sharing a pair factor get the same color;
+        a list of variable index arrays, one per color
+    '''
+    neighbors = [set() for _ in range(nvars)]
+    for a, b in pair_vars:
+        if a != b:
+            neighbors[a].add(b)
+            neighbors[b].add(a)
+    color = np.full(nvars, -1, dtype=int)
+    for i in sorted(range(nvars), key=lambda i: -len(neighbors[i])):
+        taken = set(color[j] for j in neighbors[i])
+        c = 0
+        while c in taken:
+            c += 1
+        color[i] = c
+    return [np.flatnonzero(color == c) for c in range(color.max() + 1)] if nvars else []
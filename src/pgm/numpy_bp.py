@@ -0,0 +1,330 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+
+# updates=SEQMAX: a sweep updates every edge once, in this many blocks of decreasing residual
+RESIDUAL_BLOCKS = 4
+
+# adaptive=1: a unit whose beliefs swing back raises its damping halfway to 1, up to this
+MAX_ADAPTIVE_DAMPING = 0.9
+
+# decision=p: the last sweep must shrink the belief change to under this fraction for the
+# rest of the way to be bounded by a geometric tail
+MAX_DECISION_RATE = 0.9
+
+
+class NumpyBP(object):
+    ''' sum-product loopy belief propagation over binary variables with unary and
+        pairwise factors, with parallel (flooding) updates over edge-indexed message arrays.
+        Mirrors the parts of the libDAI InfAlg interface PGMEngine uses.
+
+        Runs every unit of a FactorGraphBatch at once (a FactorGraph is a single unit): the
+        arrays carry a leading unit axis, a factor left out of a unit sends it no messages,
+        and a unit stops updating once it converges, so its beliefs are bit for bit the ones
+        a run over that unit's own graph gives.
+
+        A graph whose messages attribute holds, per factor, (unit, edge, state) messages (NaN
+        where unknown) starts from those instead of uniform ones; factorMessages() hands back
+        the messages of the run in the same layout, for the next run to start from.
+
+        props (strings, as parsed from aliases.conf):
+            updates     PARALL updates every edge at once; SEQMAX, residual scheduling, splits
+                        each sweep into RESIDUAL_BLOCKS blocks, the edges whose new message
+                        differs most from the current one going first and the later blocks
+                        seeing their updates
+            tol         stop when no single-variable belief moves more than tol
+            maxiter     upper bound on the number of sweeps
+            damping     geometric damping of factor-to-variable messages, 0.0 is none
+            adaptive    1 raises a unit's damping whenever its beliefs swing back
+            decision    stop a unit before tol once every queried belief of state 1 is more
+                        than margin, plus what is left of its convergence, on the same side of
+                        this threshold and of the same variable's belief in the run's other
+                        units, so the cut at it and the ranking of units come out the same
+            margin      see decision, 0.0 by default
+
+        The graph's queried attribute, if set, flags by variable id the variables whose
+        marginals are used, decision looks at those only; its settled attribute, if set, holds
+        the (unit, variable id) beliefs of state 1 of the units solved outside the run (NaN
+        elsewhere), which decision ranks against as well.
+
+        After run(), iterations, max_diff and converged hold per unit the sweeps it took, its
+        last largest belief change and whether that got within tol, or was decided, before
+        maxiter; saved holds the sweeps a decided unit is estimated to have left to reach tol.
+    '''
+
+    def __init__(self, factor_graph, props):
+        self.props = dict(props)
+        if self.props.get('inference', 'SUMPROD') != 'SUMPROD':
+            raise ValueError('NUMPY_BP only supports inference=SUMPROD')
+        self.updates = self.props.get('updates', 'PARALL')
+        if self.updates not in ('PARALL', 'SEQMAX'):
+            raise ValueError('NUMPY_BP only supports updates=PARALL or SEQMAX')
+        self.tol = float(self.props.get('tol', 1e-9))
+        self.maxiter = int(self.props.get('maxiter', 10000))
+        self.damping = float(self.props.get('damping', 0.0))
+        self.adaptive = self.props.get('adaptive', '0') == '1'
+        self.decision = float(self.props['decision']) if 'decision' in self.props else None
+        self.margin = float(self.props.get('margin', 0.0))
+
+        arrays = factor_graph.arrays()
+        if arrays.other_factors:
+            factor = factor_graph.factors[min(arrays.other_factors)]
+            if any(v.nstates != 2 for v in factor.vars):
+                raise ValueError('NUMPY_BP only supports binary variables: %s' % factor.comment)
+            raise ValueError('NUMPY_BP only supports unary and pairwise factors: %s' % factor.comment)
+
+        # libDAI orders variables by label, beliefV(i) is the i-th in that order
+        self.var_ids = list(np.unique(np.concatenate([arrays.unary_var, arrays.pair_vars.reshape(-1)])))
+        nunits = factor_graph.nunits
+        nvars = len(self.var_ids)
+
+        # unary factors never change, fold them into a per-variable log product plus zero counts,
+        # adding up in factor order
+        tables = arrays.unary_states
+        nonzero = tables > 0
+        unary_log = np.zeros((nvars, nunits, 2))
+        unary_zeros = np.zeros((nvars, nunits, 2), dtype=int)
+        unary_index = np.searchsorted(self.var_ids, arrays.unary_var)
+        np.add.at(unary_log, unary_index, np.log(np.where(nonzero, tables, 1.0)))
+        np.add.at(unary_zeros, unary_index, ~nonzero)
+        self.unary_log = unary_log.transpose(1, 0, 2).copy()
+        self.unary_zeros = unary_zeros.transpose(1, 0, 2).copy()
+
+        # directed edge 2f carries factor f's message to its first variable, 2f+1 to its second
+        npairs = len(arrays.pair_factor)
+        self.factor_edges = {f: 2 * i for i, f in enumerate(arrays.pair_factor)}
+        self.nunits = nunits
+        self.nvars = nvars
+        self.tables = arrays.pair_tables.reshape(npairs, nunits, 2, 2).transpose(1, 0, 2, 3)
+        self.edge_var = np.searchsorted(self.var_ids, arrays.pair_vars).reshape(-1)
+        self.edge_active = np.repeat(arrays.pair_active.reshape(npairs, nunits).T, 2, axis=1)
+        # the variables of a unit's graph that decision watches
+        unary_bins = (np.arange(nunits)[:, None] * nvars + unary_index[None, :]).reshape(-1)
+        edge_bins = (np.arange(nunits)[:, None] * nvars + self.edge_var[None, :]).reshape(-1)
+        active_count = (np.bincount(unary_bins, weights=arrays.unary_active.T.reshape(-1),
+                                    minlength=nunits * nvars)
+                        + np.bincount(edge_bins, weights=self.edge_active.reshape(-1), minlength=nunits * nvars))
+        self.watched = active_count.reshape(nunits, nvars) > 0
+        self.settled = np.full((nunits, nvars), np.nan)
+        if getattr(factor_graph, 'settled', None) is not None:
+            self.settled = np.asarray(factor_graph.settled)[:, self.var_ids]
+        if getattr(factor_graph, 'queried', None) is not None:
+            queried = np.asarray(factor_graph.queried)[self.var_ids]
+            self.watched &= queried[None, :]
+            self.settled = np.where(queried[None, :], self.settled, np.nan)
+        self.nfactors = len(factor_graph.factors)
+        self.initial_messages = factor_graph.messages
+        self.messages = None
+        self.beliefs = None
+        self.running = None
+        self.iterations = np.zeros(nunits, dtype=int)
+        self.max_diff = np.zeros(nunits)
+        self.converged = np.zeros(nunits, dtype=bool)
+        self.saved = np.zeros(nunits, dtype=int)
+        self.unit_damping = np.full(nunits, self.damping)
+
+    def init(self):
+        self.messages = np.full((self.nunits, len(self.edge_var), 2), 0.5)
+        if self.initial_messages is not None:
+            for f, e in self.factor_edges.iteritems():
+                if self.initial_messages[f] is not None:
+                    known = ~np.isnan(self.initial_messages[f])
+                    self.messages[:, e:e + 2][known] = self.initial_messages[f][known]
+        # a left out factor's messages stay all ones, which adds nothing in log space
+        self.messages[~self.edge_active] = 1.0
+        var_log, var_zeros = self._incoming(UnitView(self, np.arange(self.nunits)))[:2]
+        self.beliefs = normalize_log(var_log, var_zeros > 0)
+        self.running = np.ones(self.nunits, dtype=bool)
+        self.iterations = np.zeros(self.nunits, dtype=int)
+        self.max_diff = np.zeros(self.nunits)
+        self.converged = np.zeros(self.nunits, dtype=bool)
+        self.saved = np.zeros(self.nunits, dtype=int)
+        self.unit_damping = np.full(self.nunits, self.damping)
+        self.belief_step = np.zeros((self.nunits, self.nvars))
+
+    def run(self):
+        if self.messages is None:
+            self.init()
+        # sweeps only touch the units still running, converged ones drop out of the arrays
+        units = np.flatnonzero(self.running)
+        view = UnitView(self, units)
+        incoming = self._incoming(view)
+        for iteration in range(1, self.maxiter + 1):
+            if not len(units):
+                break
+            if self.updates == 'SEQMAX':
+                incoming = self._residual_sweep(view, incoming)
+            else:
+                self._update_messages(view, *incoming)
+                incoming = self._incoming(view)
+            beliefs = normalize_log(incoming[0], incoming[1] > 0)
+            if self.nvars:
+                diff = np.abs(beliefs - self.beliefs[units]).reshape(len(units), -1).max(axis=1)
+            else:
+                diff = np.zeros(len(units))
+            if self.adaptive:
+                # beliefs swinging back the way they came, no closer than before: the sweeps oscillate
+                step = beliefs[:, :, 0] - self.beliefs[units][:, :, 0]
+                oscillating = ((step * self.belief_step[units]).sum(axis=1) < 0) & (diff >= self.max_diff[units])
+                damping = np.minimum(0.5 * (1.0 + view.damping), MAX_ADAPTIVE_DAMPING)
+                view.damping = np.where(oscillating, damping, view.damping)
+                self.unit_damping[units] = view.damping
+                self.belief_step[units] = step
+            last_diff = self.max_diff[units]
+            self.max_diff[units] = diff
+            self.beliefs[units] = beliefs
+            self.iterations[units] = iteration
+            converged = diff <= self.tol
+            if self.decision is not None and iteration > 1:
+                converged |= self._decided(units, diff, last_diff, ~converged)
+            if converged.any():
+                self.messages[units] = view.messages
+                self.running[units[converged]] = False
+                self.converged[units[converged]] = True
+                units = units[~converged]
+                view = UnitView(self, units)
+                incoming = tuple(a[~converged] for a in incoming)
+        self.messages[units] = view.messages
+        return self.maxDiff()
+
+    def beliefV(self, i):
+        return self.beliefs[0][i]
+
+    def unitBeliefV(self, k, i):
+        return self.beliefs[k][i]
+
+    def Iterations(self):
+        return int(self.iterations.max()) if self.nunits else 0
+
+    def maxDiff(self):
+        return float(self.max_diff.max()) if self.nunits else 0.0
+
+    def factorMessages(self):
+        # per factor, (unit, edge, state) messages to its first and second variable, None for unary
+        messages = [None] * self.nfactors
+        for f, e in self.factor_edges.iteritems():
+            messages[f] = self.messages[:, e:e + 2].copy()
+        return messages
+
+    def _decided(self, units, diff, last_diff, candidates):
+        ''' which of the running units can stop before tol: with the belief change shrinking
+            by rate < MAX_DECISION_RATE a sweep, no belief moves more than the geometric tail
+            diff * rate / (1 - rate) from here on.  Every watched belief must then stay margin
+            clear of the threshold, and, among the units above it, of the other units' beliefs
+            of the same variable (those of stopped and settled units stay put), unless they are
+            equal
+        '''
+        rate = diff / np.where(last_diff > 0, last_diff, np.inf)
+        candidates = candidates & (rate < MAX_DECISION_RATE)
+        if not candidates.any():
+            return candidates
+        tail = np.where(candidates, diff * rate / (1.0 - np.minimum(rate, MAX_DECISION_RATE)), np.inf)
+        p1 = self.beliefs[:, :, 1]
+        watched = self.watched[units]
+        clear = np.abs(p1[units] - self.decision) > self.margin + tail[:, None]
+        candidates &= (clear | ~watched).all(axis=1)
+        unit_tail = np.zeros(self.nunits)
+        unit_tail[units] = tail
+        others = np.where(self.watched, p1, self.settled)
+        above = others > self.decision
+        for i in np.flatnonzero(candidates):
+            u = units[i]
+            gap = np.abs(others - p1[u])
+            close = (gap > 0) & (gap <= self.margin + tail[i] + unit_tail[:, None])
+            if (close & above & above[u]).any():
+                candidates[i] = False
+        # sweeps to tol at the same rate
+        for i in np.flatnonzero(candidates):
+            self.saved[units[i]] = int(np.ceil(np.log(self.tol / diff[i]) / np.log(rate[i])))
+        return candidates
+
+    def _incoming(self, view):
+        # per unit, variable and state: sum of logs of the nonzero incoming values and how many were zero
+        nonzero = view.messages > 0
+        log_messages = np.where(nonzero, np.log(np.where(nonzero, view.messages, 1.0)), 0.0)
+        var_log = view.unary_log.copy()
+        var_zeros = view.unary_zeros.copy()
+        nunits = len(view.units)
+        nbins = nunits * self.nvars
+        for s in (0, 1):
+            var_log[:, :, s] += np.bincount(view.edge_bins, weights=log_messages[:, :, s].reshape(-1),
+                                            minlength=nbins).reshape(nunits, self.nvars)
+            var_zeros[:, :, s] += np.bincount(view.edge_bins, weights=~nonzero[:, :, s].reshape(-1),
+                                              minlength=nbins).astype(int).reshape(nunits, self.nvars)
+        return var_log, var_zeros, log_messages, nonzero
+
+    def _residual_sweep(self, view, incoming):
+        # each edge once, the ones whose message would change most first, later blocks hearing
+        # the earlier ones' updates
+        nedges = len(self.edge_var)
+        quota = -(-nedges // RESIDUAL_BLOCKS)
+        updated = ~view.edge_active
+        for block in range(RESIDUAL_BLOCKS):
+            if updated.all():
+                break
+            new_messages = self._new_messages(view, *incoming)
+            residual = np.abs(new_messages - view.messages).max(axis=-1)
+            residual[updated] = -1.0
+            if block < RESIDUAL_BLOCKS - 1:
+                rank = np.argsort(np.argsort(-residual, axis=1, kind='mergesort'), axis=1)
+                chosen = (rank < quota) & ~updated
+            else:
+                chosen = ~updated
+            view.messages = np.where(chosen[:, :, None], new_messages, view.messages)
+            updated |= chosen
+            incoming = self._incoming(view)
+        return incoming
+
+    def _update_messages(self, view, *incoming):
+        new_messages = self._new_messages(view, *incoming)
+        # left out factors keep their all ones messages
+        view.messages = np.where(view.edge_active[:, :, None], new_messages, view.messages)
+
+    def _new_messages(self, view, var_log, var_zeros, log_messages, nonzero):
+        # variable-to-factor messages: everything the variable hears except the edge itself
+        cavity_log = var_log[:, self.edge_var] - log_messages
+        cavity_zeros = var_zeros[:, self.edge_var] - (~nonzero).astype(int)
+        cavity = normalize_log(cavity_log, cavity_zeros > 0)
+        # factor-to-variable messages, each edge takes the cavity of its sibling edge
+        to_first = np.einsum('ufab,ufb->ufa', view.tables, cavity[:, 1::2])
+        to_second = np.einsum('ufab,ufa->ufb', view.tables, cavity[:, 0::2])
+        new_messages = np.empty_like(view.messages)
+        new_messages[:, 0::2] = to_first
+        new_messages[:, 1::2] = to_second
+        new_messages = normalize(new_messages)
+        if view.damping.any():
+            damping = view.damping[:, None, None]
+            damped = normalize(new_messages ** (1.0 - damping) * view.messages ** damping)
+            new_messages = np.where(damping > 0, damped, new_messages)
+        return new_messages
+
+
+class UnitView(object):
+    ''' the arrays of a NumpyBP restricted to some of its units, messages are a working copy
+    '''
+
+    def __init__(self, bp, units):
+        self.units = units
+        self.messages = bp.messages[units]
+        self.tables = bp.tables[units]
+        self.edge_active = bp.edge_active[units]
+        self.unary_log = bp.unary_log[units]
+        self.unary_zeros = bp.unary_zeros[units]
+        self.damping = bp.unit_damping[units]
+        # bincount bins of the (unit, edge) pairs: one bin per (unit, variable)
+        self.edge_bins = (np.arange(len(units))[:, None] * bp.nvars + bp.edge_var[None, :]).reshape(-1)
+
+
+def normalize(values):
+    total = values.sum(axis=-1, keepdims=True)
+    # a row with no mass left (contradicting evidence) falls back to uniform, like an untouched message
+    return np.where(total > 0, values / np.where(total > 0, total, 1.0), 0.5)
+
+
+def normalize_log(log_values, is_zero):
+    log_values = np.where(is_zero, -np.inf, log_values)
+    peak = log_values.max(axis=-1, keepdims=True)
+    values = np.exp(log_values - np.where(np.isfinite(peak), peak, 0.0))
+    return normalize(values)
@@ -4,34 +4,27 @@
 
 from os.path import join, dirname
 from StringIO import StringIO
-import dai
+import numpy as np
+from numpy_bp import NumpyBP
+from numpy_anytime import NumpyMeanField, NumpyGibbs
+try:
+    import dai
+except ImportError:
+    # libDAI bindings not built, only the NUMPY_* algorithms are available
+    dai = None
 
 
-class Variable(object):
+# algorithm names served without libDAI, see aliases.conf for their default properties
+NUMPY_ALGORITHMS = {'NUMPY_BP': NumpyBP, 'NUMPY_MF': NumpyMeanField, 'NUMPY_GIBBS': NumpyGibbs}
+
 
-    name2id = {}
-    count = 0
+class Variable(object):
 
-    def __init__(self, name, id_=None, nstates=2):
-        self.id = self.get_id(name) if id_ is None else id_
+    def __init__(self, name, id_, nstates=2):
+        self.id = id_
         self.name = name
         self.nstates = nstates
 
-    @classmethod
-    def get_id(cls, name):
-        try:
-            return cls.name2id[name]
-        except KeyError:
-            id_ = cls.count
-            cls.name2id[name] = id_
-            cls.count += 1
-        return id_
-
-    @classmethod
-    def reset(cls):
-        cls.name2id.clear()
-        cls.count = 0
-
     def __str__(self):
         return 'x%d: %s(%d)' % (self.id, self.name, self.nstates)
 
@@ -42,6 +35,35 @@ class Variable(object):
         return isinstance(other, Variable) and self.id == other.id
 
 
+def variable_name(key):
+    # ('p', 7) -> 'p7', a string key names itself
+    return ''.join(str(part) for part in key) if isinstance(key, tuple) else str(key)
+
+
+class VariableAllocator(object):
+    ''' the variables of one graph, numbered 0, 1, ... in order of first use of their keys, any
+        hashable such as a (role, constraint variable id) pair; each graph has its own, so
+        graphs can be built side by side
+    '''
+
+    def __init__(self, nstates=2):
+        self.nstates = nstates
+        self.key2var = {}
+        self.keys = []
+
+    def get(self, key):
+        try:
+            return self.key2var[key]
+        except KeyError:
+            var = Variable(variable_name(key), id_=len(self.keys), nstates=self.nstates)
+            self.key2var[key] = var
+            self.keys.append(key)
+        return var
+
+    def __len__(self):
+        return len(self.keys)
+
+
 class Factor(object):
     def __init__(self, vars, states, comment):
         self.vars = vars
@@ -57,15 +79,119 @@ class Factor(object):
         return self.comment + '\n' + vars_str + '\n' + states_str
 
 
+class Prior(Factor):
+    ''' var is 1 with probability p: states [1 - p, p] '''
+
+    def __init__(self, var, p, comment):
+        self.vars = [var]
+        self.p = p
+        self.comment = comment
+
+    @property
+    def states(self):
+        return [1 - self.p, self.p]
+
+
+class Implies(Factor):
+    ''' a -> b holds with probability p: states [p, 1 - p, p, p], a changing fastest '''
+
+    def __init__(self, a, b, p, comment):
+        self.vars = [a, b]
+        self.p = p
+        self.comment = comment
+
+    @property
+    def states(self):
+        return [self.p, 1 - self.p, self.p, self.p]
+
+
+class FactorArrays(object):
+    ''' the unary and pairwise factors over binary variables of a FactorGraph or FactorGraphBatch
+        as parallel arrays with a unit axis, each kind in factor order:
+            unary_factor, unary_var         factor index and variable id, (P,)
+            unary_states                    (P, unit, state)
+            pair_factor, pair_vars          factor index and (first, second) variable ids, (I,), (I, 2)
+            pair_tables                     (I, unit, x_first, x_second)
+            *_active                        (P or I, unit), where False the table is all ones
+            other_factors                   indices of the factors neither kind holds
+    '''
+
+    def __init__(self, nunits):
+        self.nunits = nunits
+        self.unary_factor = np.zeros(0, dtype=int)
+        self.unary_var = np.zeros(0, dtype=int)
+        self.unary_states = np.zeros((0, nunits, 2))
+        self.unary_active = np.zeros((0, nunits), dtype=bool)
+        self.pair_factor = np.zeros(0, dtype=int)
+        self.pair_vars = np.zeros((0, 2), dtype=int)
+        self.pair_tables = np.zeros((0, nunits, 2, 2))
+        self.pair_active = np.zeros((0, nunits), dtype=bool)
+        self.other_factors = []
+
+    @staticmethod
+    def from_unit_factors(nunits, unit_factors):
+        arrays = FactorArrays(nunits)
+        unary = []
+        pairs = []
+        for f, (factor, unit_states, active) in enumerate(unit_factors):
+            active = np.ones(nunits, dtype=bool) if active is None else np.array(active, dtype=bool)
+            if any(v.nstates != 2 for v in factor.vars) or len(factor.vars) > 2:
+                arrays.other_factors.append(f)
+            elif len(factor.vars) == 1:
+                unary.append((f, factor.vars[0].id, np.array(unit_states, dtype=float), active))
+            else:
+                # states are indexed with the first variable changing fastest: table[xa][xb] after the transpose
+                table = np.array(unit_states, dtype=float).reshape(nunits, 2, 2).transpose(0, 2, 1)
+                pairs.append((f, (factor.vars[0].id, factor.vars[1].id), table, active))
+        if unary:
+            arrays.unary_factor, arrays.unary_var, arrays.unary_states, arrays.unary_active = map(np.array, zip(*unary))
+        if pairs:
+            arrays.pair_factor, arrays.pair_vars, arrays.pair_tables, arrays.pair_active = map(np.array, zip(*pairs))
+        arrays.mask_inactive()
+        return arrays
+
+    def unit_arrays(self, units):
+        # the same factors for the given units only
+        arrays = FactorArrays(len(units))
+        arrays.unary_factor = self.unary_factor
+        arrays.unary_var = self.unary_var
+        arrays.unary_states = self.unary_states[:, units]
+        arrays.unary_active = self.unary_active[:, units]
+        arrays.pair_factor = self.pair_factor
+        arrays.pair_vars = self.pair_vars
+        arrays.pair_tables = self.pair_tables[:, units]
+        arrays.pair_active = self.pair_active[:, units]
+        arrays.other_factors = self.other_factors
+        return arrays
+
+    def mask_inactive(self):
+        self.unary_states = np.where(self.unary_active[:, :, None], self.unary_states, 1.0)
+        self.pair_tables = np.where(self.pair_active[:, :, None, None], self.pair_tables, 1.0)
+
+
 class FactorGraph(object):
+
+    nunits = 1
+
     def __init__(self, vars=(), factors=()):
         self.vars = vars or set()
         self.factors = factors or []
+        # per factor, messages NUMPY_BP starts from, see NumpyBP
+        self.messages = None
 
     def add_factor(self, factor):
         self.factors.append(factor)
         self.vars.update(factor.vars)
 
+    def unit_factors(self):
+        ''' (factor, states of every unit, units it is active in or None for all), see FactorGraphBatch
+        '''
+        for factor in self.factors:
+            yield factor, [factor.states], None
+
+    def arrays(self):
+        return FactorArrays.from_unit_factors(1, self.unit_factors())
+
     def __str__(self):
         return '\n'.join(self.factors)
 
@@ -74,6 +200,31 @@ class FactorGraph(object):
             fp.write(self.dumps())
             fp.flush()
 
+    def to_dai(self):
+        ''' builds the libDAI factor graph in memory, with the same tables
+            FactorGraph::ReadFromFile would produce from dumps()
+        '''
+        if any(len(set(f.vars)) != len(f.vars) for f in self.factors):
+            # a variable repeated inside a factor: leave it to libDAI's own reader
+            dai_factor_graph = dai.FactorGraph()
+            dai_factor_graph.fromString(self.dumps())
+            return dai_factor_graph
+        id2dai_var = {}
+        dai_factors = dai.VecFactor()
+        for factor in self.factors:
+            dai_vars = dai.VarSet()
+            for v in factor.vars:
+                if v.id not in id2dai_var:
+                    id2dai_var[v.id] = dai.Var(v.id, v.nstates)
+                dai_vars.insert(id2dai_var[v.id])
+            dai_factor = dai.Factor(dai_vars)
+            perm = linear_index_permutation(factor.vars)
+            for i, s in enumerate(factor.states):
+                # float(str(s)) keeps the precision the text format carried
+                dai_factor[perm[i]] = float(str(s))
+            dai_factors.append(dai_factor)
+        return dai.FactorGraph(dai_factors)
+
     def dumps(self):
         buf = StringIO()
         buf.write('# number of nodes\n')
@@ -100,6 +251,258 @@ class FactorGraph(object):
         return buf.getvalue()
 
 
+class FactorGraphBatch(object):
+    ''' the factor graphs of several units, sharing their variables and factors and differing
+        only in the factor states; unit k leaves out the factors whose active[k] is False.
+        Prior and Implies factors keep one probability per unit instead of the states
+    '''
+
+    def __init__(self, nunits):
+        self.nunits = nunits
+        self.vars = set()
+        self.factors = []
+        # per factor, the states of every unit, or the probabilities of a Prior or Implies
+        self.unit_states = []
+        self.unit_probas = []
+        self.actives = []
+        # per factor, (unit, edge, state) messages NUMPY_BP starts from, see NumpyBP
+        self.messages = None
+        # by variable id, whether its marginals are used, and (unit, variable id) beliefs of
+        # state 1 found outside the run, see NumpyBP's decision
+        self.queried = None
+        self.settled = None
+        # time.time() the NUMPY_MF and NUMPY_GIBBS runs stop at with the marginals they have, or None
+        self.deadline = None
+        self.factor_arrays = None
+
+    def add_factor(self, factor, unit_states, active=None):
+        assert len(unit_states) == self.nunits, 'unvalid factor states: %s' % factor.comment
+        self._append(factor, unit_states, None, active)
+
+    def add_prior(self, var, unit_p, comment, active=None):
+        assert len(unit_p) == self.nunits, 'unvalid prior probabilities: %s' % comment
+        self._append(Prior(var, unit_p[0], comment), None, unit_p, active)
+
+    def add_implies(self, a, b, unit_p, comment, active=None):
+        assert len(unit_p) == self.nunits, 'unvalid implication probabilities: %s' % comment
+        self._append(Implies(a, b, unit_p[0], comment), None, unit_p, active)
+
+    def _append(self, factor, unit_states, unit_probas, active):
+        self.factors.append(factor)
+        self.unit_states.append(unit_states)
+        self.unit_probas.append(unit_probas)
+        self.actives.append(active)
+        self.vars.update(factor.vars)
+        self.factor_arrays = None
+
+    def factor_unit_states(self, f):
+        if self.unit_states[f] is not None:
+            return self.unit_states[f]
+        if type(self.factors[f]) is Prior:
+            return [[1 - p, p] for p in self.unit_probas[f]]
+        return [[p, 1 - p, p, p] for p in self.unit_probas[f]]
+
+    def unit_factors(self):
+        return [(factor, self.factor_unit_states(f), active)
+                for f, (factor, active) in enumerate(zip(self.factors, self.actives))]
+
+    def arrays(self):
+        ''' the FactorArrays of the graph, with the Prior and Implies factors laid out without
+            going through their states
+        '''
+        if self.factor_arrays is not None:
+            return self.factor_arrays
+        general = [f for f, unit_probas in enumerate(self.unit_probas) if unit_probas is None]
+        arrays = FactorArrays.from_unit_factors(self.nunits, [(self.factors[f], self.unit_states[f], self.actives[f])
+                                                              for f in general])
+        general = np.array(general, dtype=int)
+        arrays.unary_factor = general[arrays.unary_factor]
+        arrays.pair_factor = general[arrays.pair_factor]
+        arrays.other_factors = list(general[arrays.other_factors])
+
+        priors = [f for f, factor in enumerate(self.factors) if type(factor) is Prior]
+        implies = [f for f, factor in enumerate(self.factors) if type(factor) is Implies]
+        if priors:
+            p = np.array([self.unit_probas[f] for f in priors], dtype=float)
+            arrays.unary_factor = np.concatenate([arrays.unary_factor, priors])
+            arrays.unary_var = np.concatenate([arrays.unary_var, [self.factors[f].vars[0].id for f in priors]])
+            arrays.unary_states = np.concatenate([arrays.unary_states, np.stack([1 - p, p], axis=-1)])
+            arrays.unary_active = np.concatenate([arrays.unary_active, self._active_array(priors)])
+        if implies:
+            p = np.array([self.unit_probas[f] for f in implies], dtype=float)
+            tables = np.empty(p.shape + (2, 2))
+            tables[:, :, 0, 0] = p
+            tables[:, :, 1, 0] = 1 - p
+            tables[:, :, 0, 1] = p
+            tables[:, :, 1, 1] = p
+            arrays.pair_factor = np.concatenate([arrays.pair_factor, implies])
+            arrays.pair_vars = np.concatenate([arrays.pair_vars, [[v.id for v in self.factors[f].vars]
+                                                                  for f in implies]]).astype(int)
+            arrays.pair_tables = np.concatenate([arrays.pair_tables, tables])
+            arrays.pair_active = np.concatenate([arrays.pair_active, self._active_array(implies)])
+
+        # back to factor order within each kind
+        order = np.argsort(arrays.unary_factor, kind='mergesort')
+        arrays.unary_factor = arrays.unary_factor[order].astype(int)
+        arrays.unary_var = arrays.unary_var[order].astype(int)
+        arrays.unary_states = arrays.unary_states[order]
+        arrays.unary_active = arrays.unary_active[order]
+        order = np.argsort(arrays.pair_factor, kind='mergesort')
+        arrays.pair_factor = arrays.pair_factor[order].astype(int)
+        arrays.pair_vars = arrays.pair_vars[order]
+        arrays.pair_tables = arrays.pair_tables[order]
+        arrays.pair_active = arrays.pair_active[order]
+        arrays.mask_inactive()
+        self.factor_arrays = arrays
+        return arrays
+
+    def _active_array(self, factor_indices):
+        active = np.ones((len(factor_indices), self.nunits), dtype=bool)
+        for i, f in enumerate(factor_indices):
+            if self.actives[f] is not None:
+                active[i] = self.actives[f]
+        return active
+
+    def subgraph(self, factor_indices, skip=None):
+        ''' the FactorGraphBatch of the given factors with their variables renumbered 0..n-1 in
+            order of first appearance, left out of the units where skip is True
+        '''
+        factor_graph = FactorGraphBatch(self.nunits)
+        id2var = {}
+        for f in factor_indices:
+            factor = self.factors[f]
+            factor_vars = []
+            for v in factor.vars:
+                if v.id not in id2var:
+                    id2var[v.id] = Variable(v.name, id_=len(id2var), nstates=v.nstates)
+                factor_vars.append(id2var[v.id])
+            active = self.actives[f]
+            if skip is not None and skip.any():
+                active = [(active is None or active[k]) and not skip[k] for k in range(self.nunits)]
+            if type(factor) is Prior:
+                factor_graph.add_prior(factor_vars[0], self.unit_probas[f], factor.comment, active)
+            elif type(factor) is Implies:
+                factor_graph.add_implies(factor_vars[0], factor_vars[1], self.unit_probas[f], factor.comment, active)
+            else:
+                factor_graph.add_factor(Factor(factor_vars, factor.states, factor.comment), self.unit_states[f], active)
+        return factor_graph
+
+    def unit_batch(self, units):
+        ''' the FactorGraphBatch of the given units, sharing the variables and factors, with
+            their factor arrays and messages cut out of this one's
+        '''
+        units = list(units)
+        factor_graph = FactorGraphBatch(len(units))
+        factor_graph.vars = self.vars
+        factor_graph.factors = self.factors
+        factor_graph.unit_states = [None if states is None else [states[k] for k in units]
+                                    for states in self.unit_states]
+        factor_graph.unit_probas = [None if probas is None else [probas[k] for k in units]
+                                    for probas in self.unit_probas]
+        factor_graph.actives = [None if active is None else [active[k] for k in units] for active in self.actives]
+        if self.messages is not None:
+            factor_graph.messages = [None if messages is None else messages[units] for messages in self.messages]
+        factor_graph.queried = self.queried
+        factor_graph.deadline = self.deadline
+        if self.settled is not None:
+            factor_graph.settled = self.settled[units]
+        factor_graph.factor_arrays = self.arrays().unit_arrays(units)
+        return factor_graph
+
+    def unit_graph(self, k):
+        factor_graph = FactorGraph()
+        for factor, unit_states, active in self.unit_factors():
+            if active is None or active[k]:
+                factor_graph.add_factor(Factor(factor.vars, unit_states[k], factor.comment))
+        return factor_graph
+
+
+# (id order, state counts) -> permutation, see linear_index_permutation
+permutation_cache = {}
+
+
+def linear_index_permutation(vars):
+    ''' perm[li] maps a linear state index over vars (first var changes fastest) to the
+        index over the same vars sorted by id, as dai.Permute.convertLinearIndex does
+    '''
+    order = tuple(sorted(range(len(vars)), key=lambda k: vars[k].id))
+    nstates = tuple(v.nstates for v in vars)
+    key = (order, nstates)
+    if key not in permutation_cache:
+        perm = []
+        for li in range(reduce(lambda a, b: a * b, nstates, 1)):
+            states = []
+            for n in nstates:
+                states.append(li % n)
+                li //= n
+            sorted_li = 0
+            stride = 1
+            for k in order:
+                sorted_li += states[k] * stride
+                stride *= nstates[k]
+            perm.append(sorted_li)
+        permutation_cache[key] = perm
+    return permutation_cache[key]
+
+
+ALIASES_FILE = join(dirname(__file__), 'aliases.conf')
+
+# filename -> {alias: definition}, see read_aliases_file
+aliases_cache = {}
+
+
+def read_aliases_file(filename):
+    ''' the alias: definition lines of an aliases.conf, as dai.readAliasesFile reads them
+    '''
+    if filename not in aliases_cache:
+        aliases = {}
+        with open(filename) as fp:
+            for line in fp:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                alias, _, definition = line.partition(':')
+                aliases[alias.strip()] = definition.strip()
+        aliases_cache[filename] = aliases
+    return aliases_cache[filename]
+
+
+def is_numpy_algorithm(method):
+    return parse_name_properties(method, read_aliases_file(ALIASES_FILE))[0] in NUMPY_ALGORITHMS
+
+
+def parse_name_properties(method, aliases):
+    ''' resolves 'NAME[key=value,...]', or an alias of one, into (NAME, {key: value})
+        the way dai.parseNameProperties does
+    '''
+    method = method.strip()
+    if '[' not in method and method in aliases:
+        method = aliases[method]
+    name, _, rest = method.partition('[')
+    assert rest.endswith(']'), 'unvalid method: %s' % method
+    return name.strip(), split_properties(rest[:-1])
+
+
+def split_properties(text):
+    ''' 'a=1,b=[c=2,d=3]' -> {'a': '1', 'b': '[c=2,d=3]'}, commas inside brackets do not split
+    '''
+    props = {}
+    level = 0
+    start = 0
+    for i, ch in enumerate(text + ','):
+        if ch == '[':
+            level += 1
+        elif ch == ']':
+            level -= 1
+        elif ch == ',' and level == 0:
+            item = text[start:i].strip()
+            if item:
+                key, _, value = item.partition('=')
+                props[key.strip()] = value.strip()
+            start = i + 1
+    return props
+
+
 class PGMEngine(object):
     def __init__(self, factor_graph):
         self.factor_graph = factor_graph
@@ -111,14 +514,13 @@ class PGMEngine(object):
         self.inference = None
 
     def prepare(self, fg_filename, method):
-        self._prepare_dai_factor_graph(fg_filename)
-        self._prepare_method_aliases(join(dirname(__file__), 'aliases.conf'))
+        if fg_filename:
+            # only a copy for debugging, the backends get the graph from memory
+            self.factor_graph.dump(fg_filename)
         self.load_inference(method)
 
-    def _prepare_dai_factor_graph(self, filename):
-        self.factor_graph.dump(filename)
-        self.dai_factor_graph = dai.FactorGraph()
-        self.dai_factor_graph.ReadFromFile(filename)
+    def _prepare_dai_factor_graph(self):
+        self.dai_factor_graph = self.factor_graph.to_dai()
 
     def _prepare_method_aliases(self, filename):
         self.method_aliases = dai.readAliasesFile(filename)
@@ -127,14 +529,25 @@ class PGMEngine(object):
         if method in self.method2inference:
             self.method = method
             self.inference = self.method2inference[method]
+            return
+        name, props = parse_name_properties(method, read_aliases_file(ALIASES_FILE))
+        if name in NUMPY_ALGORITHMS:
+            mthdname2props = (name, props)
+            alg = NUMPY_ALGORITHMS[name](self.factor_graph, props)
         else:
+            if dai is None:
+                raise ImportError('libDAI bindings are needed for %s, try NUMPY_BP' % method)
+            if self.dai_factor_graph is None:
+                self._prepare_dai_factor_graph()
+            if self.method_aliases is None:
+                self._prepare_method_aliases(ALIASES_FILE)
             mthdname2props = dai.parseNameProperties(method, self.method_aliases)
             alg = dai.newInfAlg(mthdname2props.first, self.dai_factor_graph,
                                 mthdname2props.second)
-            self.method2props[method] = mthdname2props
-            self.method2inference[method] = alg
-            self.method = method
-            self.inference = alg
+        self.method2props[method] = mthdname2props
+        self.method2inference[method] = alg
+        self.method = method
+        self.inference = alg
 
     def run(self):
         self.inference.init()
@@ -158,6 +571,36 @@ class PGMEngine(object):
         return {var: self.query_var_marginal(var)
                 for var in self.factor_graph.vars}
 
+    def query_unit_var_marginal(self, k, var):
+        # only the NUMPY_* algorithms solve a FactorGraphBatch
+        factor = self.inference.unitBeliefV(k, var.id)
+        return factor[0], factor[1]
+
+    def query_all_unit_var_marginals(self):
+        # (unit, var id) -> probability of state 0, for variables numbered 0..n-1
+        return self.inference.beliefs[:, :, 0]
+
+    def query_all_factor_messages(self):
+        # per factor, the (unit, edge, state) messages a NUMPY_* run ended with
+        return self.inference.factorMessages()
+
+    def query_all_unit_convergence(self):
+        ''' per unit, the iterations the run took, its final largest belief change, whether that
+            got within tol (or was decided) and the iterations a decision saved; libDAI solves a
+            single unit
+        '''
+        if isinstance(self.inference, tuple(NUMPY_ALGORITHMS.values())):
+            return (self.inference.iterations.copy(), self.inference.max_diff.copy(), self.inference.converged.copy(),
+                    self.inference.saved.copy())
+        tol = float(parse_name_properties(self.method, read_aliases_file(ALIASES_FILE))[1].get('tol', 0.0))
+        max_diff = self.inference.maxDiff()
+        return (np.array([self.inference.Iterations()]), np.array([max_diff]), np.array([max_diff <= tol]),
+                np.zeros(1, dtype=int))
+
+    def query_all_unit_var_errors(self):
+        # (unit, var id) error estimates of the NUMPY_MF and NUMPY_GIBBS marginals, None otherwise
+        return getattr(self.inference, 'errors', None)
+
     # def query_factor_marginal(self, factor):
     #     #TODO:
     #     i = self.factors.index(factor)
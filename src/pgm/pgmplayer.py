@@ -1,16 +1,19 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from pgm import Variable, Factor, FactorGraph, PGMEngine
+import numpy as np
+from pgm import VariableAllocator, Factor, FactorGraph, FactorGraphBatch, PGMEngine, is_numpy_algorithm
+from components import solve_components, solve_graph, solve_units, exact_convergence, merge_convergence
 
 
 class PGMPlayer(object):
 
-    def __init__(self, fg_filename='test.fg'):
+    def __init__(self, fg_filename=None):
         self.fg_filename = fg_filename
         self.curr_factors = []
-        self.strvar2pgmvar = {}
-        Variable.reset()
+        self.variables = VariableAllocator()
+        # (iterations, largest last belief change, converged) of the last compute_marginals run
+        self.convergence = None
 
     def add_factor(self, left, right, states, proba, comment):
         left = [self.get_var(x) for x in left]
@@ -31,18 +34,221 @@ class PGMPlayer(object):
         pgmengine = PGMEngine(factor_graph)
         pgmengine.prepare(self.fg_filename, alg)
         pgmengine.run()
+        self.convergence = pgmengine.query_all_unit_convergence()
         pgmvar2proba = pgmengine.query_all_var_marginals()
         return {pv: p0 for pv, (p0, _) in pgmvar2proba.iteritems()}
 
-    def get_var(self, vname):
-        try:
-            var = self.strvar2pgmvar[vname]
-        except KeyError:
-            var = Variable(vname, id_=None, nstates=2)
-            self.strvar2pgmvar[vname] = var
-        return var
+    def get_var(self, key):
+        return self.variables.get(key)
 
 
+class PGMBatchPlayer(object):
+    ''' the graphs of several units from one pass of add_factor calls: proba is either shared
+        or a list with one probability per unit, and active (one bool per unit) leaves the
+        factor out of the units where it is False.  Unit k's graph is the one a PGMPlayer
+        given the same calls with proba[k] and without the inactive factors would build.
+        Variables are named by keys, e.g. (role, constraint variable id), and numbered by
+        self.variables in order of first use.
+    '''
+
+    def __init__(self, nunits):
+        self.nunits = nunits
+        self.curr_factors = []
+        self.variables = VariableAllocator()
+
+    def add_factor(self, left, right, states, proba, comment, active=None):
+        if not isinstance(proba, list):
+            proba = [proba] * self.nunits
+        left = [self.variables.get(key) for key in left]
+        right = [self.variables.get(key) for key in right]
+        self.curr_factors.append((left, right, states, proba, comment, active))
+
+    def unit_player(self, k, fg_filename=None):
+        player = PGMPlayer(fg_filename)
+        keys = self.variables.keys
+        for (left, right, states, proba, comment, active) in self.curr_factors:
+            if active is None or active[k]:
+                player.add_factor([keys[v.id] for v in left], [keys[v.id] for v in right], states, proba[k], comment)
+        return player
+
+    def _build_factor_graph_batch(self, merge_duplicates=False):
+        factor_graph = FactorGraphBatch(self.nunits)
+        for (key, factor_vars, kind, values, comment, active) in self._graph_factors(merge_duplicates):
+            if kind == 'prior':
+                factor_graph.add_prior(factor_vars[0], values, comment, active)
+            elif kind == 'implies':
+                factor_graph.add_implies(factor_vars[0], factor_vars[1], values, comment, active)
+            else:
+                factor_graph.add_factor(Factor(vars=factor_vars, states=values[0], comment=comment), values, active)
+        return factor_graph
+
+    def _graph_factors(self, merge_duplicates=False):
+        # (key, variables, kind, values, comment, active) of each factor of the batch graph:
+        # kind 'prior' [0, 1] and 'implies' [1, 0, 1, 1] factors keep their probabilities as
+        # values, any other factor (kind None) its states per unit
+        entries = []
+        for key, (left, right, states, proba, comment, active) in zip(self._factor_keys(), self.curr_factors):
+            if list(states) == [0, 1]:
+                entries.append((key, list(left) + list(right), 'prior', proba, comment, active))
+            elif list(states) == [1, 0, 1, 1]:
+                entries.append((key, list(left) + list(right), 'implies', proba, comment, active))
+            else:
+                unit_states = [map(lambda x: p if x else 1 - p, states) for p in proba]
+                entries.append((key, list(left) + list(right), None, unit_states, comment, active))
+        if merge_duplicates:
+            entries = self._merge_duplicates(entries)
+        return entries
+
+    def _merge_duplicates(self, entries):
+        # factors over the same one or two variables become one factor with the product of their
+        # tables, in place of the first of them, active wherever one of them is
+        groups = {}
+        order = []
+        for entry in entries:
+            factor_vars = entry[1]
+            if len(factor_vars) <= 2 and len(set(factor_vars)) == len(factor_vars):
+                group = frozenset(factor_vars)
+            else:
+                group = id(entry)
+            if group not in groups:
+                groups[group] = []
+                order.append(group)
+            groups[group].append(entry)
+        merged = []
+        for group in order:
+            members = groups[group]
+            if len(members) == 1:
+                merged.append(members[0])
+                continue
+            factor_vars = members[0][1]
+            tables = np.ones((self.nunits,) + (2,) * len(factor_vars))
+            active = np.zeros(self.nunits, dtype=bool)
+            for (key, member_vars, kind, values, comment, member_active) in members:
+                if kind == 'prior':
+                    states = np.array([[1 - p, p] for p in values])
+                elif kind == 'implies':
+                    states = np.array([[p, 1 - p, p, p] for p in values])
+                else:
+                    states = np.array(values, dtype=float)
+                # states run with the first variable fastest: reversed axes index [unit][x_first][x_second]
+                table = states.reshape((self.nunits,) + (2,) * len(factor_vars)).transpose([0] + range(len(factor_vars), 0, -1))
+                if member_vars != factor_vars:
+                    table = table.transpose(0, 2, 1)
+                member_active = np.ones(self.nunits, dtype=bool) if member_active is None else np.array(member_active)
+                tables *= np.where(member_active.reshape((-1,) + (1,) * len(factor_vars)), table, 1.0)
+                active |= member_active
+            unit_states = [list(table.transpose(range(len(factor_vars) - 1, -1, -1)).reshape(-1)) for table in tables]
+            merged.append((tuple(member[0] for member in members), factor_vars, None, unit_states,
+                           ' & '.join(member[4] for member in members), None if active.all() else list(active)))
+        return merged
+
+    def _unit_var_presence(self):
+        # [unit, var] whether the variable is in the unit's graph, i.e. has a factor active there
+        present = np.zeros((self.nunits, len(self.variables)), dtype=bool)
+        for (left, right, states, proba, comment, active) in self.curr_factors:
+            ids = [v.id for v in left + right]
+            if active is None:
+                present[:, ids] = True
+            else:
+                present[:, ids] |= np.array(active, dtype=bool)[:, None]
+        return present
+
+    def _factor_keys(self):
+        # what identifies an added factor from one round's graph to the next, repeats told apart by count
+        keys = self.variables.keys
+        factor_keys = []
+        seen = {}
+        for (left, right, states, proba, comment, active) in self.curr_factors:
+            key = (tuple(keys[v.id] for v in left), tuple(keys[v.id] for v in right), tuple(states), comment)
+            seen[key] = seen.get(key, 0) + 1
+            factor_keys.append(key + (seen[key],))
+        return factor_keys
+
+    def _load_messages(self, factor_graph, keys, unit_messages):
+        factor_graph.messages = []
+        for key, factor in zip(keys, factor_graph.factors):
+            messages = None
+            if len(factor.vars) == 2:
+                messages = np.full((self.nunits, 2, 2), np.nan)
+                for k, key2messages in enumerate(unit_messages):
+                    if key in key2messages:
+                        messages[k] = key2messages[key]
+            factor_graph.messages.append(messages)
+
+    def _save_messages(self, factor_graph, keys, unit_messages):
+        for key2messages in unit_messages:
+            key2messages.clear()
+        for key, messages, active in zip(keys, factor_graph.messages, factor_graph.actives):
+            if messages is None:
+                continue
+            for k, key2messages in enumerate(unit_messages):
+                if (active is None or active[k]) and not np.isnan(messages[k]).any():
+                    key2messages[key] = messages[k]
+
+    def compute_marginals(self, alg='BP', fg_filenames=None, split_components=False, workers=1, exact_treewidth=0,
+                          unit_memory=None, reuse_results=False, warm_start=False, merge_duplicates=False,
+                          queried=None, deadline=None, component_cache=None):
+        ''' (p0, present, convergence): [unit, variable id] arrays of the probability of state 0
+            and of whether the variable is in that unit's graph, ids as self.variables numbers
+            them, and per unit the (iterations, largest last belief change, converged, saved) of
+            its runs, see components.merge_convergence.  queried, the keys of the variables
+            whose marginals are used, limits what a NUMPY_BP decision waits for.  split_components solves the connected
+            components apart (see components.solve_components), on workers processes and
+            exactly up to exact_treewidth; otherwise workers processes share out the units.
+            merge_duplicates turns the factors over the same variables into one, which BP then
+            sees as a single edge instead of a loop.  deadline, a time.time(), stops the
+            NUMPY_MF and NUMPY_GIBBS runs with the marginals they have by then.  component_cache,
+            a components.ComponentCache, answers split components of a structure solved before.
+
+            unit_memory, one dict per unit, carries state from one call to the next: with
+            reuse_results the split components' results, reused where a component is unchanged,
+            and with warm_start the NUMPY_BP messages, which runs start from where a factor of
+            the same key had one
+        '''
+        present = self._unit_var_presence()
+        if not self.nunits:
+            return np.zeros(present.shape), present, exact_convergence(0)
+        fg_filenames = fg_filenames or [None] * self.nunits
+        if not split_components and not is_numpy_algorithm(alg) and not merge_duplicates and workers <= 1:
+            # libDAI solves one unit at a time, its players number their variables apart
+            p0 = np.full(present.shape, 0.5)
+            convergence = exact_convergence(self.nunits)
+            for k in range(self.nunits):
+                player = self.unit_player(k, fg_filenames[k])
+                for v, p in player.compute_marginals(alg).iteritems():
+                    p0[k, self.variables.key2var[player.variables.keys[v.id]].id] = p
+                merge_convergence(convergence, [k], player.convergence)
+            return p0, present, convergence
+
+        factor_graph = self._build_factor_graph_batch(merge_duplicates)
+        if queried is not None:
+            factor_graph.queried = np.array([key in queried for key in self.variables.keys], dtype=bool)
+        factor_graph.deadline = deadline
+        for k, fg_filename in enumerate(fg_filenames):
+            if fg_filename:
+                factor_graph.unit_graph(k).dump(fg_filename)
+        unit_messages = None
+        if unit_memory is not None and warm_start:
+            unit_messages = [memory.setdefault('messages', {}) for memory in unit_memory]
+            keys = [entry[0] for entry in self._graph_factors(merge_duplicates)]
+            self._load_messages(factor_graph, keys, unit_messages)
+        if split_components:
+            unit_results = None
+            if unit_memory is not None and reuse_results:
+                unit_results = [memory.setdefault('components', {}) for memory in unit_memory]
+            p0, convergence = solve_components(factor_graph, alg, workers, exact_treewidth, unit_results,
+                                               component_cache)
+        else:
+            if workers > 1 and self.nunits > 1:
+                p0, messages, convergence = solve_units(factor_graph, alg, workers)
+            else:
+                p0, messages, convergence = solve_graph(factor_graph, alg)
+            if unit_messages is not None and messages is not None:
+                factor_graph.messages = messages
+        if unit_messages is not None:
+            self._save_messages(factor_graph, keys, unit_messages)
+        return p0, present, convergence
+
 if __name__ == '__main__':
     
     player = PGMPlayer()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import itertools
+from pgm.pgmplayer import PGMBatchPlayer
+
+
+def exact_marginals(batch_player, k):
+    ''' key -> probability of state 0 of each variable of unit k's graph, by summing over every
+        assignment; factor states index the assignment with the first variable changing fastest
+    '''
+    factors = batch_player.unit_player(k).curr_factors
+    keys = []
+    for factor in factors:
+        for v in factor.vars:
+            if v.name not in keys:
+                keys.append(v.name)
+    total = 0.0
+    p0 = dict((key, 0.0) for key in keys)
+    for assignment in itertools.product((0, 1), repeat=len(keys)):
+        x = dict(zip(keys, assignment))
+        weight = 1.0
+        for factor in factors:
+            weight *= factor.states[sum(x[v.name] << i for i, v in enumerate(factor.vars))]
+        total += weight
+        for key in keys:
+            if not x[key]:
+                p0[key] += weight
+    return dict((key, p / total) for key, p in p0.iteritems())
+
+
+def largest_error(batch_player, p0):
+    # the largest difference of p0 (unit, variable id) from the exact marginals over all units
+    error = 0.0
+    for k in range(batch_player.nunits):
+        for key, p in exact_marginals(batch_player, k).iteritems():
+            error = max(error, abs(p0[k, batch_player.variables.key2var[key].id] - p))
+    return error
+
+
+def random_player(rng, nunits, nvars, extra_edges=0, zero_priors=False):
+    ''' a PGMBatchPlayer over p0..p<nvars-1> joined into a random tree of implications, with up
+        to extra_edges more between other pairs making loops, and priors on some variables;
+        priors and implications differ between units and some priors are left out of some units.
+        zero_priors makes every implication between them mutual and puts the priors, all 0, on
+        variables c<i> that imply p<i>, so the zero-prior components are symmetric
+    '''
+    player = PGMBatchPlayer(nunits)
+    edges = [(rng.randrange(i), i) for i in range(1, nvars)]
+    for _ in range(extra_edges if nvars > 2 else 0):
+        a, b = rng.sample(range(nvars), 2)
+        if (a, b) not in edges and (b, a) not in edges:
+            edges.append((a, b))
+    for a, b in edges:
+        p = 0.95 if zero_priors else [rng.choice([0.6, 0.8, 0.95]) for _ in range(nunits)]
+        player.add_factor(['p%d' % a], ['p%d' % b], [1, 0, 1, 1], p, 'p%d -> p%d' % (a, b))
+        if zero_priors:
+            player.add_factor(['p%d' % b], ['p%d' % a], [1, 0, 1, 1], p, 'p%d -> p%d' % (b, a))
+    for i in range(nvars):
+        if rng.random() < 0.6:
+            if zero_priors:
+                player.add_factor([], ['c%d' % i], [0, 1], 0.0, 'c%d' % i)
+                player.add_factor(['c%d' % i], ['p%d' % i], [1, 0, 1, 1], 0.7, 'c%d -> p%d' % (i, i))
+            else:
+                p = [rng.choice([0.1, 0.3, 0.8, 0.9]) for _ in range(nunits)]
+                active = None if rng.random() < 0.5 else [rng.random() < 0.8 for _ in range(nunits)]
+                player.add_factor([], ['p%d' % i], [0, 1], p, 'p%d' % i, active)
+    return player
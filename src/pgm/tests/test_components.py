@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import random
+import unittest
+import numpy as np
+from pgm.components import ComponentCache
+from pgm.pgmplayer import PGMBatchPlayer
+from pgm.tests.brute_force import largest_error, random_player
+
+
+class TestSplitComponents(unittest.TestCase):
+    ''' compute_marginals(split_components=True) against exact enumeration, on the components it
+        answers without running the algorithm, which report no iterations
+    '''
+
+    def solve(self, player, **options):
+        p0, present, convergence = player.compute_marginals(alg='NUMPY_BP', split_components=True, **options)
+        iterations = convergence[0]
+        return p0, iterations
+
+    def test_trees_are_exact(self):
+        rng = random.Random(1)
+        for trial in range(60):
+            player = random_player(rng, nunits=rng.randint(1, 4), nvars=rng.randint(1, 8))
+            p0, iterations = self.solve(player)
+            self.assertFalse(iterations.any())
+            self.assertLess(largest_error(player, p0), 1e-12)
+
+    def test_zero_prior_components_are_closed_form(self):
+        rng = random.Random(2)
+        for trial in range(40):
+            player = random_player(rng, nunits=rng.randint(1, 4), nvars=rng.randint(2, 7),
+                                   extra_edges=rng.randint(1, 4), zero_priors=True)
+            p0, iterations = self.solve(player)
+            self.assertFalse(iterations.any())
+            self.assertLess(largest_error(player, p0), 1e-12)
+            # pinned variables are certain, the free ones exactly even
+            present = player._unit_var_presence()
+            self.assertTrue(np.all((p0[present] == 1.0) | (p0[present] == 0.5)))
+
+    def test_junction_trees_are_exact(self):
+        rng = random.Random(4)
+        for trial in range(40):
+            player = random_player(rng, nunits=rng.randint(1, 4), nvars=rng.randint(3, 10),
+                                   extra_edges=rng.randint(1, 4))
+            p0, iterations = self.solve(player, exact_treewidth=20)
+            self.assertFalse(iterations.any())
+            self.assertLess(largest_error(player, p0), 1e-12)
+
+
+def renamed(player, prefix, order=None):
+    # a copy of player with prefix before every variable key, its factors in the given order
+    copy = PGMBatchPlayer(player.nunits)
+    keys = player.variables.keys
+    for i in order or range(len(player.curr_factors)):
+        (left, right, states, proba, comment, active) = player.curr_factors[i]
+        copy.add_factor([prefix + keys[v.id] for v in left], [prefix + keys[v.id] for v in right],
+                        states, proba, comment, active)
+    return copy
+
+
+class TestComponentCache(unittest.TestCase):
+    ''' a split loopy component found in the cache gets the marginals a run would give it '''
+
+    def solve(self, player, component_cache=None):
+        p0, present, convergence = player.compute_marginals(alg='NUMPY_BP', split_components=True,
+                                                            component_cache=component_cache)
+        return dict((key, p0[:, v.id]) for key, v in player.variables.key2var.iteritems())
+
+    def test_hit_equals_fresh_solve(self):
+        rng = random.Random(3)
+        component_cache = ComponentCache(1024)
+        for trial in range(20):
+            player = random_player(rng, nunits=rng.randint(1, 3), nvars=rng.randint(3, 7), extra_edges=3)
+            self.solve(player, component_cache)
+            copy = renamed(player, 'q')
+            key2p0 = self.solve(copy, component_cache)
+            fresh = self.solve(copy)
+            for key in key2p0:
+                self.assertTrue(np.array_equal(key2p0[key], fresh[key]))
+        # trees and runs a decision stopped are not cached, most of the others are hit
+        self.assertGreater(component_cache.hits, 10)
+
+    def test_factor_order_changes_the_structure(self):
+        # the same factors with the prior last: sequential updates would visit them in another order
+        player = PGMBatchPlayer(1)
+        player.add_factor([], ['p0'], [0, 1], 0.8, 'p0')
+        for a, b in [(0, 1), (1, 2), (2, 0)]:
+            player.add_factor(['p%d' % a], ['p%d' % b], [1, 0, 1, 1], 0.9, 'p%d -> p%d' % (a, b))
+        component_cache = ComponentCache(1024)
+        self.solve(player, component_cache)
+        self.solve(renamed(player, 'q', [1, 2, 3, 0]), component_cache)
+        self.assertEqual(component_cache.hits, 0)
+        self.solve(renamed(player, 'r'), component_cache)
+        self.assertEqual(component_cache.hits, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
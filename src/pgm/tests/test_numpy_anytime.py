@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import random
+import unittest
+import numpy as np
+from pgm.pgmplayer import PGMBatchPlayer
+from pgm.tests.brute_force import largest_error, random_player
+
+
+def tree_players(seed, trials):
+    rng = random.Random(seed)
+    for trial in range(trials):
+        yield random_player(rng, nunits=rng.randint(1, 4), nvars=rng.randint(1, 8))
+
+
+def loopy_players(seed, trials):
+    rng = random.Random(seed)
+    for trial in range(trials):
+        yield random_player(rng, nunits=rng.randint(1, 4), nvars=rng.randint(3, 8),
+                            extra_edges=rng.randint(1, 4))
+
+
+class TestNumpyMeanField(unittest.TestCase):
+    ''' compute_marginals(alg='NUMPY_MF') against exact enumeration: exact without implications.
+        With them mean field ignores the correlations, and settles on one side of strongly
+        implied variables, so the bounds here only hold its error where it was measured
+    '''
+
+    def solve(self, player):
+        p0, present, convergence = player.compute_marginals(alg='NUMPY_MF')
+        converged = convergence[2]
+        self.assertTrue(converged.all())
+        return p0
+
+    def test_priors_alone_are_exact(self):
+        rng = random.Random(1)
+        player = PGMBatchPlayer(3)
+        for i in range(6):
+            player.add_factor([], ['p%d' % i], [0, 1], [rng.choice([0.1, 0.3, 0.8, 0.9]) for _ in range(3)],
+                              'p%d' % i, [rng.random() < 0.8 for _ in range(3)])
+        self.assertLess(largest_error(player, self.solve(player)), 1e-9)
+
+    def test_trees(self):
+        # the largest error over these graphs is 0.35
+        for player in tree_players(2, 40):
+            self.assertLess(largest_error(player, self.solve(player)), 0.4)
+
+    def test_loopy_graphs(self):
+        # the largest error over these graphs is 0.29
+        for player in loopy_players(3, 40):
+            self.assertLess(largest_error(player, self.solve(player)), 0.4)
+
+
+class TestNumpyGibbs(unittest.TestCase):
+    ''' compute_marginals(alg='NUMPY_GIBBS') against exact enumeration, within the sampling error
+        of its default samples and tol; the default seed makes the marginals the same every run
+    '''
+
+    def solve(self, player):
+        p0, present, convergence = player.compute_marginals(alg='NUMPY_GIBBS')
+        return p0
+
+    def test_trees(self):
+        # the largest error over these graphs is 0.026
+        for player in tree_players(2, 15):
+            self.assertLess(largest_error(player, self.solve(player)), 0.06)
+
+    def test_loopy_graphs(self):
+        # the largest error over these graphs is 0.031
+        for player in loopy_players(3, 15):
+            self.assertLess(largest_error(player, self.solve(player)), 0.06)
+
+    def test_no_early_stop_without_spread(self):
+        # all eight chains of some units draw p0 = 0 for the first sweeps, which alone is no estimate
+        player = PGMBatchPlayer(40)
+        player.add_factor([], ['p0'], [0, 1], 0.9, 'p0')
+        self.assertLess(largest_error(player, self.solve(player)), 0.06)
+
+    def test_same_seed_same_marginals(self):
+        player = next(loopy_players(4, 1))
+        self.assertTrue(np.array_equal(self.solve(player), self.solve(player)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,12 +3,15 @@
 
 from __future__ import print_function
 from datamining2 import TypeMiner
+from naming_cache import NamingCache
+from var_name_heuristic import CharNgramVarNameHeuristic
 from constraint_collector import ConstraintCollector
 from constraint_solver import ConstraintSolver
 from error_checker import ErrorChecker
 from symbol_helper import SymbolHelper
 from error_rechecker import ErrorRechecker
 from constraint_scoper import ConstraintScoper
+import perf_stats
 import click
 import os
 from distutils import spawn
@@ -28,6 +31,7 @@ PROB_THRESH = 0.5
 training_filepath = os.path.join('', './DATA/2017_06_16_var_names_units_all.txt')
 types_filepath = os.path.join('', './DATA/types_data.txt')
 suffix_filepath = os.path.join('', './DATA/suffix_units_data.txt')
+pos_lexicon_filepath = os.path.join('', './DATA/pos_lexicon.txt')
 
 
 def eprint(*args, **kwargs):
@@ -45,7 +49,15 @@ def _log(msg):
 @click.option('--should_print_one_line_summary', default='True', help='prints a one-line summary of inconsistencies')
 @click.option('--print_constraints/--no-print_constraints', default='False', help='prints constaints used during analysis.')
 @click.option('--print_variable_types/--no-print_variable_types', default='False', help='For each variable, prints the physical unit type assignment as a probability distribution.')
-def main(target_cpp_file, output_file, correction_file, should_print_one_line_summary, print_constraints, print_variable_types):
+@click.option('--print_profile/--no-print_profile', default='False', help='prints cache hit rates and other profiling counters.')
+@click.option('--inference', default='BP', help='inference alias from pgm/aliases.conf, NUMPY_BP needs no libDAI.')
+@click.option('--split_components/--no-split_components', default=False, help='solves the connected components of the factor graphs apart, trees exactly; loopy BP marginals can differ from the unsplit run.')
+@click.option('--inference_workers', default=1, help='processes solving the loopy parts of the factor graphs, or the units when not split.')
+@click.option('--exact_treewidth', default=0, help='with --split_components, solves loopy components up to this treewidth exactly, 0 for never.')
+@click.option('--inference_budget', default=0.0, help='seconds per solving round NUMPY_MF and NUMPY_GIBBS may take before returning the marginals so far, 0 for no limit.')
+@click.option('--naming_cache', default='', help='sqlite file keeping naming predictions across runs, none by default.')
+@click.option('--name_model_data', default='', help="'name, {unit dict}' lines to train the character n-gram name-to-unit model on, such as the type miner's training file ./DATA/2017_06_16_var_names_units_all.txt (not shipped); it predicts the names the type miner leaves.")
+def main(target_cpp_file, output_file, correction_file, should_print_one_line_summary, print_constraints, print_variable_types, print_profile, inference, split_components, inference_workers, exact_treewidth, inference_budget, naming_cache, name_model_data):
     original_directory = os.getcwd()
 
     SHOULD_SUPRESS_OUTPUT_FILES = False  # DURING PARALLEL OPERATION
@@ -127,14 +139,24 @@ def main(target_cpp_file, output_file, correction_file, should_print_one_line_su
 
 
     # DO THE MINING
-    my_type_miner = TypeMiner(training_filepath, types_filepath, suffix_filepath)
+    my_type_miner = TypeMiner(training_filepath, types_filepath, suffix_filepath, pos_lexicon_filepath)
     my_type_miner.train(True)  # True = TRY TO REUSE PREVIOUS TRAINING
+    if naming_cache:
+        my_type_miner.naming_cache = NamingCache(naming_cache, my_type_miner.miner_key())
 
     con_collector = ConstraintCollector(my_type_miner)
     con_collector.SHOULD_PRINT_CONSTRAINTS = print_constraints
+    if name_model_data:
+        con_collector.vnh = CharNgramVarNameHeuristic()
+        con_collector.vnh.train(name_model_data)
     con_scoper = ConstraintScoper()
     con_solver = ConstraintSolver(con_collector, con_scoper, SHOULD_USE_CONSTRAINT_SCOPING)
     con_solver.SHOULD_PRINT_VARIABLE_TYPES = print_variable_types
+    con_solver.INFERENCE_METHOD = inference
+    con_solver.SHOULD_SPLIT_COMPONENTS = split_components
+    con_solver.INFERENCE_WORKERS = inference_workers
+    con_solver.EXACT_TREEWIDTH = exact_treewidth
+    con_solver.INFERENCE_BUDGET = inference_budget
     
     _log("Collecting Constraints ... %s " % strftime("%Y-%m-%d %H:%M:%S", gmtime()))
     # COLLECT CONSTRAINTS    
@@ -186,6 +208,9 @@ def main(target_cpp_file, output_file, correction_file, should_print_one_line_su
     if SHOULD_USE_CONSTRAINT_SCOPING:
          compute_results_for_constraint_scopes(target_cpp_file, dump_file, source_file, 
                                                con_collector, con_solver, con_scoper)
+
+    if print_profile:
+        perf_stats.print_stats()
     
 
 def print_variable_units(a_cppcheck_configuration, var2unitproba, output_file_path):
@@ -1,5 +1,192 @@
 import cps_constraints as con
+import perf_stats
 import copy
+import json
+import os
+
+
+ROS_UNIT_DICTIONARY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'DATA', 'ros_unit_dictionary.json')
+
+WEAK_INFERENCE_CLASSES = ('sensor_msgs::JointState', 'trajectory_msgs::JointTrajectory', 'trajectory_msgs::JointTrajectoryPoint')
+# THESE DIMENSIONLESS UNITS ACT AS A '1' DURTION DIMENSION OPERATIONS, EXEPCT FOR ADDITION.  
+# EXAMPLES    radians + meters NOT OK.  radians * meters = meters.  quaternion * quaternion = quaternion
+DIMENSIONLESS_UNITS = ({'radian': 1.0}, {'quaternion': 1.0}, {'nounit': 0.0}, {'degree_360': 1.0})
+DIMENSIONLESS_UNITS_AS_LISTS = ([{'radian': 1.0}], [{'quaternion': 1.0}], [{'nounit': 0.0}], [{'degree_360': 1.0}])
+
+
+class FrozenDict(dict):
+    ''' READ-ONLY dict FOR DATA SHARED BY EVERY SymbolHelper.  COPIES COME BACK AS PLAIN dicts
+        '''
+    def _read_only(self, *args, **kwargs):
+        raise TypeError('FrozenDict is read-only')
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _read_only
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(dict(self), memo)
+
+
+def freeze_json_object(json_object):
+    # JSON KEYS COME BACK AS unicode;  THE REST OF THE CODE COMPARES AGAINST str
+    return FrozenDict((str(k), v) for k, v in json_object.items())
+
+
+# (should_ignore_time_and_math, should_use_dt_heuristic) -> FrozenDict
+ros_unit_dictionaries = {}
+
+
+def load_ros_unit_dictionary(should_ignore_time_and_math, should_use_dt_heuristic):
+    ''' BUILDS THE ROS UNIT DATABASE ONCE PER PROCESS FOR EACH SETTING OF THE FLAGS
+        input:  should_ignore_time_and_math   bool  leave out ros::Time, ros::Duration, ros::Rate and known math functions
+                should_use_dt_heuristic       bool  include the 'dt' symbol
+        returns: FrozenDict  class name -> member name -> unit dict
+        '''
+    key = (should_ignore_time_and_math, should_use_dt_heuristic)
+    if key not in ros_unit_dictionaries:
+        with open(ROS_UNIT_DICTIONARY_FILE) as f:
+            sections = json.load(f, object_hook=freeze_json_object)
+        ros_unit_dictionary = dict(sections['ros_messages'])
+        if not should_ignore_time_and_math:
+            ros_unit_dictionary.update(sections['time_and_math'])
+        if should_use_dt_heuristic:
+            ros_unit_dictionary.update(sections['dt_heuristic'])
+        ros_unit_dictionaries[key] = FrozenDict(ros_unit_dictionary)
+    return ros_unit_dictionaries[key]
+
+
+# SANITIZE RULES, APPLIED IN THIS ORDER UNTIL NOTHING CHANGES.  SOME OF THESE CAN BE CASCADED IN DIFFERENT ORDERS
+#   ('suffix', s)           ENDS WITH s:  STRIP THE TRAILING s
+#   ('suffix_all', s)       ENDS WITH s:  REMOVE EVERY s
+#   ('wrapper', p, r)       STARTS WITH p AND ENDS WITH '>':  REMOVE EVERY r AND THE TRAILING '>'
+SANITIZE_RULES = [
+        ('suffix', '::iterator'),                                       # SIMPLIFY ITERATORS
+        ('suffix', '::const_iterator'),
+        ('suffix_all', '&'),                                            # SIMPLIFY REFERNCES
+        ('suffix', 'const'),                                            # SIMPLIFY CONST
+        ('suffix_all', 'ConstPtr'),                                     # SIMPLIFY CONSTANT POINTERS (REFRENCES)
+        ('suffix', '::Ptr'),                                            # SIMPLIFY POINTERS
+        ('suffix', 'Ptr'),
+        ('wrapper', 'boost::shared_ptr<', 'boost::shared_ptr<'),        # SIMPLIFY BOOST POINTERS
+        ('wrapper', 'shared_ptr<', 'shared_ptr<'),
+        ('wrapper', 'boost::scoped_ptr<', 'boost::scoped_ptr<'),
+        ('wrapper', 'scoped_ptr<', 'scoped_ptr<'),
+        ('wrapper', 'tf::MessageFilter<', 'tf::MessageFilter<'),
+        ('wrapper', 'tf2_ros::MessageFilter<', 'tf_ros::MessageFilter<'),
+        ('wrapper', 'MessageFilter<', 'MessageFilter<'),
+        ('wrapper', 'std::vector<', 'std::vector<'),                    # SIMPLIFY VECTORS
+        ('wrapper', 'conststd::vector<', 'std::vector<'),
+        ('wrapper', 'vector<', 'vector<'),
+        ('wrapper', 'std::deque<', 'std::vector<'),
+        ('wrapper', 'deque<', 'vector<'),
+        ('suffix', '*'),                                                # SIMPLIFY POINTERS
+        ('suffix', '::'),                                               # SIMPLIFY DANGLING ::
+        ]
+
+
+def compile_sanitize_rules(rules):
+    ''' TURNS THE RULE TABLE INTO (test, rewrite) PAIRS SO THE SANITIZE LOOP IS A SINGLE PASS OVER A LIST
+        '''
+    compiled = []
+    for rule in rules:
+        if rule[0] == 'suffix':
+            suffix = rule[1]
+            compiled.append((lambda s, suffix=suffix: s.endswith(suffix),
+                             lambda s, suffix=suffix: s[:-len(suffix)]))
+        elif rule[0] == 'suffix_all':
+            suffix = rule[1]
+            compiled.append((lambda s, suffix=suffix: s.endswith(suffix),
+                             lambda s, suffix=suffix: s.replace(suffix, '')))
+        elif rule[0] == 'wrapper':
+            prefix, removed = rule[1], rule[2]
+            compiled.append((lambda s, prefix=prefix: s.startswith(prefix) and s.endswith('>'),
+                             lambda s, removed=removed: s.replace(removed, '')[:-1]))
+        else:
+            raise ValueError('unknown sanitize rule %s' % rule[0])
+    return compiled
+
+
+COMPILED_SANITIZE_RULES = compile_sanitize_rules(SANITIZE_RULES)
+
+# RAW TYPE STRING -> SANITIZED CLASS NAME
+sanitized_class_name_cache = {}
+
+
+def compute_sanitized_class_name(class_name):
+    class_name = str(class_name)
+    is_some_change = True
+    while (is_some_change):
+        is_some_change = False
+        for test, rewrite in COMPILED_SANITIZE_RULES:
+            if test(class_name):
+                class_name = rewrite(class_name)
+                is_some_change = True
+    return class_name
+
+
+# WHAT should_have_unit CAN SAY FROM THE VARIABLE TYPE ALONE
+UNIT_ELIGIBILITY_ANY = 'any'                        # FLOATING POINT OR ROS TIME
+UNIT_ELIGIBILITY_COMPOUND_ONLY = 'compound_only'    # ONLY AS PART OF A COMPOUND NAME (ex: pose.x)
+UNIT_ELIGIBILITY_NONE = 'none'                      # NEVER
+
+# LOWERCASED SANITIZED TYPE -> UNIT_ELIGIBILITY_*
+unit_eligibility_cache = {}
+
+
+def classify_unit_eligibility(var_type):
+    ''' input:  lowercased, sanitized variable type
+        output: one of the UNIT_ELIGIBILITY_* classes
+        '''
+    if var_type in unit_eligibility_cache:
+        return unit_eligibility_cache[var_type]
+
+    eligibility = UNIT_ELIGIBILITY_ANY
+    if not(var_type in ['ros::time', 'ros::duration', 'std::vector<ros::duration>', 'ros::rate']) and \
+            (not(any(substr in var_type for substr in ['float', 'double']))):
+            # any(substr in var_type for substr in ['point', 'joint'])):
+            # JPO:  might be too strong to exclude variables like 'distance_to_point' or 'joint_torque_limit'
+        eligibility = UNIT_ELIGIBILITY_COMPOUND_ONLY
+
+    if var_type in ["bool", "std::string", "string"]:
+        eligibility = UNIT_ELIGIBILITY_NONE
+
+    if ('bool' in var_type or
+            'Bool' in var_type or
+            'Byte' in var_type or
+            'int' == var_type or
+            'int32' in var_type or
+            'int16' in var_type or
+            'uint32_t' == var_type or
+            'size_t' in var_type or
+            'uint' in var_type[:4] or
+            'char' == var_type or
+            'ros::NodeHandle' == var_type or
+            'ROSAgent' == var_type or
+            'ros::ServiceClient' == var_type or
+            'OrientToBaseResult' == var_type or
+            'OrientToBaseGoal' == var_type or
+            #'ros::Rate' == var_type or
+            'OrientToLaserReadingAction' in var_type or
+            'ServiceServer' in var_type or
+            'Subscriber' in var_type or
+            'Publisher' in var_type or
+            'string' in var_type or
+            'actionlib' in var_type or
+            'IStream' in var_type or
+            'rosserial_msgs' in var_type or
+            'TransformException' in var_type or
+            'TransformBroadcaster' in var_type or
+            'TransformListener' in var_type or
+            'tf::Vector3' in var_type or
+            'OrientToBaseAction' in var_type):
+            # or
+            # '::' in class_name):
+        eligibility = UNIT_ELIGIBILITY_NONE
+
+    unit_eligibility_cache[var_type] = eligibility
+    return eligibility
 
 
 class SymbolHelper:
@@ -7,18 +194,15 @@ class SymbolHelper:
     '''
 
     def __init__(self):
-        self.ros_unit_dictionary = {}
         self.should_ignore_time_and_math = False
         self.should_use_dt_heuristic = True
         self.initialize_ros_unit_dictionary()      
         self.debug_missed_class_names_output_file = 'all_missed_class_name_lookups.txt'
         self.debug_log_missed_class_names = False
         self.is_weak_inference = False
-        self.weak_inference_classes = ['sensor_msgs::JointState', 'trajectory_msgs::JointTrajectory', 'trajectory_msgs::JointTrajectoryPoint']
-        # THESE DIMENSIONLESS UNITS ACT AS A '1' DURTION DIMENSION OPERATIONS, EXEPCT FOR ADDITION.  
-        # EXAMPLES    radians + meters NOT OK.  radians * meters = meters.  quaternion * quaternion = quaternion
-        self.dimensionless_units = [{'radian': 1.0}, {'quaternion': 1.0}, {'nounit': 0.0}, {'degree_360': 1.0}]
-        self.dimensionless_units_as_lists = [[{'radian': 1.0}], [{'quaternion': 1.0}], [{'nounit': 0.0}], [{'degree_360': 1.0}]]
+        self.weak_inference_classes = WEAK_INFERENCE_CLASSES
+        self.dimensionless_units = DIMENSIONLESS_UNITS
+        self.dimensionless_units_as_lists = DIMENSIONLESS_UNITS_AS_LISTS
 
 
     def should_have_unit(self, token, name):
@@ -39,50 +223,10 @@ class SymbolHelper:
             #if token.variable.isClass and name == token.str:
             #    return False
            
-            var_type = self.find_variable_type(token.variable)
-            var_type = self.sanitize_class_name(var_type)
-            var_type = var_type.lower()
-            if name == token.str:
-                if not(var_type in ['ros::time', 'ros::duration', 'std::vector<ros::duration>', 'ros::rate']) and \
-                        (not(any(substr in var_type for substr in ['float', 'double']))):
-                        # any(substr in var_type for substr in ['point', 'joint'])):
-                        # JPO:  might be too strong to exclude variables like 'distance_to_point' or 'joint_torque_limit'
-                    return False    
-
-            if var_type in ["bool", "std::string", "string"]:
+            eligibility = self.find_unit_eligibility(token.variable)
+            if eligibility == UNIT_ELIGIBILITY_NONE:
                 return False
-
-            if ('bool' in var_type or
-                    'Bool' in var_type or
-                    'Byte' in var_type or
-                    'int' == var_type or
-                    'int32' in var_type or
-                    'int16' in var_type or
-                    'uint32_t' == var_type or
-                    'size_t' in var_type or
-                    'uint' in var_type[:4] or
-                    'char' == var_type or
-                    'ros::NodeHandle' == var_type or
-                    'ROSAgent' == var_type or
-                    'ros::ServiceClient' == var_type or
-                    'OrientToBaseResult' == var_type or
-                    'OrientToBaseGoal' == var_type or
-                    #'ros::Rate' == var_type or
-                    'OrientToLaserReadingAction' in var_type or
-                    'ServiceServer' in var_type or
-                    'Subscriber' in var_type or
-                    'Publisher' in var_type or
-                    'string' in var_type or
-                    'actionlib' in var_type or
-                    'IStream' in var_type or
-                    'rosserial_msgs' in var_type or
-                    'TransformException' in var_type or
-                    'TransformBroadcaster' in var_type or
-                    'TransformListener' in var_type or
-                    'tf::Vector3' in var_type or
-                    'OrientToBaseAction' in var_type):
-                    # or
-                    # '::' in class_name):
+            if name == token.str and eligibility == UNIT_ELIGIBILITY_COMPOUND_ONLY:
                 return False
 
 
@@ -95,9 +239,43 @@ class SymbolHelper:
         return True
 
 
+    def cache_compound_variable_names(self, root_tokens):
+        ''' ONE BOTTOM-UP PASS OVER THE ASTs OF A FUNCTION.  CACHES THE SUBTREE STRING OF EVERY
+            TOKEN AND THE (COMPOUND TOKEN, NAME) OF EVERY VARIABLE TOKEN.  THE AST IS NOT
+            MODIFIED AFTER PARSING, SO LATER ROUNDS ONLY READ THE CACHE
+            input: list of root tokens of a function
+            returns: None  (side effect: decorates tokens)
+            '''
+        for root_token in root_tokens:
+            self.cache_compound_variable_names_recursive(root_token)
+
+
+    def cache_compound_variable_names_recursive(self, token):
+        if token.astOperand1:
+            self.cache_compound_variable_names_recursive(token.astOperand1)
+        if token.astOperand2:
+            self.cache_compound_variable_names_recursive(token.astOperand2)
+        self.recursively_visit(token)
+        if token.variable:
+            self.find_compound_variable_and_name_for_variable_token(token)
+
+
     def find_compound_variable_and_name_for_variable_token(self, token):
         if not token.variable:
             raise ValueError('received a non variable token for tokenid:%s str:%s' % (token.Id, token.str))
+        compound_variable_and_name = getattr(token, 'compound_variable_and_name', None)
+        if compound_variable_and_name:
+            perf_stats.count_hit('compound_name_cache')
+            return compound_variable_and_name
+        perf_stats.count_miss('compound_name_cache')
+        compound_variable_and_name = self.compute_compound_variable_and_name_for_variable_token(token)
+        token.compound_variable_and_name = compound_variable_and_name
+        return compound_variable_and_name
+
+
+    def compute_compound_variable_and_name_for_variable_token(self, token):
+        ''' UNCACHED IMPLEMENTATION OF find_compound_variable_and_name_for_variable_token
+            '''
         if not token.astParent:
             return (token, token.str)
         if token.astParent.str != '.' and token.astParent.str != '[':
@@ -204,8 +382,11 @@ class SymbolHelper:
             
     def recursively_visit(self, token):
         ''' input: a cppcheckdata token
-            returns: string aggregation of tokens under the root
+            returns: string aggregation of tokens under the root (cached on the token)
             '''
+        my_return_string = getattr(token, 'ast_string', None)
+        if my_return_string is not None:
+            return my_return_string
         my_return_string = ''
 
         if token.astOperand1: 
@@ -215,7 +396,8 @@ class SymbolHelper:
             my_return_string += self.recursively_visit(token.astOperand2)
         if token.str == '[':
             my_return_string += ']'
-        
+
+        token.ast_string = my_return_string
         return my_return_string
 
 
@@ -223,6 +405,13 @@ class SymbolHelper:
         ''' input: cppcheckdata variable object
             output: string of variable type  (ex:  'int'  or 'std::vector')
             '''
+        # THE TYPE REGION NEVER CHANGES, SO WALK IT ONCE PER VARIABLE
+        my_return_string = getattr(variable, 'canonical_type', None)
+        if my_return_string is not None:
+            perf_stats.count_hit('variable_type_cache')
+            return my_return_string
+        perf_stats.count_miss('variable_type_cache')
+
         my_return_string = variable.typeStartToken.str
 
         if variable.typeStartToken != variable.typeEndToken:
@@ -234,6 +423,7 @@ class SymbolHelper:
                     hasNext = False;
                 nextToken = nextToken.next
 
+        variable.canonical_type = my_return_string
         return my_return_string
 
 
@@ -247,98 +437,36 @@ class SymbolHelper:
             input: class_name   'constPtr<tf2::Transform::iterator>'  <-- LOL
             output: str         'trf2::Transform'
             '''
-        is_some_change = True
-        while (is_some_change):# SOME OF THESE CAN BE CASCADED IN DIFFERENT ORDERS
-            is_some_change = False
+        # MEMOIZED BY RAW TYPE STRING -- THE SAME FEW HUNDRED TYPES COME BACK FOR EVERY TOKEN
+        if class_name in sanitized_class_name_cache:
+            perf_stats.count_hit('sanitized_class_name_cache')
+            return sanitized_class_name_cache[class_name]
+        perf_stats.count_miss('sanitized_class_name_cache')
+        sanitized = compute_sanitized_class_name(class_name)
+        sanitized_class_name_cache[class_name] = sanitized
+        return sanitized
 
-            # SIMPLIFY ITERATORS
-            if str(class_name).endswith('::iterator'):
-                class_name = self.rreplace(class_name, '::iterator', '', 1)
-                is_some_change = True
-            if str(class_name).endswith('::const_iterator'):
-                class_name = self.rreplace(class_name, '::const_iterator', '', 1)
-                is_some_change = True
-            # SIMPLIFY REFERNCES
-            if str(class_name).endswith('&'):
-                class_name = class_name.replace('&', '')
-                is_some_change = True
-            # SIMPLIFY CONST
-            if str(class_name).endswith('const'):
-                class_name = self.rreplace(class_name, 'const', '', 1)
-                is_some_change = True
-            # SIMPLIFY CONSTANT POINTERS (REFRENCES)
-            if str(class_name).endswith('ConstPtr'):
-                class_name = class_name.replace('ConstPtr', '')
-                is_some_change = True
-            # SIMPLIFY POINTERS
-            if str(class_name).endswith('::Ptr'):
-                class_name = self.rreplace(class_name, '::Ptr', '', 1)
-                is_some_change = True
-            if str(class_name).endswith('Ptr'):
-                class_name = self.rreplace(class_name, 'Ptr', '', 1)
-                is_some_change = True
-            # SIMPLIFY BOOST POINTERS
-            if str(class_name).startswith('boost::shared_ptr<') and str(class_name).endswith('>'):
-                class_name = class_name.replace('boost::shared_ptr<', '')
-                class_name = self.rreplace(class_name, '>', '', 1)
-                is_some_change = True
-            if str(class_name).startswith('shared_ptr<') and str(class_name).endswith('>'):
-                class_name = class_name.replace('shared_ptr<', '')
-                class_name = self.rreplace(class_name, '>', '', 1)
-                is_some_change = True
-            if str(class_name).startswith('boost::scoped_ptr<') and str(class_name).endswith('>'):
-                class_name = class_name.replace('boost::scoped_ptr<', '')
-                class_name = self.rreplace(class_name, '>', '', 1)
-                is_some_change = True
-            if str(class_name).startswith('scoped_ptr<') and str(class_name).endswith('>'):
-                class_name = class_name.replace('scoped_ptr<', '')
-                class_name = self.rreplace(class_name, '>', '', 1)
-                is_some_change = True
 
-            if str(class_name).startswith('tf::MessageFilter<') and str(class_name).endswith('>'):
-                class_name = class_name.replace('tf::MessageFilter<', '')
-                class_name = self.rreplace(class_name, '>', '', 1)
-                is_some_change = True
-            if str(class_name).startswith('tf2_ros::MessageFilter<') and str(class_name).endswith('>'):
-                class_name = class_name.replace('tf_ros::MessageFilter<', '')
-                class_name = self.rreplace(class_name, '>', '', 1)
-                is_some_change = True
-            if str(class_name).startswith('MessageFilter<') and str(class_name).endswith('>'):
-                class_name = class_name.replace('MessageFilter<', '')
-                class_name = self.rreplace(class_name, '>', '', 1)
-                is_some_change = True
+    def find_sanitized_variable_type(self, variable):
+        ''' input: cppcheckdata variable object
+            output: sanitized class name of the variable type, cached on the variable
+            '''
+        sanitized = getattr(variable, 'sanitized_class_name', None)
+        if sanitized is None:
+            sanitized = self.sanitize_class_name(self.find_variable_type(variable))
+            variable.sanitized_class_name = sanitized
+        return sanitized
 
-            # SIMPLIFY VECTORS
-            if str(class_name).startswith('std::vector<') and str(class_name).endswith('>'):
-                class_name = class_name.replace('std::vector<', '')
-                class_name = self.rreplace(class_name, '>', '', 1)
-                is_some_change = True
-            if str(class_name).startswith('conststd::vector<') and str(class_name).endswith('>'):
-                class_name = class_name.replace('std::vector<', '')
-                class_name = self.rreplace(class_name, '>', '', 1)
-                is_some_change = True
-            if str(class_name).startswith('vector<') and str(class_name).endswith('>'):
-                class_name = class_name.replace('vector<', '')
-                class_name = self.rreplace(class_name, '>', '', 1)
-                is_some_change = True
-            if str(class_name).startswith('std::deque<') and str(class_name).endswith('>'):
-                class_name = class_name.replace('std::vector<', '')
-                class_name = self.rreplace(class_name, '>', '', 1)
-                is_some_change = True
-            if str(class_name).startswith('deque<') and str(class_name).endswith('>'):
-                class_name = class_name.replace('vector<', '')
-                class_name = self.rreplace(class_name, '>', '', 1)
-                is_some_change = True
-            # SIMPLIFY POINTERS
-            if str(class_name).endswith('*'):
-                class_name = self.rreplace(class_name, '*', '', 1)
-                is_some_change = True
-            # SIMPLIFY DANGLING ::
-            if str(class_name).endswith('::'):
-                class_name = self.rreplace(class_name, '::', '', 1)
-                is_some_change = True
-        # SANITIZED VERSION
-        return class_name
+
+    def find_unit_eligibility(self, variable):
+        ''' input: cppcheckdata variable object
+            output: one of the UNIT_ELIGIBILITY_* classes, cached on the variable
+            '''
+        eligibility = getattr(variable, 'unit_eligibility', None)
+        if eligibility is None:
+            eligibility = classify_unit_eligibility(self.find_sanitized_variable_type(variable).lower())
+            variable.unit_eligibility = eligibility
+        return eligibility
 
 
     def find_units_for_variable(self, token):
@@ -348,10 +476,8 @@ class SymbolHelper:
         # ASSUME FALSE
         self.is_weak_inference = False
 
-        raw_class_name = self.find_variable_type(token.variable)
-
         # REMOVE EXTRA, UNNECESSARY INFORMATION FROM FRONT AND BACK
-        class_name = self.sanitize_class_name(raw_class_name)
+        class_name = self.find_sanitized_variable_type(token.variable)
 
         # IF CLASS IS A ROS MESSAGE
         if class_name in self.ros_unit_dictionary:
@@ -395,484 +521,13 @@ class SymbolHelper:
 
 
     def initialize_ros_unit_dictionary(self):
+        ''' POINTS THIS HELPER AT THE SHARED, READ-ONLY ROS UNIT DATABASE FOR ITS CURRENT SETTINGS.
+            CALL AGAIN AFTER CHANGING should_ignore_time_and_math OR should_use_dt_heuristic
+            '''
+        self.ros_unit_dictionary = load_ros_unit_dictionary(self.should_ignore_time_and_math,
+                                                            self.should_use_dt_heuristic)
 
 
-        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -  WRENCH
-        twist_dict                                      = {'linear': {'meter': 1.0, 'second': -1.0}, 
-                                                           'angular': {'second': -1.0}}
-        accel_dict                                      = {'linear': {'meter': 1.0, 'second': -2.0}, 
-                                                           'angular': {'second': -2.0}}
-                                                          #'covariance'} todo
-        wrench_dict                                     = {'force': {'kilogram': 1.0, 'meter': 1.0, 'second': -2.0}, 
-                                                           'torque': {'kilogram': 1.0, 'meter': 2.0, 'second': -2.0}}
-        inertia_dict                                    = {'m': {'kilogram': 1.0},
-                                                           'com': {'meter': 1.0},
-                                                           'ixx': {'kilogram': 1.0, 'meter': -2.0},
-                                                           'ixy': {'kilogram': 1.0, 'meter': -2.0},
-                                                           'ixz': {'kilogram': 1.0, 'meter': -2.0},
-                                                           'iyy': {'kilogram': 1.0, 'meter': -2.0},
-                                                           'iyz': {'kilogram': 1.0, 'meter': -2.0},
-                                                           'izz': {'kilogram': 1.0, 'meter': -2.0}}
-        transform_dict                                  = {'translation': {'meter': 1.0},
-                                                           'rotation': {'quaternion': 1.0}}
-
-
-    # GEOMETRY MSGS   http://docs.ros.org/api/geometry_msgs/html/index-msg.html
-        
-        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -  ACCEL
-        self.ros_unit_dictionary['geometry_msgs::Accel'] = accel_dict
-        self.ros_unit_dictionary['geometry_msgs::AccelStamped'] = copy.deepcopy(accel_dict)
-        self.ros_unit_dictionary['geometry_msgs::AccelStamped']['stamp'] = {'second': 1.0}
-        self.ros_unit_dictionary['geometry_msgs::AccelWithCovariance'] = accel_dict
-        self.ros_unit_dictionary['geometry_msgs::AccelWithCovarianceStamped'] = copy.deepcopy(accel_dict)
-        self.ros_unit_dictionary['geometry_msgs::AccelWithCovarianceStamped']['stamp'] = {'second': 1.0}
-
-        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -  INERTIA
-        self.ros_unit_dictionary['geometry_msgs::Inertia'] = inertia_dict
-        self.ros_unit_dictionary['geometry_msgs::InertiaStamped'] = copy.deepcopy(inertia_dict)
-        self.ros_unit_dictionary['geometry_msgs::InertiaStamped']['stamp'] = {'second': 1.0}
-
-        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -  POINT
-        self.ros_unit_dictionary['geometry_msgs::Point'] = {'x': {'meter': 1.0},
-                                                            'y': {'meter': 1.0},
-                                                            'z': {'meter': 1.0}}
-        self.ros_unit_dictionary['std::vector<geometry_msgs::Point>'] = {'x': {'meter': 1.0},
-                                                                         'y': {'meter': 1.0},
-                                                                         'z': {'meter': 1.0}}
-
-        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -  POINT
-        self.ros_unit_dictionary['geometry_msgs::Point32'] = {'x': {'meter': 1.0},
-                                                              'y': {'meter': 1.0},
-                                                              'z': {'meter': 1.0}}
-
-        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -  POINT
-        self.ros_unit_dictionary['geometry_msgs::PointStamped'] = {'x': {'meter': 1.0},
-                                                                   'y': {'meter': 1.0},
-                                                                   'z': {'meter': 1.0},
-                                                                   'stamp': {'second': 1.0}}
-        self.ros_unit_dictionary['geometry_msgs::PointStampedPtr'] = {'x': {'meter': 1.0},
-                                                                      'y': {'meter': 1.0},
-                                                                      'z': {'meter': 1.0},
-                                                                      'stamp': {'second': 1.0}}
-        self.ros_unit_dictionary['MessageFilter<geometry_msgs::PointStamped>'] = {'x': {'meter': 1.0},
-                                                                                  'y': {'meter': 1.0},
-                                                                                  'z': {'meter': 1.0},
-                                                                                  'stamp': {'second': 1.0}}
-        self.ros_unit_dictionary['std::vector<geometry_msgs::PointStamped>'] = {'x': {'meter': 1.0},
-                                                                                'y': {'meter': 1.0},
-                                                                                'z': {'meter': 1.0},
-                                                                                'stamp': {'second': 1.0}}
-
-        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -  POLYGON
-        self.ros_unit_dictionary['geometry_msgs::Polygon'] = {'points': {'meter': 1.0}}
-
-        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -  POLYGONSTAMPED
-        self.ros_unit_dictionary['geometry_msgs::PolygonStamped'] = {'points': {'meter': 1.0},
-                                                                     'stamp': {'second': 1.0}}
-
-        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -  POSE
-        self.ros_unit_dictionary['geometry_msgs::Pose'] = {'position': {'meter': 1.0},
-                                                           'orientation': {'quaternion': 1.0}}
-        self.ros_unit_dictionary['std::Vector<geometry_msgs::Pose>'] = {'position': {'meter': 1.0},
-                                                                        'orientation': {'quaternion': 1.0}}
-
-        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -  POSE
-        self.ros_unit_dictionary['geometry_msgs::Pose2D'] = {'x': {'meter': 1.0},
-                                                             'y': {'meter': 1.0},
-                                                             'theta': {'radian': 1.0}}
-
-        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -  POSESTAMPED
-        self.ros_unit_dictionary['geometry_msgs::PoseStamped'] = {'position': {'meter': 1.0},
-                                                                  'orientation': {'quaternion': 1.0},
-                                                                  'stamp': {'second': 1.0}}
-        self.ros_unit_dictionary['std::Vector<geometry_msgs::PoseStamped>'] = {'position': {'meter': 1.0},
-                                                                               'orientation': {'quaternion': 1.0},
-                                                                               'stamp': {'second': 1.0}}
-
-        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -  POSEWITHCOVARIANCE
-        self.ros_unit_dictionary['geometry_msgs::PoseWithCovariance'] = {'position': {'meter': 1.0},
-                                                                         'orientation': {'quaternion': 1.0}}
-        self.ros_unit_dictionary['geometry_msgs::PoseWithCovariance::_covariance_type'] = {'position': {'meter': 1.0},
-                                                                                           'orientation': {'quaternion': 1.0}}
-        self.ros_unit_dictionary['geometry_msgs::PoseWithCovarianceStamped'] = {'position': {'meter': 1.0},
-                                                                                'orientation': {'quaternion': 1.0},
-                                                                                'stamp': {'second': 1.0}}
-
-        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -  POSE ARRAY  todo
-        self.ros_unit_dictionary['geometry_msgs::PoseArray'] = {'position': {'meter': 1.0},
-                                                                'orientation': {'quaternion': 1.0},
-                                                                'stamp': {'second': 1.0}}
-
-        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -  Quaternion
-        self.ros_unit_dictionary['geometry_msgs::Quaternion'] = {'x': {'quaternion': 1.0},
-                                                                 'y': {'quaternion': 1.0},
-                                                                 'z': {'quaternion': 1.0},
-                                                                 'w': {'quaternion': 1.0}}
-
-        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -  QUATERNION STAMPED
-        self.ros_unit_dictionary['geometry_msgs::QuaternionStamped'] = {'x': {'quaternion': 1.0},
-                                                                        'y': {'quaternion': 1.0},
-                                                                        'z': {'quaternion': 1.0},
-                                                                        'w': {'quaternion': 1.0},
-                                                                        'stamp': {'second': 1.0}}
-
-        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -  TRANSFORM
-        self.ros_unit_dictionary['geometry_msgs::Transform'] = transform_dict
-        self.ros_unit_dictionary['geometry_msgs::TransformStamped'] = copy.deepcopy(transform_dict)
-        self.ros_unit_dictionary['geometry_msgs::TransformStamped']['stamp'] = {'second': 1.0}
-
-        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -  TWIST
-        self.ros_unit_dictionary['geometry_msgs::Twist'] = twist_dict
-        self.ros_unit_dictionary['geometry_msgs::TwistStamped'] = copy.deepcopy(twist_dict)
-        self.ros_unit_dictionary['geometry_msgs::TwistStamped']['stamp'] = {'second': 1.0}
-        self.ros_unit_dictionary['geometry_msgs::TwistWithCovariance'] = copy.deepcopy(twist_dict)
-        self.ros_unit_dictionary['geometry_msgs::TwistWithCovarianceStamped'] = copy.deepcopy(twist_dict)
-        self.ros_unit_dictionary['geometry_msgs::TwistWithCovarianceStamped']['stamp'] = {'second': 1.0}
-
-        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -  WRENCH
-        self.ros_unit_dictionary['geometry_msgs::Wrench'] = wrench_dict
-        self.ros_unit_dictionary['geometry_msgs::WrenchStamped'] = copy.deepcopy(wrench_dict)
-        self.ros_unit_dictionary['geometry_msgs::WrenchStamped']['stamp'] = {'second': 1.0}
-
-
-    # NAVIGATION MSGS   http://docs.ros.org/api/nav_msgs/html/index-msg.html
-
-        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -  GRID CELLS
-        self.ros_unit_dictionary['nav_msgs::GridCells'] = {'cell_width': {'meter': 1.0}, 
-                                                           'cell_height': {'meter': 1.0},
-                                                           'stamp': {'second': 1.0}}
-
-        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -  MAP META DATA
-        self.ros_unit_dictionary['nav_msgs::MapMetaData'] = {'map_load_time': {'second': 1.0},
-                                                             'resolution': {'meter': 1.0},
-                                                             'x': {'meter': 1.0},
-                                                             'y': {'meter': 1.0},
-                                                             'z': {'radian': 1.0}}
-
-        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -  OCCUPANCY GRID
-        self.ros_unit_dictionary['nav_msgs::OccupancyGrid'] = {'map_load_time': {'second': 1.0},
-                                                               'resolution': {'meter': 1.0},
-                                                               'x': {'meter': 1.0},
-                                                               'y': {'meter': 1.0},
-                                                               'z': {'radian': 1.0},
-                                                               'stamp': {'second': 1.0}}
-
-        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -  ODOMETRY
-        self.ros_unit_dictionary['nav_msgs::Odometry'] = {'position': {'meter': 1.0},
-                                                          'orientation': {'quaternion': 1.0},
-                                                          'stamp': {'second': 1.0},
-                                                          'linear': {'meter': 1.0, 'second': -1.0},
-                                                          'angular': {'second': -1.0}}
-
-        self.ros_unit_dictionary['nav_msgs::Path'] = {'position': {'meter': 1.0},
-                                                      'orientation': {'quaternion': 1.0},
-                                                      'stamp': {'second': 1.0}}
-
-
-    # NAV 2D MSGS
-        self.ros_unit_dictionary['nav_2d_msgs::Twist2D'] = {'x': {'meter': 1.0, 'second': -1.0}, 
-                                                            'y': {'meter': 1.0, 'second': -1.0}, 
-                                                            'theta': {'radian': 1.0}}
-        self.ros_unit_dictionary['nav_2d_msgs::Twist2D32'] = {'x': {'meter': 1.0, 'second': -1.0}, 
-                                                              'y': {'meter': 1.0, 'second': -1.0}, 
-                                                              'theta': {'radian': 1.0}}
-        self.ros_unit_dictionary['nav_2d_msgs::Twist2D32Stamped'] = {'x': {'meter': 1.0, 'second': -1.0}, 
-                                                                     'y': {'meter': 1.0, 'second': -1.0}, 
-                                                                     'theta': {'radian': 1.0}}
-
-
-    # SENSOR MSGS   http://docs.ros.org/api/sensor_msgs/html/index-msg.html
-
-        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -  BATTERY   todo: not implemented in Indigo
-        self.ros_unit_dictionary['sensor_msgs::BatteryState'] = {'voltage': {'kilogram': 1.0, 'meter': 2.0, 'second': -3.0, 'amp': -1.0},
-                                                                 'cell_voltage': {'kilogram': 1.0, 'meter': 2.0, 'second': -3.0, 'amp': -1.0},
-                                                                 'current': {'amp': 1.0},
-                                                                 'charge': {'amp': 1.0, 'second': 1.0},
-                                                                 'capacity': {'amp': 1.0, 'second': 1.0},
-                                                                 'design_capacity': {'amp': 1.0, 'second': 1.0},
-                                                                 'stamp': {'second': 1.0}}
-
-        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -  FLUID PRESSURE 
-        self.ros_unit_dictionary['sensor_msgs::FluidPressure'] = {'fluid_pressure': {'kilogram': 1.0, 'meter': -1.0, 'second': -2.0},
-                                                                  'variance': {'kilogram': 2.0, 'meter': -2.0, 'second': -4.0},
-                                                                  'stamp': {'second': 1.0}}
-
-        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -  ILLUMINANCE
-        self.ros_unit_dictionary['sensor_msgs::Illuminance'] = {'illuminance': {'candela': 1.0, 'meter': -2.0},
-                                                                'variance': {'candela': 2.0, 'meter': -4.0},
-                                                                'stamp': {'second': 1.0}}
-
-        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -  IMU
-        self.ros_unit_dictionary['sensor_msgs::Imu'] = {'angular_velocity': {'second': -1.0},
-                                                        'angular_velocity_covariance': {'second': -2.0},
-                                                        'linear_acceleration': {'meter': 1.0, 'second': -2.0},
-                                                        'linear_acceleration_covariance': {'meter': 2.0, 'second': -4.0},
-                                                        'orientation': {'quaternion': 1.0},
-                                                        'orientation_covariance': {'quaternion': 2.0},
-                                                        'stamp': {'second': 1.0}}
-
-        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -  JOINT STATE  #todo: Improve on revolute assumption
-        self.ros_unit_dictionary['sensor_msgs::JointState'] = {'position': {'radian': 1.0},
-                                                               'velocity': {'second': -1.0},
-                                                               'effort': {'kilogram': 1.0, 'meter': 2.0, 'second': -2.0},
-                                                               'stamp': {'second': 1.0}}
-
-        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -  LASER ECHO
-        self.ros_unit_dictionary['sensor_msgs::LaserEcho'] = {'echoes': {'meter': 1.0}}
-
-        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -  LASERSCAN
-        self.ros_unit_dictionary['sensor_msgs::LaserScan'] = {'time_increment': {'second': 1.0},
-                                                              'scan_time': {'second': 1.0},
-                                                              'range_min': {'meter': 1.0},
-                                                              'range_max': {'meter': 1.0},
-                                                              'ranges': {'meter': 1.0},
-                                                              'angle_min': {'radian': 1.0},
-                                                              'angle_max': {'radian': 1.0},
-                                                              'angle_increment': {'radian': 1.0},
-                                                              'stamp': {'second': 1.0}}
-
-        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -  MAGNETIC FIELD
-        self.ros_unit_dictionary['sensor_msgs::MagneticField'] = {'magnetic_field': {'kilogram': 1.0, 'second': -2.0, 'amp': -1.0},
-                                                                  'magnetic_field_covariance': {'kilogram': 2.0, 'second': -4.0, 'amp': -2.0},
-                                                                  'stamp': {'second': 1.0}}
-
-        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -  MULTI DOF JOINT STATE
-        self.ros_unit_dictionary['sensor_msgs::MultiDOFJointState'] = {'twist': twist_dict,
-                                                                       'wrench': wrench_dict,
-                                                                       'transforms': transform_dict,
-                                                                       'stamp': {'second': 1.0}}
-
-        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -  MULTI ECHO LASERSCAN
-        self.ros_unit_dictionary['sensor_msgs::MultiEchoLaserScan'] = {'time_increment': {'second': 1.0},
-                                                                       'scan_time': {'second': 1.0},
-                                                                       'range_min': {'meter': 1.0},
-                                                                       'range_max': {'meter': 1.0},
-                                                                       'ranges': {'meter': 1.0},
-                                                                       'angle_min': {'radian': 1.0},
-                                                                       'angle_max': {'radian': 1.0},
-                                                                       'angle_increment': {'radian': 1.0},
-                                                                       'stamp': {'second': 1.0}}
-
-        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -  NAV SAT FIX
-        self.ros_unit_dictionary['sensor_msgs::NavSatFix'] = {'latitude': {'degree_360': 1.0},
-                                                              'longitude': {'degree_360': 1.0},
-                                                              'altitude': {'meter': 1.0},
-                                                              'position_covariance': {'meter': 2.0},
-                                                              'stamp': {'second': 1.0}}
-
-        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -  POINT CLOUD
-        self.ros_unit_dictionary['sensor_msgs::PointCloud'] = {'points': {'meter': 1.0},
-                                                               'stamp': {'second': 1.0}}
-        self.ros_unit_dictionary['sensor_msgs::PointCloud2'] = {'points': {'meter': 1.0},
-                                                                'stamp': {'second': 1.0}}
-        self.ros_unit_dictionary['sensor_msgs::PointCloud2Iterator<float>'] = {'points': {'meter': 1.0},
-                                                                               'stamp': {'second': 1.0}}
-
-        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -  RANGE
-        self.ros_unit_dictionary['sensor_msgs::Range'] = {'min_range': {'meter': 1.0},
-                                                          'max_range': {'meter': 1.0},
-                                                          'range': {'meter': 1.0},
-                                                          'stamp': {'second': 1.0},
-                                                          'field_of_view': {'radian': 1.0}}
-
-        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -  TEMPERATURE
-        self.ros_unit_dictionary['sensor_msgs::Temperature'] = {'temperature': {'degree_celsius': 1.0},
-                                                                'variance': {'degree_celsius': 2.0},
-                                                                'stamp': {'second': 1.0}}
-
-        # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -  TIME REFERENCE
-        self.ros_unit_dictionary['sensor_msgs::TimeReference'] = {'time_ref': {'second': 1.0},
-                                                                  'stamp': {'second': 1.0}}
-
-
-    # SHAPE MSGS   http://docs.ros.org/api/shape_msgs/html/index-msg.html
-
-        self.ros_unit_dictionary['shape_msgs::Mesh'] = {'vertices': {'meter': 1.0}}
-
-        self.ros_unit_dictionary['shape_msgs::SolidPrimitive'] = {'dimensions': {'meter': 1.0}}
-
-
-    # STEREO MSGS   http://docs.ros.org/api/stereo_msgs/html/index-msg.html
-
-        self.ros_unit_dictionary['stereo_msgs::DisparityImage'] = {'T': {'meter': 1.0}, 
-                                                                   #'min_disparity': {'meter': 1.0},
-                                                                   #'delta_d': {'meter': 1.0},
-                                                                   #'max_disparity': {'meter': 1.0},
-                                                                   'stamp': {'second': 1.0}}
-
-
-    # TRAJECTORY MSGS   http://wiki.ros.org/trajectory_msgs
-        # REVOLUTE ASSUMPTION LIKE JOINTSTATE
-        self.ros_unit_dictionary['trajectory_msgs::JointTrajectory'] = {'positions': {'radian': 1.0}, 
-                                                                        'velocities': {'second': -1.0},
-                                                                        'accelerations': {'second': -2.0},
-                                                                        'effort': {'kilogram': 1.0, 'meter': 2.0, 'second': -2.0},
-                                                                        'time_from_start': {'second': 1.0},
-                                                                        'stamp': {'second': 1.0}}
-
-        self.ros_unit_dictionary['trajectory_msgs::JointTrajectoryPoint'] = {'positions': {'radian': 1.0}, 
-                                                                        'velocities': {'second': -1.0},
-                                                                        'accelerations': {'second': -2.0},
-                                                                        'effort': {'kilogram': 1.0, 'meter': 2.0, 'second': -2.0},
-                                                                        'time_from_start': {'second': 1.0}}
-        
-
-    # TRANSFORM MSGS
-
-        self.ros_unit_dictionary['StampedTransform'] = {'getOrigin': {'meter': 1.0}, 
-                                                        'getRotation': {'quaternion': 1.0},
-                                                        'stamp_': {'second': 1.0}}
-
-        self.ros_unit_dictionary['tf::Quaternion'] = {'getX': {'quaternion': 1.0}, 
-                                                      'getY': {'quaternion': 1.0},
-                                                      'getZ': {'quaternion': 1.0},
-                                                      'getW': {'quaternion': 1.0}}
-        self.ros_unit_dictionary['tf::Stamped<tf::Quaternion>'] = {'getX': {'quaternion': 1.0}, 
-                                                                   'getY': {'quaternion': 1.0},
-                                                                   'getZ': {'quaternion': 1.0},
-                                                                   'getW': {'quaternion': 1.0},
-                                                                   'stamp_': {'second': 1.0}}
-
-        #self.ros_unit_dictionary['tf::Vector3'] = {'getX': {'meter': 1.0}, 
-        #                                           'getY': {'meter': 1.0},
-        #                                           'getZ': {'meter': 1.0},
-        #                                           'x': {'meter': 1.0},
-        #                                           'y': {'meter': 1.0},
-        #                                           'z': {'meter': 1.0}}
-        self.ros_unit_dictionary['tf::Stamped<tf::Vector3>'] = {#'getX': {'meter': 1.0}, 
-                                                                #'getY': {'meter': 1.0},
-                                                                #'getZ': {'meter': 1.0},
-							        #'x': {'meter': 1.0},
-							        #'y': {'meter': 1.0},
-							        #'z': {'meter': 1.0},
-                                                                'stamp_': {'second': 1.0}}
-
-        self.ros_unit_dictionary['tf::Pose'] = {'getOrigin': {'meter': 1.0}, 
-                                                'getRotation': {'quaternion': 1.0}}
-        self.ros_unit_dictionary['tf::Stamped<tf::Pose>'] = {'getOrigin': {'meter': 1.0}, 
-                                                             'getRotation': {'quaternion': 1.0},
-                                                             'stamp_': {'second': 1.0}}
-
-        self.ros_unit_dictionary['tf::Transform'] = {'getOrigin': {'meter': 1.0}, 
-                                                     'getRotation': {'quaternion': 1.0}}
-        self.ros_unit_dictionary['tf::StampedTransform'] = {'getOrigin': {'meter': 1.0}, 
-                                                            'getRotation': {'quaternion': 1.0},
-                                                            'stamp_': {'second': 1.0}}
-        self.ros_unit_dictionary['tf2::Stamped<tf::Transform>'] = {'getOrigin': {'meter': 1.0}, 
-                                                                   'getRotation': {'quaternion': 1.0},
-                                                                   'stamp_': {'second': 1.0}}
-
-        self.ros_unit_dictionary['tf2::Quaternion'] = {'getX': {'quaternion': 1.0}, 
-                                                       'getY': {'quaternion': 1.0},
-                                                       'getZ': {'quaternion': 1.0},
-                                                       'getW': {'quaternion': 1.0}}
-        self.ros_unit_dictionary['tf2::Stamped<tf2::Quaternion>'] = {'getX': {'quaternion': 1.0}, 
-                                                                     'getY': {'quaternion': 1.0},
-                                                                     'getZ': {'quaternion': 1.0},
-                                                                     'getW': {'quaternion': 1.0},
-                                                                     'stamp_': {'second': 1.0}}
-
-        #self.ros_unit_dictionary['tf2::Vector3'] = {'getX': {'meter': 1.0}, 
-        #                                            'getY': {'meter': 1.0},
-        #                                            'getZ': {'meter': 1.0}}
-        self.ros_unit_dictionary['tf2::Stamped<tf2::Vector3>'] = {#'getX': {'meter': 1.0}, 
-                                                                  #'getY': {'meter': 1.0},
-                                                                  #'getZ': {'meter': 1.0},
-                                                                  'stamp_': {'second': 1.0}}
-
-        self.ros_unit_dictionary['tf2::Pose'] = {'getOrigin': {'meter': 1.0}, 
-                                                 'getRotation': {'quaternion': 1.0}}
-        self.ros_unit_dictionary['tf2::Stamped<tf2::Pose>'] = {'getOrigin': {'meter': 1.0}, 
-                                                               'getRotation': {'quaternion': 1.0},
-                                                               'stamp_': {'second': 1.0}}
-
-        self.ros_unit_dictionary['tf2::Transform'] = {'getOrigin': {'meter': 1.0}, 
-                                                      'getRotation': {'quaternion': 1.0}}
-        self.ros_unit_dictionary['tf2::StampedTransform'] = {'getOrigin': {'meter': 1.0}, 
-                                                             'getRotation': {'quaternion': 1.0},
-                                                             'stamp_': {'second': 1.0}}
-        self.ros_unit_dictionary['tf2::Stamped<tf2::Transform>'] = {'getOrigin': {'meter': 1.0}, 
-                                                                    'getRotation': {'quaternion': 1.0},
-                                                                    'stamp_': {'second': 1.0}}
-
-    # VISUALIZATION MSGS - http://wiki.ros.org/visualization_msgs
-        # ADDED BECAUSE IT CONTAINS AN EMBEDDED POSE
-        self.ros_unit_dictionary['visualization_msgs::Marker'] = {'position': {'meter': 1.0},  
-                                                                  'orientation': {'quaternion': 1.0},
-                                                                  'lifetime': {'second': 1.0},
-                                                                  #'points': {'meter': 1.0},
-                                                                  'stamp': {'second': 1.0}}
-        self.ros_unit_dictionary['visualization_msgs::MarkerArray'] = {'position': {'meter': 1.0},  
-                                                                       'orientation': {'quaternion': 1.0},
-                                                                       'lifetime': {'second': 1.0},
-                                                                       #'points': {'meter': 1.0},
-                                                                       'stamp': {'second': 1.0}}
-        self.ros_unit_dictionary['visualization_msgs::InteractiveMarker'] = {'position': {'meter': 1.0},  
-                                                                             'orientation': {'quaternion': 1.0},
-                                                                             'lifetime': {'second': 1.0},
-                                                                             #'points': {'meter': 1.0},
-                                                                             'stamp': {'second': 1.0}}
-        self.ros_unit_dictionary['visualization_msgs::InteractiveMarkerControl'] = {'position': {'meter': 1.0},  
-                                                                                    'orientation': {'quaternion': 1.0},
-                                                                                    'lifetime': {'second': 1.0},
-                                                                                    #'points': {'meter': 1.0},
-                                                                                    'stamp': {'second': 1.0}}
-        self.ros_unit_dictionary['visualization_msgs::InteractiveMarkerFeedback'] = {'position': {'meter': 1.0},  
-                                                                                     'orientation': {'quaternion': 1.0},
-                                                                                     #'mouse_point': {'meter': 1.0},
-                                                                                     'stamp': {'second': 1.0}}
-        self.ros_unit_dictionary['visualization_msgs::InteractiveMarkerInit'] = {'position': {'meter': 1.0},  
-                                                                                 'orientation': {'quaternion': 1.0},
-                                                                                 'lifetime': {'second': 1.0},
-                                                                                 #'points': {'meter': 1.0},
-                                                                                 'stamp': {'second': 1.0}}
-        self.ros_unit_dictionary['visualization_msgs::InteractiveMarkerPose'] = {'position': {'meter': 1.0},  
-                                                                                 'orientation': {'quaternion': 1.0},
-                                                                                 'stamp': {'second': 1.0}}
-        self.ros_unit_dictionary['visualization_msgs::InteractiveMarkerUpdate'] = {'position': {'meter': 1.0},  
-                                                                                   'orientation': {'quaternion': 1.0},
-                                                                                   'lifetime': {'second': 1.0},
-                                                                                   #'points': {'meter': 1.0},
-                                                                                   'stamp': {'second': 1.0}}
-
-
-    # ROS TIME
-        if not self.should_ignore_time_and_math:
-            # ALL TIME UNITS ARE SECONDS REGARDLESS OF SCALE
-            self.ros_unit_dictionary['ros::Time'] = {'sec': {'second': 1.0}, 
-                                                     'nsec': {'second': 1.0}}  
-            self.ros_unit_dictionary['ros::Duration'] = {'sec': {'second': 1.0}, 
-                                                        'nsec': {'second': 1.0}}  
-            self.ros_unit_dictionary['std::vector<ros::Duration>'] = {'sec': {'second': 1.0}, 
-                                                                      'nsec': {'second': 1.0}}
-
-            self.ros_unit_dictionary['ros::Rate'] = {'rate': {'second': -1.0}}
-
-
-    # KNOWN FUNCTIONS
-        if not self.should_ignore_time_and_math:
-            self.ros_unit_dictionary['atan2'] = {'atan2': {'radian': 1.0}} 
-            self.ros_unit_dictionary['acos'] = {'acos': {'radian': 1.0}} 
-            self.ros_unit_dictionary['asin'] = {'asin': {'radian': 1.0}} 
-            self.ros_unit_dictionary['atan'] = {'atan': {'radian': 1.0}} 
-            self.ros_unit_dictionary['toSec'] = {'toSec': {'second': 1.0}}
-            self.ros_unit_dictionary['toNSec'] = {'toNSec': {'second': 1.0}} 
-
-        # self.ros_unit_dictionary['getX'] = {'getX': {'meter': 1.0}} 
-        # self.ros_unit_dictionary['getY'] = {'getY': {'meter': 1.0}} 
-        # self.ros_unit_dictionary['getZ'] = {'getZ': {'meter': 1.0}} 
-        self.ros_unit_dictionary['quatToRPY'] = {'quatToRPY': {'radian': 1.0}}
-        self.ros_unit_dictionary['getYaw'] =  {'getYaw': {'radian': 1.0}} 
-        self.ros_unit_dictionary['getRoll'] =  {'getRoll': {'radian': 1.0}} 
-        self.ros_unit_dictionary['getPitch'] =  {'getPitch': {'radian': 1.0}}
-
- 
-    # KNOWN SYMBOLS
-        # self.ros_unit_dictionary['M_PI'] = {'M_PI': {'radian': 1.0}} 
-        if self.should_use_dt_heuristic:
-            self.ros_unit_dictionary['dt'] = {'dt': {'second': 1.0}}
-        
-
     def convert_vector_units_to_dict(self, units_as_str):
         # STRIP EXTERIOR BRACKETS IF PRESENT
         units_as_str = units_as_str.replace('[', '').replace(']','')
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import unittest
+import cps_constraints as con
+from var_name_heuristic import VarNameHeuristic
+try:
+    from constraint_collector import ConstraintCollector
+except ImportError:
+    # networkx not installed
+    ConstraintCollector = None
+
+
+DUMP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data',
+                         'AGNC-Lab_Quad', 'multithreaded', 'control', 'MathFuncs.cpp.dump')
+
+
+class UnpredictingTypeMiner(object):
+    # A TYPE MINER WITH NO PREDICTION FOR ANY NAME
+
+    def prepare_names(self, names):
+        pass
+
+    def predict_sorted(self, vname):
+        return []
+
+
+class MeterVarNameHeuristic(VarNameHeuristic):
+
+    def _predict(self, var_names, method):
+        return [[({'meter': 1.0}, 0.9)] for _ in var_names]
+
+
+@unittest.skipIf(ConstraintCollector is None, 'constraint_collector needs networkx')
+class TestDeepNetworkNamingConstraints(unittest.TestCase):
+
+    def collect(self, vnh):
+        con.reset_constraint_store()
+        con_collector = ConstraintCollector(UnpredictingTypeMiner())
+        # THE ORDER FUNCTIONS ARE WALKED IN DOES NOT MATTER HERE
+        con_collector.should_sort_by_function_graph = False
+        con_collector.vnh = vnh
+        con_collector.main_run_collect(DUMP_FILE, DUMP_FILE[:-len('.dump')])
+        return {name: unitprobalist for (token, name, unitprobalist) in con.naming_constraints.values()}
+
+    def test_names_the_miner_cannot_predict_get_empty_constraints(self):
+        name2units = self.collect(None)
+        self.assertIn('max_val', name2units)
+        self.assertTrue(all(units == [({}, 0.0)] for units in name2units.values()))
+
+    def test_model_predicts_names_the_miner_cannot(self):
+        name2units = self.collect(MeterVarNameHeuristic())
+        self.assertEqual(name2units['max_val'], [({'meter': 1.0}, 0.9)])
+        self.assertEqual(name2units['min_val'], [({'meter': 1.0}, 0.9)])
+
+
+if __name__ == '__main__':
+    unittest.main()
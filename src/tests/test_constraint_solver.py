@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+import cps_constraints as con
+from constraint_solver import ConstraintSolver
+
+
+class Token(object):
+    # THE FIELDS OF A cppcheckdata.Token THE CONSTRAINTS READ
+
+    def __init__(self, Id, variable, units=None, isKnown=False):
+        self.Id = Id
+        self.variable = variable
+        self.units = units or []
+        self.isKnown = isKnown
+
+
+class TestTopUnitProbas(unittest.TestCase):
+
+    def setUp(self):
+        con.reset_constraint_store()
+        self.solver = ConstraintSolver(None, None)
+        self.solver.INFERENCE_METHOD = 'NUMPY_BP'
+        # A KNOWN TOKEN EQUAL TO A VARIABLE AND TO AN EXPRESSION WITH UNITS BUT NO VARIABLE
+        known_lt = Token('1', 'known', [{'meter': 1.0}], True)
+        con.add_df_constraint(known_lt, 'a', Token('2', 'c'), 'c', con.DF_1)
+        con.add_df_constraint(known_lt, 'a', Token('3', None, [{'meter': 1.0}]), 'a+b', con.DF_1)
+
+    def test_expression_without_variable_is_left_out(self):
+        var2unitproba = self.solver.solve()
+        self.assertEqual(var2unitproba.keys(), [('c', 'c')])
+        self.assertEqual(var2unitproba[('c', 'c')][0][0], {'meter': 1.0})
+        self.assertGreater(var2unitproba[('c', 'c')][0][1], 0.5)
+
+    def test_print_variable_types(self):
+        self.solver.SHOULD_PRINT_VARIABLE_TYPES = True
+        self.assertEqual(self.solver.solve().keys(), [('c', 'c')])
+
+
+if __name__ == '__main__':
+    unittest.main()
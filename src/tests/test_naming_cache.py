@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+import unittest
+from naming_cache import NamingCache
+
+
+ESTIMATIONS = [("{'meter': 1.0}", 0.8333333333333333), ("{'second': 1.0}", 0.1 + 0.2)]
+
+
+class TestNamingCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'naming_predictions.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_put_then_get(self):
+        cache = NamingCache(self.path, 'key')
+        self.assertIsNone(cache.get('robot_vel'))
+        cache.put('robot_vel', ESTIMATIONS)
+        self.assertEqual(cache.get('robot_vel'), ESTIMATIONS)
+        self.assertIn('robot_vel', cache)
+        cache.close()
+
+    def test_flushed_entries_are_read_back_bit_for_bit(self):
+        cache = NamingCache(self.path, 'key')
+        cache.put('robot_vel', ESTIMATIONS)
+        cache.flush()
+        other = NamingCache(self.path, 'key')
+        self.assertEqual(other.get('robot_vel'), ESTIMATIONS)
+        other.close()
+        cache.close()
+
+    def test_close_flushes(self):
+        cache = NamingCache(self.path, 'key')
+        cache.put('robot_vel', ESTIMATIONS)
+        cache.close()
+        cache = NamingCache(self.path, 'key')
+        self.assertEqual(cache.get('robot_vel'), ESTIMATIONS)
+        cache.close()
+
+    def test_another_miner_key_misses(self):
+        cache = NamingCache(self.path, 'key')
+        cache.put('robot_vel', ESTIMATIONS)
+        cache.close()
+        cache = NamingCache(self.path, 'other key')
+        self.assertIsNone(cache.get('robot_vel'))
+        self.assertNotIn('robot_vel', cache)
+        cache.close()
+
+    def test_unusable_file_keeps_entries_in_memory(self):
+        # THE DIRECTORY IS A FILE
+        open(os.path.join(self.directory, 'file'), 'w').close()
+        cache = NamingCache(os.path.join(self.directory, 'file', 'naming_predictions.sqlite'), 'key')
+        self.assertIsNone(cache.connection)
+        cache.put('robot_vel', ESTIMATIONS)
+        self.assertEqual(cache.get('robot_vel'), ESTIMATIONS)
+        cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+from training_index import HEADER, INDEX_VERSION, TrainingIndex, write_training_index
+
+
+VAR2TYPE = {'vel': {"{'meter': 1.0, 'second': -1.0}": 7, "{'meter': 1.0}": 1},
+            'dist': {"{'meter': 1.0}": 12},
+            'dt': {"{'second': 1.0}": 3}}
+DIGEST = 'da39a3ee5e6b4b0d3255bfef95601890afd80709'
+
+
+class TestTrainingIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'training_index.bin')
+        write_training_index(self.path, VAR2TYPE, DIGEST)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def rewrite(self, change):
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        with open(self.path, 'wb') as f:
+            f.write(change(data))
+
+    def test_round_trip(self):
+        index = TrainingIndex(self.path)
+        self.assertEqual(index.source_digest, DIGEST)
+        self.assertEqual(len(index), len(VAR2TYPE))
+        self.assertEqual(list(index), sorted(VAR2TYPE))
+        for term, unit_counts in VAR2TYPE.iteritems():
+            self.assertIn(term, index)
+            self.assertEqual(index[term], unit_counts)
+        self.assertNotIn('acc', index)
+        self.assertIsNone(index.get('acc'))
+        self.assertRaises(KeyError, lambda: index['acc'])
+        self.assertEqual(index.to_dict(), VAR2TYPE)
+        index.close()
+
+    def test_wrong_version_is_rejected(self):
+        self.rewrite(lambda data: data[:8] + struct.pack('<I', INDEX_VERSION + 1) + data[12:])
+        self.assertRaises(ValueError, TrainingIndex, self.path)
+
+    def test_truncated_file_is_rejected(self):
+        self.rewrite(lambda data: data[:-4])
+        self.assertRaises(ValueError, TrainingIndex, self.path)
+        self.rewrite(lambda data: data[:HEADER.size - 1])
+        self.assertRaises(ValueError, TrainingIndex, self.path)
+
+    def test_other_file_is_rejected(self):
+        self.rewrite(lambda data: 'not an index' + data[12:])
+        self.assertRaises(ValueError, TrainingIndex, self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import mmap
+import os
+import struct
+
+
+INDEX_MAGIC = 'PHYSTIDX'
+# BUMP WHEN THE FILE LAYOUT, OR THE TERMS datamining.TypeMiner EXTRACTS FROM A NAME, CHANGE
+INDEX_VERSION = 1
+# MAGIC, VERSION, TERMS, UNITS, NAMES, TERM BYTES, UNIT BYTES, SHA1 OF THE TRAINING FILE; THEN THE
+# UNITS AND THE SORTED TERMS, ONE PER LINE, AND A TERMS x UNITS TABLE OF COUNTS
+HEADER = struct.Struct('<8sIIIIII40s')
+COUNT = struct.Struct('<I')
+
+
+def write_training_index(path, term2unit_counts, source_digest=''):
+    ''' COMPILES TypeMiner.var2type, TERM -> {UNIT STRING: NAMES SEEN}, INTO A TrainingIndex FILE.
+        THE FILE IS WRITTEN NEXT TO path AND RENAMED INTO PLACE, SO A READER NEVER MAPS HALF OF IT
+    '''
+    terms = sorted(term2unit_counts)
+    units = sorted(set(u for unit_counts in term2unit_counts.itervalues() for u in unit_counts))
+    unit_column = {u: i for i, u in enumerate(units)}
+    terms_blob = ''.join(t + '\n' for t in terms)
+    units_blob = ''.join(u + '\n' for u in units)
+    counts = [0] * (len(terms) * len(units))
+    for row, t in enumerate(terms):
+        for u, count in term2unit_counts[t].iteritems():
+            counts[row * len(units) + unit_column[u]] = count
+    header = HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(terms), len(units), sum(counts),
+                         len(terms_blob), len(units_blob), source_digest or '')
+    padding = '\0' * (-(HEADER.size + len(units_blob) + len(terms_blob)) % COUNT.size)
+
+    temporary_path = '%s.%d.tmp' % (path, os.getpid())
+    with open(temporary_path, 'wb') as f:
+        f.write(header)
+        f.write(units_blob)
+        f.write(terms_blob)
+        f.write(padding)
+        f.write(struct.pack('<%dI' % len(counts), *counts))
+    os.rename(temporary_path, path)
+
+
+class TrainingIndex(object):
+    ''' READ-ONLY, MEMORY-MAPPED TERM -> UNIT-COUNT VECTOR TABLE BUILT BY write_training_index.
+        OPENING ONE READS THE HEADER AND UNIT NAMES ONLY; THE FIRST LOOKUP MAPS THE TERMS TO
+        THEIR ROWS, AND THE COUNTS ARE READ FROM THE FILE.  PROCESSES MAPPING THE SAME FILE
+        SHARE ITS PAGES.
+
+        STANDS IN FOR TypeMiner.var2type: index[term] IS THE SAME {UNIT STRING: COUNT} DICT,
+        AND ITERATING GIVES THE DISTINCT TERMS.  A FILE OF ANOTHER VERSION RAISES ValueError.
+        EACH LOOKUP DECODES A ROW INTO A NEW DICT: A READER OF MANY TERMS MANY TIMES, LIKE
+        predict_proba, TAKES to_dict() ONCE INSTEAD
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(self.buffer) < HEADER.size:
+                raise ValueError('%s is not a training index' % path)
+            (magic, version, self.nterms, self.nunits, self.nnames,
+             terms_bytes, units_bytes, self.source_digest) = HEADER.unpack_from(self.buffer, 0)
+            if magic != INDEX_MAGIC:
+                raise ValueError('%s is not a training index' % path)
+            if version != INDEX_VERSION:
+                raise ValueError('%s is training index version %d, not %d' % (path, version, INDEX_VERSION))
+            self.source_digest = self.source_digest.rstrip('\0')
+            self.units_at = HEADER.size
+            self.terms_at = self.units_at + units_bytes
+            self.counts_at = self.terms_at + terms_bytes + (-(self.terms_at + terms_bytes) % COUNT.size)
+            if len(self.buffer) != self.counts_at + self.nterms * self.nunits * COUNT.size:
+                raise ValueError('%s is truncated' % path)
+        except (ValueError, struct.error):
+            self.buffer.close()
+            raise
+        self.units = self.buffer[self.units_at:self.terms_at].split('\n')[:-1]
+        self.row = struct.Struct('<%dI' % self.nunits)
+        self.term2row = None
+
+    def __len__(self):
+        return self.nterms
+
+    def __iter__(self):
+        return iter(self._terms())
+
+    def __contains__(self, term):
+        return self._find(term) >= 0
+
+    def __getitem__(self, term):
+        unit_counts = self.unit_counts(term)
+        if unit_counts is None:
+            raise KeyError(term)
+        return {u: count for u, count in zip(self.units, unit_counts) if count}
+
+    def get(self, term, default=None):
+        try:
+            return self[term]
+        except KeyError:
+            return default
+
+    def to_dict(self):
+        ''' ALL OF index[term], AS ONE {TERM: {UNIT STRING: COUNT}} DICT DECODED IN ONE PASS
+        '''
+        counts = struct.unpack_from('<%dI' % (self.nterms * self.nunits), self.buffer, self.counts_at)
+        term2unit_counts = {}
+        for row, term in enumerate(self._terms()):
+            row_counts = counts[row * self.nunits:(row + 1) * self.nunits]
+            term2unit_counts[term] = {u: count for u, count in zip(self.units, row_counts) if count}
+        return term2unit_counts
+
+    def unit_counts(self, term):
+        ''' THE NAMES term WAS SEEN WITH, PER UNIT OF self.units, AS A TUPLE; None FOR AN UNKNOWN TERM
+        '''
+        row = self._find(term)
+        if row < 0:
+            return None
+        return self.row.unpack_from(self.buffer, self.counts_at + row * self.row.size)
+
+    def _terms(self):
+        return self.buffer[self.terms_at:self.counts_at].rstrip('\0').split('\n')[:-1]
+
+    def _find(self, term):
+        if self.term2row is None:
+            self.term2row = {t: row for row, t in enumerate(self._terms())}
+        return self.term2row.get(term, -1)
+
+    def close(self):
+        self.buffer.close()
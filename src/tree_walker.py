@@ -1,9 +1,15 @@
 from symbol_helper import SymbolHelper
 import cps_constraints as con
+import perf_stats
 import copy
 from operator import itemgetter
 
 
+# MEMO OF apply_multiplication_to_unit_dicts, SHARED BY ALL TREE WALKERS
+UNIT_MULTIPLICATION_CACHE_SIZE = 4096
+unit_multiplication_cache = {}
+
+
 class TreeWalker:
 
     name = None
@@ -222,8 +228,7 @@ class TreeWalker:
                 if paren_token.astOperand1 and paren_token.astOperand1.str == '.':
                     dot_token = paren_token.astOperand1
                     if dot_token.astOperand1 and dot_token.astOperand1.variable and dot_token.astOperand2:
-                        class_name = self.my_symbol_helper.find_variable_type(dot_token.astOperand1.variable)
-                        class_name_sanitized = self.my_symbol_helper.sanitize_class_name(class_name)
+                        class_name_sanitized = self.my_symbol_helper.find_sanitized_variable_type(dot_token.astOperand1.variable)
                         if class_name_sanitized in self.my_symbol_helper.ros_unit_dictionary:
                             if dot_token.astOperand2.str == 'getOrigin':
                                 units_for_getXYZ = self.my_symbol_helper.ros_unit_dictionary[class_name_sanitized]['getOrigin']
@@ -232,8 +237,7 @@ class TreeWalker:
         
             # GET TYPE SO WE CAN INFER CORRECT UNITS BASED ON KNOWLEDGE OF ROS UNIT ASSUMPTIONS
             elif token.astParent.astOperand1.variable:
-                class_name = self.my_symbol_helper.find_variable_type(token.astParent.astOperand1.variable)
-                class_name_sanitized = self.my_symbol_helper.sanitize_class_name(class_name)
+                class_name_sanitized = self.my_symbol_helper.find_sanitized_variable_type(token.astParent.astOperand1.variable)
                 if class_name_sanitized in self.my_symbol_helper.ros_unit_dictionary:
                     units_for_getXYZ = self.my_symbol_helper.ros_unit_dictionary[class_name_sanitized][token.str]
         else:
@@ -336,7 +340,7 @@ class TreeWalker:
             (token, var_name) = self.my_symbol_helper.find_compound_variable_and_name_for_variable_token(token)
             if not token:
                 return
-            if (token.variable, var_name) in con.dimensionless_variables:
+            if con.is_dimensionless_variable(token, var_name):
                 token.units = []
                 token.isDimensionless = True
                 self.was_some_unit_changed = True
@@ -1040,10 +1044,8 @@ class TreeWalker:
             var = con.get_variable_id(token, var_name)
             if (var and (not con.is_nm_constraint_present(var))) or (not var):
                 #print var_name, token.file, token.linenr
-                estimation_dict = self.type_miner.predict_proba(var_name)
-                if estimation_dict:
-                    estimation_list_sorted = sorted(estimation_dict.items(), key=itemgetter(1))
-                    estimation_list_sorted.reverse()
+                estimation_list_sorted = self.type_miner.predict_sorted(var_name)
+                if estimation_list_sorted:
                     estimation_list_sorted = map(lambda (u, p): (eval(u), p), estimation_list_sorted)
 
                     est_list = estimation_list_sorted[:3]
@@ -1063,6 +1065,26 @@ class TreeWalker:
                     con.add_nm_constraint(token, var_name, [({},0.0)])
 
 
+    def prepare_deep_network_names(self, root_tokens):
+        ''' ASKS self.vnh FOR THE UNITS OF EVERY VARIABLE NAME UNDER root_tokens IN ONE BATCH,
+            SO THE collect_deep_network_naming_constraints CALLS THAT FOLLOW HIT ITS CACHE
+            input:  list of root tokens of a function
+            returns: None
+            '''
+        var_names = set()
+        for root_token in root_tokens:
+            self.generic_recurse_and_apply_function(root_token, lambda token, left_token, right_token:
+                                                    self.add_deep_network_name(token, var_names))
+        self.vnh.predict_units_for_var_names(sorted(var_names), 'lstm_most_common')
+
+
+    def add_deep_network_name(self, token, var_names):
+        if token.variable:
+            (token, var_name) = self.my_symbol_helper.find_compound_variable_and_name_for_variable_token(token)
+            if token and len(var_name) >= self.MIN_VAR_NAME_LENGTH:
+                var_names.add(var_name)
+
+
     def collect_deep_network_naming_constraints(self, token, left_token, right_token):
         if token.variable and (not token.units):
             #var_name = token.str
@@ -1087,17 +1109,13 @@ class TreeWalker:
                         
             #TODO should we store variable object instead of token?
             var = con.get_variable_id(token, var_name)
-            if (var and (not con.is_nm_constraint_present(var))) or (not var):
+            # ALSO REPLACE THE EMPTY CONSTRAINT collect_naming_constraints LEAVES WHEN THE TYPE MINER HAS NO PREDICTION
+            if (var and (not con.is_nm_constraint_present(var) or con.is_nm_constraint_empty(var))) or (not var):
                 #print var_name, token.file, token.linenr
-                estimation_dict = self.vnh.predict_units_for_var_name(var_name, 'lstm_most_common')
-                if estimation_dict:
-                    estimation_list_sorted = sorted(estimation_dict.items(), key=itemgetter(0), reverse=True)
-                    # SWAP ORDER TO MAKE LIST CONSISTET WITH PHYS
-                    estimation_list_sorted = [(b,a) for (a,b) in estimation_list_sorted]
-
+                # (UNIT DICT, PROBABILITY), MOST PROBABLE FIRST, SEE var_name_heuristic.VarNameHeuristic
+                estimation_list_sorted = self.vnh.predict_units_for_var_name(var_name, 'lstm_most_common')
+                if estimation_list_sorted:
                     # print ('%s: %s' % (var_name, estimation_list_sorted))
-                    # estimation_list_sorted = map(lambda (u, p): (u, p), estimation_list_sorted)
-                    # estimation_list_sorted = map(lambda (u, p): (eval(u), p), estimation_list_sorted)
                     con.add_nm_constraint(token, var_name, estimation_list_sorted)
                 else:
                     con.add_nm_constraint(token, var_name, [({},0.0)])
@@ -1545,12 +1563,29 @@ class TreeWalker:
 
     def apply_multiplication_to_unit_dicts(self, unit_dict_left, unit_dict_right, op):
         ''' APPLIES MULTIPLICATION AND DIVISION TO UNIT DICTIONARIES
-            (BY ADDING EXPONENTS)
+            (BY ADDING EXPONENTS).  RESULTS ARE MEMOIZED BY (LEFT UNIT, RIGHT UNIT, OP)
             input:  unit_dict_left   dictionary of units, eg:  {'m':1, 's':-1} 
                     unit_dict_right  same
                     op   string representing mult or div operators
             returns: new dict  with resulting units  eg: {'m':2, 's':-2}
             '''
+        key = (frozenset(unit_dict_left.iteritems()), frozenset(unit_dict_right.iteritems()), op)
+        result = unit_multiplication_cache.get(key)
+        if result is None:
+            perf_stats.count_miss('unit_multiplication_cache')
+            result = self.compute_multiplication_of_unit_dicts(unit_dict_left, unit_dict_right, op)
+            if len(unit_multiplication_cache) >= UNIT_MULTIPLICATION_CACHE_SIZE:
+                unit_multiplication_cache.clear()
+            unit_multiplication_cache[key] = result
+        else:
+            perf_stats.count_hit('unit_multiplication_cache')
+        # CALLERS OWN THE RETURNED DICT
+        return dict(result)
+
+
+    def compute_multiplication_of_unit_dicts(self, unit_dict_left, unit_dict_right, op):
+        ''' UNCACHED IMPLEMENTATION OF apply_multiplication_to_unit_dicts
+            '''
         
         #if unit_dict_left == {'radian': 1.0} and unit_dict_right == {'degree_360_unit': 1.0}:
         #    return {'degree_360': 1.0}
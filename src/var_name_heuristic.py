@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import math
+import perf_stats
+
+
+# METHOD NAME TreeWalker.collect_deep_network_naming_constraints ASKS FOR
+DEFAULT_METHOD = 'lstm_most_common'
+# NAMES WHOSE PREDICTIONS EACH PREDICTOR KEEPS, CLEARED WHEN FULL
+NAME_CACHE_SIZE = 65536
+# UNITS A PREDICTION LISTS, MOST PROBABLE FIRST
+TOP_UNITS = 3
+# CHARACTER n-GRAM LENGTHS OF CharNgramVarNameHeuristic, AND ITS ADD-alpha SMOOTHING
+NGRAM_ORDERS = (2, 3, 4)
+NGRAM_ALPHA = 0.1
+
+
+class VarNameHeuristic(object):
+    ''' PREDICTS THE UNITS OF VARIABLES FROM THEIR NAMES.  A PREDICTION IS A LIST OF (UNIT DICT,
+        PROBABILITY), MOST PROBABLE FIRST, EMPTY WHEN THE PREDICTOR HAS NOTHING TO SAY.
+        SUBCLASSES IMPLEMENT _predict FOR A BATCH OF DISTINCT NAMES; THIS CLASS CACHES ITS RESULTS
+        SO A NAME IS PREDICTED ONCE PER METHOD, HOWEVER OFTEN IT IS ASKED FOR
+    '''
+
+    def __init__(self):
+        self.name2prediction = {}
+
+    def predict_units_for_var_names(self, var_names, method=DEFAULT_METHOD):
+        ''' input:  var_names  VARIABLE NAMES, REPEATS ALLOWED
+                    method     NAME OF THE MODEL VARIANT TO ASK
+            returns: dict  NAME -> PREDICTION (A NEW LIST) FOR EACH OF var_names
+            '''
+        missing = []
+        for var_name in set(var_names):
+            if (method, var_name) in self.name2prediction:
+                perf_stats.count_hit('var_name_prediction_cache')
+            else:
+                perf_stats.count_miss('var_name_prediction_cache')
+                missing.append(var_name)
+        if missing:
+            predictions = self._predict(missing, method)
+            if len(self.name2prediction) + len(missing) > NAME_CACHE_SIZE:
+                self.name2prediction.clear()
+            for var_name, prediction in zip(missing, predictions):
+                self.name2prediction[(method, var_name)] = tuple(prediction)
+        return {var_name: list(self.name2prediction[(method, var_name)]) for var_name in var_names}
+
+    def predict_units_for_var_name(self, var_name, method=DEFAULT_METHOD):
+        return self.predict_units_for_var_names([var_name], method)[var_name]
+
+    def _predict(self, var_names, method):
+        ''' ONE PREDICTION PER NAME OF var_names, IN ORDER
+        '''
+        raise NotImplementedError
+
+
+class CharNgramVarNameHeuristic(VarNameHeuristic):
+    ''' CPU-ONLY REFERENCE PREDICTOR: MULTINOMIAL NAIVE BAYES OVER THE CHARACTER n-GRAMS OF
+        THE LOWERCASED NAME, TRAINED FROM 'name, {unit dict}' LINES LIKE THOSE OF THE TYPE MINER'S
+        TRAINING FILE.  DATA/test_hand_annotations.txt IS WHAT PREDICTIONS ARE EVALUATED ON, NOT
+        TRAINING DATA.  THE SAME MODEL SERVES EVERY method
+    '''
+
+    def __init__(self):
+        VarNameHeuristic.__init__(self)
+        # UNIT STRING -> [UNIT DICT, NAMES SEEN, {n-GRAM: COUNT}, TOTAL n-GRAMS]
+        self.unit2model = {}
+        self.vocabulary = set()
+        self.total_names = 0
+
+    def train(self, training_file):
+        with open(training_file) as f:
+            for training_example in (line.rstrip('\n') for line in f):
+                if not training_example.strip():
+                    continue
+                var_name, unit = training_example.split(',', 1)
+                var_name, unit = var_name.strip(), unit.strip()
+                model = self.unit2model.setdefault(unit, [eval(unit), 0, {}, 0])
+                model[1] += 1
+                for ngram in self._ngrams(var_name):
+                    model[2][ngram] = model[2].get(ngram, 0) + 1
+                    model[3] += 1
+                    self.vocabulary.add(ngram)
+                self.total_names += 1
+        self.name2prediction.clear()
+
+    @staticmethod
+    def _ngrams(var_name):
+        padded = '^' + var_name.lower() + '$'
+        return [padded[i:i + n] for n in NGRAM_ORDERS for i in range(len(padded) - n + 1)]
+
+    def _predict(self, var_names, method):
+        if not self.total_names:
+            return [[] for _ in var_names]
+        smoothing = NGRAM_ALPHA * len(self.vocabulary)
+        predictions = []
+        for var_name in var_names:
+            ngrams = self._ngrams(var_name)
+            scores = []
+            for unit, (unit_dict, names, counts, total) in sorted(self.unit2model.iteritems()):
+                denominator = math.log(total + smoothing)
+                score = math.log(names * 1.0 / self.total_names)
+                score += sum(math.log(counts.get(ngram, 0) + NGRAM_ALPHA) - denominator for ngram in ngrams)
+                scores.append((score, unit_dict))
+            top = max(score for score, unit_dict in scores)
+            norm = sum(math.exp(score - top) for score, unit_dict in scores)
+            ranked = sorted(((math.exp(score - top) / norm, unit_dict) for score, unit_dict in scores),
+                            key=lambda item: -item[0])
+            predictions.append([(unit_dict, p) for p, unit_dict in ranked[:TOP_UNITS]])
+        return predictions